@@ -2,13 +2,14 @@ import streamlit as st
 from pathlib import Path
 from datetime import date
 
-from orchestrator import analyze_stock
-from tools.cache import init_cache
+from orchestrator import analyze_stock, ReportStream
+from tools.cache import init_cache, start_cache_maintenance
 from tools.research_engine import run_daily_model, backtest_portfolio
-from config import WATCHLIST
+from config import WATCHLIST, CACHE_COMPACT_INTERVAL_MINUTES
 
 st.set_page_config(page_title="Stock Research Agent", page_icon="📈", layout="wide")
 init_cache()
+start_cache_maintenance(CACHE_COMPACT_INTERVAL_MINUTES)
 Path("reports").mkdir(exist_ok=True)
 
 # ============================================================
@@ -202,23 +203,27 @@ elif mode == "Single Stock":
         run_button = st.button("Analyze", type="primary", use_container_width=True)
 
     if run_button and ticker:
-        with st.spinner(f"Analyzing {ticker}..."):
-            try:
-                report = analyze_stock(ticker)
-                if report and report.strip():
-                    save_report(ticker, report)
-                    st.success("Analysis complete!")
-                    st.markdown(report)
-                    st.download_button(
-                        "Download Report",
-                        data=report,
-                        file_name=f"{ticker}_{date.today()}.md",
-                        mime="text/markdown"
-                    )
-                else:
-                    st.error("Empty report.")
-            except Exception as e:
-                st.error(f"Error: {e}")
+        output = st.empty()
+        try:
+            stream = ReportStream(ticker)
+            with output.container():
+                st.write_stream(stream)
+            report = stream.report
+            if report and report.strip():
+                save_report(ticker, report)
+                # Swap the streamed progress lines for the finished report.
+                output.markdown(report)
+                st.success("Analysis complete!")
+                st.download_button(
+                    "Download Report",
+                    data=report,
+                    file_name=f"{ticker}_{date.today()}.md",
+                    mime="text/markdown"
+                )
+            else:
+                st.error("Empty report.")
+        except Exception as e:
+            st.error(f"Error: {e}")
 
     elif run_button:
         st.warning("Enter a ticker symbol.")
@@ -237,11 +242,16 @@ elif mode == "Batch Analysis":
     if st.button("Run Batch Analysis", type="primary") and tickers_input:
         tickers = [t.strip().upper() for t in tickers_input.split(",") if t.strip()]
         bar = st.progress(0)
+        live = st.empty()
         reports = {}
 
         for i, t in enumerate(tickers):
             try:
-                report = analyze_stock(t)
+                stream = ReportStream(t)
+                with live.container():
+                    st.markdown(f"**[{i+1}/{len(tickers)}] {t}**")
+                    st.write_stream(stream)
+                report = stream.report
                 if report and report.strip():
                     reports[t] = report
                     save_report(t, report)
@@ -250,6 +260,7 @@ elif mode == "Batch Analysis":
 
             bar.progress((i+1) / len(tickers))
 
+        live.empty()
         bar.empty()
 
         if reports:
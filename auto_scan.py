@@ -23,8 +23,8 @@ import schedule
 from datetime import datetime
 
 from orchestrator import run_alert_scan
-from tools.cache import init_cache
-from config import WATCHLIST, AUTO_SCAN_INTERVAL_HOURS
+from tools.cache import init_cache, compact_cache
+from config import WATCHLIST, AUTO_SCAN_INTERVAL_HOURS, CACHE_COMPACT_INTERVAL_MINUTES
 
 
 def run_scan():
@@ -61,6 +61,9 @@ def main():
     # Then schedule recurring scans
     schedule.every(AUTO_SCAN_INTERVAL_HOURS).hours.do(run_scan)
 
+    # Keep the cache file bounded while we stay running
+    schedule.every(CACHE_COMPACT_INTERVAL_MINUTES).minutes.do(compact_cache)
+
     while True:
         schedule.run_pending()
         time.sleep(60)  # Check every minute
@@ -0,0 +1,126 @@
+"""
+Cache Throughput Benchmark
+==========================
+Measures get/set throughput of tools/cache.py with several writer
+processes hitting the same SQLite file at once, the way auto_scan.py,
+the Streamlit app and main.py daily do in practice.
+
+To run:
+    python -m benchmarks.cache_bench
+    python -m benchmarks.cache_bench --procs 8 --ops 2000
+
+Compares the persistent WAL connection layer against the old
+connect-per-call behaviour. Uses a throwaway database in a temp dir.
+
+The "persistent" column measures SQLite: the in-process memory tier is
+cleared before every read and staged writes are flushed every --batch
+sets, so each get is a SELECT and each batch a real commit. The "memory"
+column leaves both on, which is what a warm single process sees.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+
+def legacy_get(db_path, key):
+    conn = sqlite3.connect(db_path)
+    row = conn.execute(
+        "SELECT value FROM cache WHERE key = ? AND expires > ?",
+        (key, date.today().isoformat()),
+    ).fetchone()
+    conn.close()
+    return json.loads(row[0]) if row else None
+
+
+def legacy_set(db_path, key, value):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+        (key, json.dumps(value, default=str), (date.today() + timedelta(days=1)).isoformat()),
+    )
+    conn.commit()
+    conn.close()
+
+
+def worker(mode, db_path, worker_id, ops, keyspace, batch, results):
+    from tools import cache
+    cache.DB_PATH = db_path
+
+    rng = random.Random(worker_id)
+    payload = {"ticker": "HOOD", "price": 42.0, "history": list(range(50))}
+    errors = 0
+    start = time.perf_counter()
+    for i in range(ops):
+        key = f"stock_data:T{rng.randrange(keyspace)}"
+        try:
+            if i % 2 == 0:
+                if mode == "legacy":
+                    legacy_set(db_path, key, payload)
+                else:
+                    cache.set_cached(key, payload)
+                    if mode == "persistent" and (i // 2 + 1) % batch == 0:
+                        cache.flush_cache()
+            else:
+                if mode == "legacy":
+                    legacy_get(db_path, key)
+                else:
+                    if mode == "persistent":
+                        cache.clear_memory_cache()
+                    cache.get_cached(key)
+        except sqlite3.OperationalError:
+            errors += 1
+    if mode != "legacy":
+        cache.flush_cache()
+    results.put((time.perf_counter() - start, errors))
+
+
+def run(mode, procs, ops, keyspace, batch):
+    tmp = tempfile.mkdtemp(prefix="cache_bench_")
+    db_path = os.path.join(tmp, "bench.db")
+
+    from tools import cache
+    cache.DB_PATH = db_path
+    cache.init_cache()
+    cache.close_cache()
+
+    results = mp.Queue()
+    workers = [
+        mp.Process(target=worker, args=(mode, db_path, n, ops, keyspace, batch, results))
+        for n in range(procs)
+    ]
+    start = time.perf_counter()
+    for p in workers:
+        p.start()
+    outcomes = [results.get() for _ in workers]
+    for p in workers:
+        p.join()
+    wall = time.perf_counter() - start
+
+    total_ops = procs * ops
+    errors = sum(e for _, e in outcomes)
+    print(f"  {mode:<10} {procs:>5} {total_ops:>8,} {wall:>8.2f}s {total_ops / wall:>10,.0f} {errors:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procs", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--ops", type=int, default=1000, help="get+set operations per process")
+    parser.add_argument("--keys", type=int, default=500, help="distinct cache keys")
+    parser.add_argument("--batch", type=int, default=20, help="sets per flush in persistent mode")
+    args = parser.parse_args()
+
+    print(f"  {'mode':<10} {'procs':>5} {'ops':>8} {'wall':>9} {'ops/s':>10} {'locked':>8}")
+    for procs in args.procs:
+        for mode in ("legacy", "persistent", "memory"):
+            run(mode, procs, args.ops, args.keys, args.batch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Cache Encoding Benchmark
+========================
+Compares stored size and decode time of the legacy JSON TEXT format
+against the marshal BLOB formats in tools/cache.py, using
+get_financial_statements() payloads (the largest values we cache).
+
+To run:
+    python -m benchmarks.cache_encoding_bench
+    python -m benchmarks.cache_encoding_bench AAPL MSFT NVDA
+
+Payloads come from Yahoo Finance when reachable, then from any
+financials:* rows already in stock_cache.db, and finally from a
+synthetic statement with yfinance's line items so the script
+still runs offline.
+"""
+
+import argparse
+import json
+import marshal
+import random
+import sqlite3
+import time
+import zlib
+
+from config import WATCHLIST
+from tools import cache
+
+LINE_ITEMS = [
+    "Tax Effect Of Unusual Items", "Tax Rate For Calcs", "Normalized EBITDA",
+    "Net Income From Continuing Operation Net Minority Interest", "Reconciled Depreciation",
+    "Reconciled Cost Of Revenue", "EBITDA", "EBIT", "Net Interest Income", "Interest Expense",
+    "Interest Income", "Normalized Income", "Net Income From Continuing And Discontinued Operation",
+    "Total Expenses", "Total Operating Income As Reported", "Diluted Average Shares",
+    "Basic Average Shares", "Diluted EPS", "Basic EPS", "Diluted NI Availto Com Stockholders",
+    "Net Income Common Stockholders", "Net Income", "Net Income Including Noncontrolling Interests",
+    "Net Income Continuous Operations", "Tax Provision", "Pretax Income", "Other Income Expense",
+    "Other Non Operating Income Expenses", "Net Non Operating Interest Income Expense",
+    "Operating Income", "Operating Expense", "Research And Development",
+    "Selling General And Administration", "Gross Profit", "Cost Of Revenue", "Total Revenue",
+    "Operating Revenue", "Total Assets", "Total Debt", "Stockholders Equity", "Cash And Cash Equivalents",
+    "Working Capital", "Invested Capital", "Tangible Book Value", "Net Tangible Assets",
+    "Free Cash Flow", "Capital Expenditure", "Operating Cash Flow", "Repurchase Of Capital Stock",
+    "Issuance Of Debt", "Repayment Of Debt", "Changes In Cash", "End Cash Position",
+]
+
+
+def synthetic_statements(seed):
+    """A statement dict shaped like DataFrame.to_dict() on yfinance output."""
+    rng = random.Random(seed)
+    years = [f"{y}-12-31 00:00:00" for y in range(2021, 2026)]
+
+    def frame():
+        return {
+            year: {item: (None if rng.random() < 0.1 else rng.uniform(-1e10, 1e11)) for item in LINE_ITEMS}
+            for year in years
+        }
+
+    return {"income_statement": frame(), "balance_sheet": frame(), "cash_flow": frame()}
+
+
+def load_payloads(tickers):
+    payloads = []
+    try:
+        from tools.market_data import get_financial_statements
+        for t in tickers:
+            result = get_financial_statements(t)
+            if any(result.values()):
+                payloads.append((t, cache.to_plain(result)))
+    except Exception as e:
+        print(f"  Yahoo Finance unavailable: {e}")
+    if payloads:
+        return payloads, "yahoo"
+
+    try:
+        conn = sqlite3.connect(cache.DB_PATH)
+        rows = conn.execute("SELECT key, value, fmt FROM cache WHERE key LIKE 'financials:%'").fetchall()
+        conn.close()
+        payloads = [(key.split(":", 1)[1], cache.decode_value(value, fmt)) for key, value, fmt in rows]
+    except sqlite3.Error:
+        payloads = []
+    if payloads:
+        return payloads, "stock_cache.db"
+
+    return [(t, synthetic_statements(i)) for i, t in enumerate(tickers)], "synthetic"
+
+
+def time_decode(fn, blob, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(blob)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tickers", nargs="*", default=WATCHLIST)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    payloads, source = load_payloads(args.tickers)
+    print(f"Financial statement payloads from {source}: {len(payloads)}\n")
+
+    formats = {
+        "json text": (
+            lambda v: json.dumps(v, default=str).encode(),
+            lambda b: json.loads(b),
+        ),
+        "marshal": (
+            lambda v: marshal.dumps(v, 4),
+            marshal.loads,
+        ),
+        "marshal+zlib": (
+            lambda v: zlib.compress(marshal.dumps(v, 4), 6),
+            lambda b: marshal.loads(zlib.decompress(b)),
+        ),
+    }
+    if cache.zstandard is not None:
+        formats["marshal+zstd"] = (
+            lambda v: cache.zstandard.ZstdCompressor(level=3).compress(marshal.dumps(v, 4)),
+            lambda b: marshal.loads(cache.zstandard.ZstdDecompressor().decompress(b)),
+        )
+
+    print(f"  {'format':<14} {'avg bytes':>10} {'vs json':>8} {'decode us':>10} {'vs json':>8}")
+    baseline = None
+    for name, (encode, decode) in formats.items():
+        sizes, times = [], []
+        for _, value in payloads:
+            blob = encode(value)
+            sizes.append(len(blob))
+            times.append(time_decode(decode, blob, args.repeat))
+        size = sum(sizes) / len(sizes)
+        decode_us = sum(times) / len(times)
+        if baseline is None:
+            baseline = (size, decode_us)
+        print(
+            f"  {name:<14} {size:>10,.0f} {size / baseline[0]:>7.2f}x "
+            f"{decode_us:>10,.1f} {decode_us / baseline[1]:>7.2f}x"
+        )
+
+    blob, fmt = cache.encode_value(payloads[0][1])
+    print(f"\nset_cached() would store {payloads[0][0]} as {fmt} ({len(blob):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Fundamentals Fetch Benchmark
+============================
+Runs fetch_all_fundamentals() against tools/stubs.StubYahooProvider, a
+fake Yahoo that answers 429 once requests come faster than its rate
+limit. It compares the old fixed 12-thread pool, which swallowed every
+exception, with the AdaptiveFetcher.
+
+To run:
+    python -m benchmarks.fundamentals_bench
+    python -m benchmarks.fundamentals_bench --tickers 1000 --rate 40 --latency 0.05
+
+Reports coverage (fetched/requested), wall time, and how many calls the
+server throttled.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from unittest.mock import patch
+
+import yfinance as yf
+
+from tools import research_engine
+from tools.stubs import StubYahooProvider
+
+
+def legacy_fetch_all_fundamentals(tickers):
+    """fetch_all_fundamentals as it was: fixed pool, errors become missing tickers."""
+    def fetch(ticker):
+        try:
+            return research_engine.fetch_fundamental(ticker)
+        except:
+            return None
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        futures = [executor.submit(fetch, t) for t in tickers]
+        for future in as_completed(futures):
+            data = future.result()
+            if data:
+                results[data["ticker"]] = data
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=600)
+    parser.add_argument("--rate", type=float, default=40.0, help="requests/second the stub server admits")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--capacity", type=int, default=8, help="in-flight calls before latency rises")
+    parser.add_argument("--missing", type=float, default=0.02, help="fraction of symbols with no info")
+    args = parser.parse_args()
+
+    tickers = [f"T{i:05d}" for i in range(args.tickers)]
+    print(f"{args.tickers} tickers, server admits {args.rate:g}/s, base latency {args.latency * 1000:.0f} ms")
+    print(f"{'':<10}{'coverage':>16}{'seconds':>10}{'calls':>8}{'429s':>8}")
+    for name, fn in (("legacy", legacy_fetch_all_fundamentals), ("adaptive", research_engine.fetch_all_fundamentals)):
+        provider = StubYahooProvider(args.rate, latency=args.latency, capacity=args.capacity, missing=args.missing)
+        with patch.object(yf, "Ticker", provider.Ticker):
+            started = time.perf_counter()
+            results = fn(tickers)
+            seconds = time.perf_counter() - started
+        coverage = f"{len(results)}/{len(tickers)} {len(results) / len(tickers):.0%}"
+        print(f"{name:<10}{coverage:>16}{seconds:>10.1f}{provider.calls:>8}{provider.throttled:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Indicator Kernel Benchmark
+==========================
+Times the price-history summary (returns, SMAs, volume ratio) over many
+synthetic series: the old list/sum() implementation one ticker at a time
+versus tools/indicators.py, both through summarize_histories() and as a
+bare indicator_panel() pass over a prebuilt panel.
+
+To run:
+    python -m benchmarks.indicator_bench
+    python -m benchmarks.indicator_bench --series 5000 --days 252
+
+Also checks that the vectorized summaries match the old ones exactly.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from tools.indicators import indicator_panel, summarize_histories
+
+
+def legacy_summary(ticker, period, hist):
+    """get_price_history's summary as it was before the vectorized kernel."""
+    if hist.empty:
+        return {"ticker": ticker, "error": "No price data available"}
+    prices = hist["Close"].tolist()
+    volumes = hist["Volume"].tolist()
+    avg_volume_30d = sum(volumes[-30:]) / min(len(volumes), 30) if volumes else 0
+    current_volume = volumes[-1] if volumes else 0
+    sma_50 = sum(prices[-50:]) / min(len(prices), 50) if len(prices) >= 50 else None
+    sma_200 = sum(prices[-200:]) / min(len(prices), 200) if len(prices) >= 200 else None
+    pct_1d = ((prices[-1] - prices[-2]) / prices[-2] * 100) if len(prices) >= 2 else None
+    pct_1w = ((prices[-1] - prices[-5]) / prices[-5] * 100) if len(prices) >= 5 else None
+    pct_1m = ((prices[-1] - prices[-21]) / prices[-21] * 100) if len(prices) >= 21 else None
+    pct_3m = ((prices[-1] - prices[-63]) / prices[-63] * 100) if len(prices) >= 63 else None
+    return {
+        "ticker": ticker,
+        "period": period,
+        "data_points": len(prices),
+        "current": round(prices[-1], 2),
+        "period_high": round(max(prices), 2),
+        "period_low": round(min(prices), 2),
+        "period_avg": round(sum(prices) / len(prices), 2),
+        "period_start": round(prices[0], 2),
+        "pct_change_total": round((prices[-1] - prices[0]) / prices[0] * 100, 2),
+        "pct_change_1d": round(pct_1d, 2) if pct_1d else None,
+        "pct_change_1w": round(pct_1w, 2) if pct_1w else None,
+        "pct_change_1m": round(pct_1m, 2) if pct_1m else None,
+        "pct_change_3m": round(pct_3m, 2) if pct_3m else None,
+        "sma_50": round(sma_50, 2) if sma_50 else None,
+        "sma_200": round(sma_200, 2) if sma_200 else None,
+        "above_sma_50": prices[-1] > sma_50 if sma_50 else None,
+        "above_sma_200": prices[-1] > sma_200 if sma_200 else None,
+        "current_volume": int(current_volume),
+        "avg_volume_30d": int(avg_volume_30d),
+        "volume_ratio": round(current_volume / avg_volume_30d, 2) if avg_volume_30d else None,
+        "start_date": str(hist.index[0].date()),
+        "end_date": str(hist.index[-1].date()),
+    }
+
+
+def synthetic_histories(series, days, seed=0):
+    """Random-walk OHLCV frames; about a tenth are recent listings with short histories."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2026-01-02", periods=days)
+    histories = {}
+    for i in range(series):
+        length = days if rng.random() > 0.1 else int(rng.integers(1, days))
+        close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+        volume = rng.integers(10_000, 5_000_000, length).astype(float)
+        histories[f"S{i:05d}"] = pd.DataFrame({"Close": close, "Volume": volume}, index=index[-length:])
+    return histories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=252)
+    args = parser.parse_args()
+
+    histories = synthetic_histories(args.series, args.days)
+
+    started = time.perf_counter()
+    legacy = {t: legacy_summary(t, "1y", h) for t, h in histories.items()}
+    legacy_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectorized = summarize_histories(histories, "1y")
+    summaries_s = time.perf_counter() - started
+
+    close = np.full((len(histories), args.days), np.nan)
+    volume = np.full_like(close, np.nan)
+    for row, hist in enumerate(histories.values()):
+        close[row, args.days - len(hist):] = hist["Close"].to_numpy()
+        volume[row, args.days - len(hist):] = hist["Volume"].to_numpy()
+    started = time.perf_counter()
+    indicator_panel(close, volume)
+    kernel_s = time.perf_counter() - started
+
+    mismatches = [t for t in histories if legacy[t] != vectorized[t]]
+    print(f"{args.series} series x {args.days} days")
+    print(f"  legacy per-ticker     {legacy_s * 1000:9.1f} ms")
+    print(f"  summarize_histories   {summaries_s * 1000:9.1f} ms  ({legacy_s / summaries_s:.1f}x)")
+    print(f"  indicator_panel only  {kernel_s * 1000:9.1f} ms  ({legacy_s / kernel_s:.1f}x)")
+    print(f"  mismatching summaries: {len(mismatches)}" + (f" e.g. {mismatches[:3]}" if mismatches else ""))
+
+
+if __name__ == "__main__":
+    main()
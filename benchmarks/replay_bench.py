@@ -0,0 +1,82 @@
+"""
+Offline Pipeline Benchmark
+==========================
+Times analyze_stock, run_alert_scan and run_daily_model against fixtures
+captured by tools/replay.py, so runs are repeatable and need no network
+or API keys.
+
+To run:
+    python -m benchmarks.replay_bench fixtures/today --record     # once, online
+    python -m benchmarks.replay_bench fixtures/today
+    python -m benchmarks.replay_bench fixtures/today --latency recorded --profile 25
+
+--latency takes seconds per call or "recorded" (sleep as long as the
+original call took). The factor model writes to a throwaway screener DB.
+"""
+
+import argparse
+import cProfile
+import io
+import os
+import pstats
+import tempfile
+import time
+
+from config import WATCHLIST
+from tools.replay import Harness
+from tools import research_engine
+import orchestrator
+
+
+def run_target(target, tickers):
+    if target == "analyze":
+        for ticker in tickers:
+            orchestrator.analyze_stock(ticker, run_alerts=False)
+    elif target == "daily":
+        orchestrator.run_daily_research(tickers)
+    elif target == "scan":
+        orchestrator.run_alert_scan(tickers)
+    elif target == "model":
+        research_engine.run_daily_model()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", help="fixture directory")
+    parser.add_argument("--record", action="store_true", help="capture live responses instead of replaying")
+    parser.add_argument("--latency", default="0", help='seconds per replayed call, or "recorded"')
+    parser.add_argument("--tickers", nargs="+", default=WATCHLIST)
+    parser.add_argument("--targets", nargs="+", default=["analyze", "scan", "model"],
+                        choices=["analyze", "daily", "scan", "model"])
+    parser.add_argument("--profile", type=int, default=0, metavar="N",
+                        help="print the N most expensive functions by cumulative time")
+    args = parser.parse_args()
+
+    latency = args.latency if args.latency == "recorded" else float(args.latency)
+    research_engine.DB_NAME = os.path.join(tempfile.mkdtemp(prefix="replay-bench-"), "screener.db")
+
+    results = []
+    for target in args.targets:
+        harness = Harness(args.fixtures, mode="record" if args.record else "replay", latency=latency)
+        profiler = cProfile.Profile() if args.profile else None
+        with harness:
+            started = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            run_target(target, args.tickers)
+            if profiler:
+                profiler.disable()
+            elapsed = time.perf_counter() - started
+        results.append((target, elapsed, dict(harness.counts)))
+        if profiler:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(args.profile)
+            print(out.getvalue())
+
+    print(f"\n{'target':<10}{'seconds':>10}{'anthropic':>11}{'yahoo':>8}{'http':>7}")
+    for target, elapsed, counts in results:
+        print(f"{target:<10}{elapsed:>10.2f}{counts['anthropic']:>11}{counts['yahoo']:>8}{counts['http']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Alert Scan Benchmark
+====================
+Times run_alert_scan() over a synthetic watchlist against
+tools/stubs.StubYahooProvider, a fake Yahoo that answers 429 once requests
+come faster than its rate limit. Price history comes from one batched
+download (stubbed here with random bars); quotes and insider lists are
+fetched per ticker. Compares the scan's own budget (scan_limiter) with
+running the same fan-out through the shared 4 req/s yahoo_limiter.
+
+To run:
+    python -m benchmarks.scan_bench
+    python -m benchmarks.scan_bench --tickers 200 --rate 60 --latency 0.1
+
+Reports wall time, Yahoo calls, and how many the server throttled. The
+tool cache is bypassed, so every ticker is a cold fetch.
+"""
+
+import argparse
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+import orchestrator
+from config import SCAN_REQUESTS_PER_SECOND, YAHOO_REQUESTS_PER_SECOND
+from tools.ratelimit import RateLimiter
+from tools.stubs import StubYahooProvider
+
+
+def synthetic_histories(tickers, period="1y"):
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=252)
+    rng = np.random.default_rng(0)
+    histories = {}
+    for ticker in tickers:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+        histories[ticker] = pd.DataFrame({
+            "Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+            "Volume": rng.integers(1_000_000, 5_000_000, len(dates)).astype(float),
+        }, index=dates)
+    return histories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=60.0, help="requests/second the stub server admits")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--shared", action="store_true", help="also time the shared yahoo_limiter (slow)")
+    args = parser.parse_args()
+
+    watchlist = [f"T{i:04d}" for i in range(args.tickers)]
+    budgets = [("scan", RateLimiter(SCAN_REQUESTS_PER_SECOND, burst=SCAN_REQUESTS_PER_SECOND))]
+    if args.shared:
+        budgets.append(("shared", RateLimiter(YAHOO_REQUESTS_PER_SECOND, burst=YAHOO_REQUESTS_PER_SECOND * 2)))
+
+    print(f"{args.tickers} tickers, server admits {args.rate:g}/s, base latency {args.latency * 1000:.0f} ms")
+    print(f"{'budget':<10}{'seconds':>10}{'calls':>8}{'429s':>8}{'alerts':>8}")
+    for name, limiter in budgets:
+        provider = StubYahooProvider(args.rate, burst=int(args.rate), latency=args.latency)
+        with patch.object(yf, "Ticker", provider.Ticker), \
+                patch.object(orchestrator, "scan_limiter", limiter), \
+                patch.object(orchestrator, "download_price_histories", synthetic_histories), \
+                patch.object(orchestrator, "get_many", lambda keys: {}), \
+                patch.object(orchestrator, "set_many", lambda *a, **k: None), \
+                patch.object(orchestrator, "send_alerts", lambda alerts: None):
+            started = time.perf_counter()
+            alerts = orchestrator.run_alert_scan(watchlist, status_callback=lambda msg: None)
+            seconds = time.perf_counter() - started
+        print(f"{name:<10}{seconds:>10.1f}{provider.calls:>8}{provider.throttled:>8}{len(alerts):>8}")
+
+
+if __name__ == "__main__":
+    main()
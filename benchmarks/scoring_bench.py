@@ -0,0 +1,144 @@
+"""
+Factor Scoring Benchmark
+========================
+Times research_engine.compute_scores() over a synthetic universe: the old
+per-ticker loop (indexing each ticker's frame, .max()/.min()/.mean(),
+pct_change().std(), one dict per row) versus the panel version, at 500,
+3,000 and 8,000 tickers.
+
+To run:
+    python -m benchmarks.scoring_bench
+    python -m benchmarks.scoring_bench --tickers 500 3000 8000 --days 126
+
+Also checks that both produce exactly the same scores frame.
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from tools.panel import PanelWriter
+from tools.research_engine import FACTOR_WEIGHTS, compute_scores, normalize
+
+
+def legacy_compute_scores(valid_tickers, price_data, fundamentals):
+    """compute_scores as it was before the panel rewrite."""
+    rows = []
+    for ticker in valid_tickers:
+        if ticker not in fundamentals:
+            continue
+        f = fundamentals[ticker]
+        df = price_data[ticker]
+        price = df["Close"].iloc[-1]
+        pe = f.get("pe")
+        value_raw = 1 / pe if pe and pe > 0 else 0
+        growth_raw = f.get("revenue_growth") or 0
+        margin = f.get("profit_margin") or 0
+        debt = f.get("debt_to_equity") or 100
+        quality_raw = margin - (debt / 1000)
+        ret_6m = (df["Close"].iloc[-1] / df["Close"].iloc[0]) - 1
+        high = df["High"].max()
+        low = df["Low"].min()
+        bounce_raw = (price - low) / (high - low + 1e-9)
+        target = f.get("analyst_target")
+        analyst_raw = ((target - price) / price) if target else 0
+        liquidity_raw = df["Volume"].mean()
+        volatility_raw = -df["Close"].pct_change().std()
+        rows.append({
+            "ticker": ticker,
+            "price": price,
+            "value_raw": value_raw,
+            "growth_raw": growth_raw,
+            "quality_raw": quality_raw,
+            "momentum_raw": ret_6m,
+            "bounce_raw": bounce_raw,
+            "analyst_raw": analyst_raw,
+            "liquidity_raw": liquidity_raw,
+            "volatility_raw": volatility_raw,
+        })
+
+    df_scores = pd.DataFrame(rows)
+    for col in ["value_raw", "growth_raw", "quality_raw", "momentum_raw",
+                "bounce_raw", "analyst_raw", "liquidity_raw", "volatility_raw"]:
+        df_scores[col.replace("_raw", "_score")] = normalize(df_scores[col])
+    df_scores["total_score"] = (
+        df_scores["value_score"] * FACTOR_WEIGHTS["value"] +
+        df_scores["growth_score"] * FACTOR_WEIGHTS["growth"] +
+        df_scores["quality_score"] * FACTOR_WEIGHTS["quality"] +
+        df_scores["momentum_score"] * FACTOR_WEIGHTS["momentum"] +
+        df_scores["bounce_score"] * FACTOR_WEIGHTS["bounce"] +
+        df_scores["analyst_score"] * FACTOR_WEIGHTS["analyst"] +
+        df_scores["liquidity_score"] * FACTOR_WEIGHTS["liquidity"] +
+        df_scores["volatility_score"] * FACTOR_WEIGHTS["volatility"]
+    )
+    df_scores = df_scores.sort_values("total_score", ascending=False)
+    df_scores["rank"] = range(1, len(df_scores) + 1)
+    return df_scores
+
+
+def synthetic_universe(n, days, path, seed=0):
+    """A price panel written to `path` plus fundamentals; some listings are recent, some fields missing."""
+    rng = np.random.default_rng(seed)
+    calendar = pd.bdate_range(end="2026-01-02", periods=days)
+    tickers = [f"T{i:05d}" for i in range(n)]
+    writer = PanelWriter(calendar, path)
+    fundamentals = {}
+    for ticker in tickers:
+        close = 30 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+        if rng.random() < 0.05:
+            close[:int(rng.integers(1, days // 2))] = np.nan
+        spread = np.abs(rng.normal(0, 0.01, days)) * close
+        writer.append(ticker, pd.DataFrame({
+            "Close": close,
+            "High": close + spread,
+            "Low": close - spread,
+            "Volume": rng.integers(500_000, 20_000_000, days).astype(float),
+        }, index=calendar))
+
+        def maybe(value):
+            return None if rng.random() < 0.1 else float(value)
+
+        fundamentals[ticker] = {
+            "ticker": ticker,
+            "pe": maybe(rng.normal(20, 15)),
+            "forward_pe": maybe(rng.normal(18, 10)),
+            "revenue_growth": maybe(rng.normal(0.08, 0.2)),
+            "earnings_growth": maybe(rng.normal(0.1, 0.3)),
+            "profit_margin": maybe(rng.normal(0.1, 0.1)),
+            "debt_to_equity": maybe(abs(rng.normal(80, 60))),
+            "analyst_target": maybe(close[-1] * rng.normal(1.1, 0.15)),
+        }
+    return tickers, writer.close(), fundamentals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, nargs="+", default=[500, 3000, 8000])
+    parser.add_argument("--days", type=int, default=126)
+    args = parser.parse_args()
+
+    print(f"{'tickers':>8}{'legacy ms':>12}{'panel ms':>12}{'speedup':>9}  identical")
+    for n in args.tickers:
+        with tempfile.TemporaryDirectory() as path:
+            tickers, panel, fundamentals = synthetic_universe(n, args.days, path)
+            # The legacy loop on float64 frames, which is what compute_scores reads the panel as.
+            frames = {t: panel[t].astype(np.float64) for t in tickers}
+
+            started = time.perf_counter()
+            legacy = legacy_compute_scores(tickers, frames, fundamentals)
+            legacy_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            scores = compute_scores(tickers, panel, fundamentals)
+            panel_s = time.perf_counter() - started
+
+            identical = legacy.equals(scores) and list(legacy.index) == list(scores.index)
+            del panel
+        print(f"{n:>8}{legacy_s * 1000:>12.1f}{panel_s * 1000:>12.1f}{legacy_s / panel_s:>8.1f}x  {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -36,4 +36,95 @@ ALERT_PRICE_SPIKE_PCT = 5.0
 ALERT_VOLUME_MULTIPLIER = 2.0
 ALERT_INSIDER_BUY_MIN = 100_000
 ALERT_SHORT_INTEREST_PCT = 20.0
-AUTO_SCAN_INTERVAL_HOURS = 4
\ No newline at end of file
+AUTO_SCAN_INTERVAL_HOURS = 4
+
+# Cache (tools/cache.py)
+CACHE_BUSY_TIMEOUT_MS = 10_000
+CACHE_WRITE_BATCH_SIZE = 32
+CACHE_WRITE_FLUSH_SECONDS = 1.0
+CACHE_MEMORY_MAX_ENTRIES = 512
+CACHE_MEMORY_MAX_BYTES = 32 * 1024 * 1024
+CACHE_COMPRESS_MIN_BYTES = 2048
+CACHE_IN_CHUNK = 500
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+CACHE_VACUUM_PAGES = 2000
+CACHE_COMPACT_INTERVAL_MINUTES = 30
+
+# Per-tool cache lifetimes in seconds
+CACHE_TTL_SECONDS = {
+    "stock_data": 15 * 60,
+    "price_history": 15 * 60,
+    "insider_trades": 6 * 3600,
+    "financials": 7 * 86400,
+    "estimates": 86400,
+    "macro_data": 15 * 60,
+    "sector_perf": 3600,
+    "polymarket": 3600,
+    "news": 30 * 60,
+    "screener": 6 * 3600,
+}
+
+# Stale entries are served (and refreshed in the background) until this hard limit
+CACHE_HARD_TTL_SECONDS = {
+    "stock_data": 3600,
+    "price_history": 6 * 3600,
+    "insider_trades": 2 * 86400,
+    "financials": 30 * 86400,
+    "estimates": 3 * 86400,
+    "macro_data": 6 * 3600,
+    "sector_perf": 86400,
+    "polymarket": 86400,
+    "news": 6 * 3600,
+    "screener": 86400,
+}
+CACHE_REFRESH_WORKERS = 4
+# Tool results that report a fetch failure are kept only this long, so a transient error is retried soon
+CACHE_ERROR_TTL_SECONDS = 60
+
+# Cross-process fetch coalescing: how long a lease holder gets before others fetch anyway
+CACHE_LEASE_SECONDS = 30
+CACHE_LEASE_POLL_SECONDS = 0.1
+
+# Daily-bar store (tools/price_store.py)
+PRICE_STORE_PATH = "prices.db"
+# Bars synced more recently than this are read from the store without asking Yahoo
+PRICE_STORE_REFRESH_MINUTES = 15
+# Relative close difference on the overlap bar that triggers a full re-download
+PRICE_STORE_RESYNC_TOLERANCE = 1e-6
+# Memory-mapped float32 panel of the liquid universe, rewritten by each run_daily_model (tools/panel.py)
+PANEL_DIR = "price_panel"
+
+# Agent loop (orchestrator.py)
+TOOL_MAX_WORKERS = 6
+RESEARCH_WORKERS = 1
+MODEL_REQUESTS_PER_MINUTE = 50
+YAHOO_REQUESTS_PER_SECOND = 4
+# Concurrent quote/insider fetches in run_alert_scan (price history is one batched download)
+SCAN_MAX_WORKERS = 16
+# The scan's own Yahoo budget: two calls per uncached ticker, so 200 tickers take ~10 s
+SCAN_REQUESTS_PER_SECOND = 40
+RUN_METRICS_PATH = "run_metrics.jsonl"
+# One JSONL trace per analyze/daily run ("" turns tracing off); see main.py trace-summary
+TRACE_DIR = "traces"
+# Batch mode (main.py daily --batch): submitted batches are tracked here for --resume
+BATCH_STATE_PATH = "batch_state.json"
+BATCH_POLL_SECONDS = 60
+BATCH_MAX_RETRIES = 1
+# Once the history passes HISTORY_DIGEST_MIN_BYTES, tool results older than
+# HISTORY_KEEP_FULL_TURNS turns are replaced by digests, all in one pass
+HISTORY_DIGEST_MIN_BYTES = 40_000
+HISTORY_KEEP_FULL_TURNS = 1
+HISTORY_DIGEST_CHARS = 300
+
+# Tool results are compacted to these byte budgets before they reach the model
+TOOL_RESULT_BUDGET_BYTES = {
+    "default": 4000,
+    "get_financial_statements": 3000,
+    "get_analyst_estimates": 2500,
+    "get_insider_trades": 2500,
+    "get_polymarket_data": 3000,
+    "get_stock_news": 4000,
+}
+TOOL_RESULT_SIG_FIGS = 4
+TOOL_RESULT_MAX_PERIODS = 3
+TOOL_RESULT_MAX_ROWS = 10
@@ -5,8 +5,19 @@ Usage:
     python main.py analyze AAPL          - Full analysis with Polymarket + scoring
     python main.py daily                 - Analyze all stocks in watchlist
     python main.py daily AAPL MSFT NVDA  - Analyze specific tickers
+    --prefetch                           - (analyze/daily) Fetch all data up front,
+                                           then write the report in one model call
+    --workers N                          - (daily) Analyze N tickers at a time
+    --batch                              - (daily) Submit the watchlist as one Message
+                                           Batches job and wait for the reports
+    --resume BATCH_ID                    - (daily) Collect a previously submitted batch
+    --record DIR                         - Save every API/market-data response to DIR
+    --replay DIR                         - Serve responses from DIR instead of the network
+    --latency SECONDS|recorded           - (replay) Delay added to each replayed call
     python main.py scan                  - Quick alert scan (free, no AI)
     python main.py scan AAPL TSLA        - Scan specific tickers
+    python main.py trace-summary [FILE]  - Where time and tokens went in the last
+                                           (or given) traced run
 
 Web interface:
     streamlit run app.py
@@ -16,12 +27,17 @@ Auto-scan (runs every 4 hours while your PC is on):
 """
 
 import sys
+from contextlib import nullcontext
 from pathlib import Path
 from datetime import date
 
-from orchestrator import analyze_stock, run_daily_research, run_alert_scan
+from orchestrator import (
+    ReportStream, run_daily_research, run_batch_research, unfinished_batches, run_alert_scan,
+)
 from tools.cache import init_cache
-from config import WATCHLIST
+from tools.replay import Harness
+from tools.tracing import trace_run, latest_trace, load_trace, summarize_trace
+from config import WATCHLIST, RESEARCH_WORKERS
 
 
 def save_report(ticker, report, output_dir):
@@ -30,36 +46,50 @@ def save_report(ticker, report, output_dir):
     return filepath
 
 
-def cmd_analyze(ticker):
+def cmd_analyze(ticker, prefetch=False):
     print(f"Analyzing {ticker}...\n")
-    report = analyze_stock(ticker)
+    # Print the report as it is generated instead of a preview at the end.
+    stream = ReportStream(ticker, prefetch=prefetch)
+    for chunk in stream:
+        print(chunk, end="", flush=True)
+    print()
+    report = stream.report
     if not report or not report.strip():
         print("ERROR: Empty report. Try again.")
         return
     output_dir = Path("reports")
     output_dir.mkdir(exist_ok=True)
     filepath = save_report(ticker, report, output_dir)
-    print(f"\nReport saved to {filepath}")
     print("-" * 50)
-    preview = report[:500]
-    if len(report) > 500:
-        preview += "...\n\n(Open the file in reports/ to see full report)"
-    print(preview)
+    print(f"Report saved to {filepath}")
 
 
-def cmd_daily(tickers=None):
+def cmd_daily(tickers=None, prefetch=False, workers=RESEARCH_WORKERS, batch=False, resume=None):
     watchlist = tickers or WATCHLIST
-    print(f"Daily research for {len(watchlist)} stocks: {', '.join(watchlist)}\n")
-    reports = run_daily_research(watchlist)
+    if resume:
+        print(f"Resuming batch {resume}\n")
+    else:
+        print(f"Daily research for {len(watchlist)} stocks: {', '.join(watchlist)}\n")
     output_dir = Path("reports")
     output_dir.mkdir(exist_ok=True)
-    saved = 0
-    for ticker, report in reports.items():
+    saved = []
+
+    # Save each report as soon as its ticker finishes.
+    def on_report(ticker, report):
         if report and report.strip():
             filepath = save_report(ticker, report, output_dir)
             print(f"  Saved: {filepath}")
-            saved += 1
-    print(f"\nDone! {saved}/{len(reports)} reports saved.")
+            saved.append(ticker)
+
+    with trace_run("daily"):
+        if batch or resume:
+            pending = unfinished_batches()
+            if pending and not resume:
+                print(f"Note: batch {pending[-1]} was never collected (python main.py daily --resume {pending[-1]})\n")
+            reports = run_batch_research(watchlist, on_report=on_report, resume=resume)
+        else:
+            reports = run_daily_research(watchlist, prefetch=prefetch, workers=workers, on_report=on_report)
+    print(f"\nDone! {len(saved)}/{len(reports)} reports saved.")
 
 
 def cmd_scan(tickers=None):
@@ -77,6 +107,37 @@ def cmd_scan(tickers=None):
         print("\nAll clear. No alerts.")
 
 
+def cmd_trace_summary(path=None):
+    path = path or latest_trace()
+    if not path:
+        print("No traces found. Run analyze or daily first.")
+        return
+    print(f"Trace: {path}\n")
+    print(summarize_trace(load_trace(path)))
+
+
+def pop_option(argv, name, default=None, convert=str):
+    """Remove `name VALUE` from argv and return convert(VALUE) (or default)."""
+    if name not in argv:
+        return default
+    i = argv.index(name)
+    if i + 1 >= len(argv):
+        print(f"{name} needs a value")
+        sys.exit(1)
+    value = argv[i + 1]
+    del argv[i:i + 2]
+    try:
+        return convert(value)
+    except ValueError:
+        print(f"Bad value for {name}: {value!r}\n")
+        print(__doc__)
+        sys.exit(1)
+
+
+def _latency(value):
+    return value if value == "recorded" else float(value)
+
+
 def main():
     init_cache()
     if len(sys.argv) < 2:
@@ -84,21 +145,39 @@ def main():
         sys.exit(1)
 
     command = sys.argv[1].lower()
-
-    if command == "analyze":
-        if len(sys.argv) < 3:
-            print("Usage: python main.py analyze TICKER")
+    argv = sys.argv[2:]
+    workers = pop_option(argv, "--workers", RESEARCH_WORKERS, convert=int)
+    resume = pop_option(argv, "--resume")
+    record_dir = pop_option(argv, "--record")
+    replay_dir = pop_option(argv, "--replay")
+    latency = pop_option(argv, "--latency", 0.0, convert=_latency)
+    args = [a for a in argv if not a.startswith("--")]
+    prefetch = "--prefetch" in argv
+    batch = "--batch" in argv
+
+    harness = nullcontext()
+    if record_dir:
+        harness = Harness(record_dir, mode="record")
+    elif replay_dir:
+        harness = Harness(replay_dir, mode="replay", latency=latency)
+
+    with harness:
+        if command == "analyze":
+            if not args:
+                print("Usage: python main.py analyze TICKER [--prefetch]")
+                sys.exit(1)
+            cmd_analyze(args[0].upper(), prefetch)
+        elif command == "daily":
+            tickers = [t.upper() for t in args] if args else None
+            cmd_daily(tickers, prefetch, workers, batch, resume)
+        elif command == "trace-summary":
+            cmd_trace_summary(args[0] if args else None)
+        elif command == "scan":
+            tickers = [t.upper() for t in args] if args else None
+            cmd_scan(tickers)
+        else:
+            print(f"Unknown command: '{command}'")
             sys.exit(1)
-        cmd_analyze(sys.argv[2].upper())
-    elif command == "daily":
-        tickers = [t.upper() for t in sys.argv[2:]] if len(sys.argv) > 2 else None
-        cmd_daily(tickers)
-    elif command == "scan":
-        tickers = [t.upper() for t in sys.argv[2:]] if len(sys.argv) > 2 else None
-        cmd_scan(tickers)
-    else:
-        print(f"Unknown command: '{command}'")
-        sys.exit(1)
 
 
 if __name__ == "__main__":
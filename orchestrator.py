@@ -1,21 +1,39 @@
 import anthropic
 import json
+import queue
+import sys
+import threading
+import time
 import yfinance as yf
-
-from config import ANTHROPIC_API_KEY, MODEL_FAST, MAX_TOKENS_PER_STOCK
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+from config import (
+    ANTHROPIC_API_KEY, MODEL_FAST, MAX_TOKENS_PER_STOCK,
+    CACHE_TTL_SECONDS, CACHE_HARD_TTL_SECONDS, TOOL_MAX_WORKERS, RESEARCH_WORKERS, SCAN_MAX_WORKERS, RUN_METRICS_PATH,
+    BATCH_STATE_PATH, BATCH_POLL_SECONDS, BATCH_MAX_RETRIES,
+    HISTORY_DIGEST_MIN_BYTES, HISTORY_KEEP_FULL_TURNS, HISTORY_DIGEST_CHARS,
+)
 from tools.market_data import (
     get_stock_data, get_financial_statements, get_price_history,
     get_insider_trades, get_analyst_estimates, get_macro_data,
-    get_sector_performance,
+    get_sector_performance, TickerSession, download_price_histories,
 )
+from tools.indicators import summarize_histories
 from tools.polymarket import get_polymarket_for_stock
 from tools.news import get_stock_news
-from tools.cache import get_cached, set_cached
+from tools.cache import cache_summary, get_or_fetch, get_many, set_many
 from tools.alerts import check_alerts, send_alerts
+from tools.compaction import compact_tool_output
+from tools.ratelimit import model_limiter, scan_limiter, yahoo_limiter
+from tools.tracing import trace_run, span, annotate, bind
 from prompts.system import ANALYSIS_SYSTEM_PROMPT
 
 client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
 
+# Shared by every analysis in this process, so total tool concurrency stays bounded.
+_tool_pool = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool")
+
 TOOLS = [
     {
         "name": "get_stock_data",
@@ -109,79 +127,173 @@ TOOLS = [
             "required": ["ticker", "company_name"],
         },
     },
+    {
+        "name": "recall_tool_result",
+        "description": (
+            "Retrieve the full output of an earlier tool call whose result has been "
+            "shortened to a digest in the conversation history."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {"tool_use_id": {"type": "string", "description": "id of the earlier tool_use block"}},
+            "required": ["tool_use_id"],
+        },
+    },
 ]
 
 
-def execute_tool(name: str, input_data: dict) -> str:
+# Prompt-cache breakpoints: the tool list and system prompt never change, so
+# they are cached once and reused by every turn of every analysis.
+CACHE_CONTROL = {"type": "ephemeral"}
+CACHED_TOOLS = TOOLS[:-1] + [{**TOOLS[-1], "cache_control": CACHE_CONTROL}]
+CACHED_SYSTEM = [{"type": "text", "text": ANALYSIS_SYSTEM_PROMPT, "cache_control": CACHE_CONTROL}]
+
+
+def _with_cache_breakpoint(messages):
+    """
+    Copy of `messages` with a breakpoint on the last block of the final user
+    message, so the conversation so far is read from cache on the next turn.
+    Stored messages are left untouched, which keeps at most one moving
+    breakpoint (plus tools and system) in each request.
+    """
+    last = messages[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    content = content[:-1] + [{**content[-1], "cache_control": CACHE_CONTROL}]
+    return messages[:-1] + [{**last, "content": content}]
+
+
+def _add_usage(totals, usage):
+    totals["input_tokens"] += usage.input_tokens
+    totals["output_tokens"] += usage.output_tokens
+    totals["cache_read_input_tokens"] += getattr(usage, "cache_read_input_tokens", None) or 0
+    totals["cache_creation_input_tokens"] += getattr(usage, "cache_creation_input_tokens", None) or 0
+
+
+def _new_usage():
+    return {
+        "input_tokens": 0, "output_tokens": 0,
+        "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0,
+    }
+
+
+# Tools whose fetch hits Yahoo, and roughly how many requests one fetch makes.
+YAHOO_REQUEST_COST = {
+    "stock_data": 1, "financials": 3, "price_history": 1, "insider_trades": 1,
+    "estimates": 2, "macro_data": 3, "sector_perf": 11,
+}
+
+
+def is_error_result(result) -> bool:
+    """
+    Fetchers report failures as data instead of raising: {"error": ...},
+    [{"error": ...}] for insider trades, or a "[News fetch error: ...]" item.
+    """
+    if isinstance(result, dict):
+        return "error" in result
+    if isinstance(result, list) and len(result) == 1 and isinstance(result[0], dict):
+        return "error" in result[0] or str(result[0].get("title", "")).startswith("[News fetch error")
+    return False
+
+
+def _cached_tool(cache_key: str, ttl_name: str, fetch) -> str:
+    if ttl_name in YAHOO_REQUEST_COST:
+        fetch = yahoo_limiter.wrap(fetch, YAHOO_REQUEST_COST[ttl_name])
+    fetched = []
+
+    def fetch_and_note():
+        fetched.append(True)
+        return fetch()
+
+    result = get_or_fetch(
+        cache_key, fetch_and_note,
+        ttl_seconds=CACHE_TTL_SECONDS[ttl_name],
+        hard_ttl_seconds=CACHE_HARD_TTL_SECONDS[ttl_name],
+        is_error=is_error_result,
+    )
+    # A stale hit refreshed in the background still counts as a hit here.
+    annotate(cache="miss" if fetched else "hit", cache_key=cache_key)
+    return json.dumps(result, default=str)
+
+
+def execute_tool(name: str, input_data: dict, session: TickerSession = None) -> str:
+    """
+    Run one tool call. Pass the run's TickerSession so tools share Yahoo
+    responses (e.g. one `info` fetch for stock data and estimates).
+    """
+    with span("tool", name) as trace:
+        output = _execute_tool(name, input_data, session)
+        trace["bytes"] = len(output)
+        try:
+            result = json.loads(output)
+        except ValueError:
+            result = None
+        if is_error_result(result):
+            item = result if isinstance(result, dict) else result[0]
+            trace["error"] = str(item.get("error") or item.get("title"))
+        return output
+
+
+def _execute_tool(name: str, input_data: dict, session: TickerSession = None) -> str:
     try:
         if name == "get_stock_data":
-            cache_key = f"stock_data:{input_data['ticker']}"
-            cached = get_cached(cache_key)
-            if cached:
-                return json.dumps(cached, default=str)
-            result = get_stock_data(input_data["ticker"])
-            result_dict = result.model_dump()
-            set_cached(cache_key, result_dict, ttl_days=1)
-            return json.dumps(result_dict, default=str)
+            return _cached_tool(
+                f"stock_data:{input_data['ticker']}", "stock_data",
+                lambda: get_stock_data(input_data["ticker"], session).model_dump(),
+            )
 
         elif name == "get_financial_statements":
-            cache_key = f"financials:{input_data['ticker']}"
-            cached = get_cached(cache_key)
-            if cached:
-                return json.dumps(cached, default=str)
-            result = get_financial_statements(input_data["ticker"])
-            set_cached(cache_key, result, ttl_days=7)
-            return json.dumps(result, default=str)
+            return _cached_tool(
+                f"financials:{input_data['ticker']}", "financials",
+                lambda: get_financial_statements(input_data["ticker"], session),
+            )
 
         elif name == "get_price_history":
-            result = get_price_history(input_data["ticker"], input_data.get("period", "1y"))
-            return json.dumps(result, default=str)
+            period = input_data.get("period", "1y")
+            return _cached_tool(
+                f"price_history:{input_data['ticker']}:{period}", "price_history",
+                lambda: get_price_history(input_data["ticker"], period, session),
+            )
 
         elif name == "get_insider_trades":
-            return json.dumps(get_insider_trades(input_data["ticker"]), default=str)
+            return _cached_tool(
+                f"insider_trades:{input_data['ticker']}", "insider_trades",
+                lambda: get_insider_trades(input_data["ticker"], session),
+            )
 
         elif name == "get_analyst_estimates":
-            cache_key = f"estimates:{input_data['ticker']}"
-            cached = get_cached(cache_key)
-            if cached:
-                return json.dumps(cached, default=str)
-            result = get_analyst_estimates(input_data["ticker"])
-            set_cached(cache_key, result, ttl_days=1)
-            return json.dumps(result, default=str)
+            return _cached_tool(
+                f"estimates:{input_data['ticker']}", "estimates",
+                lambda: get_analyst_estimates(input_data["ticker"], session),
+            )
 
         elif name == "get_macro_data":
-            cache_key = "macro_data"
-            cached = get_cached(cache_key)
-            if cached:
-                return json.dumps(cached, default=str)
-            result = get_macro_data()
-            set_cached(cache_key, result, ttl_days=1)
-            return json.dumps(result, default=str)
+            return _cached_tool("macro_data", "macro_data", lambda: get_macro_data(session))
 
         elif name == "get_sector_performance":
-            cache_key = "sector_perf"
-            cached = get_cached(cache_key)
-            if cached:
-                return json.dumps(cached, default=str)
-            result = get_sector_performance(input_data.get("sector_etf"))
-            set_cached(cache_key, result, ttl_days=1)
-            return json.dumps(result, default=str)
+            sector_etf = input_data.get("sector_etf")
+            return _cached_tool(
+                f"sector_perf:{sector_etf}" if sector_etf else "sector_perf", "sector_perf",
+                lambda: get_sector_performance(sector_etf, session),
+            )
 
         elif name == "get_polymarket_data":
-            cache_key = f"polymarket:{input_data['ticker']}"
-            cached = get_cached(cache_key)
-            if cached:
-                return json.dumps(cached, default=str)
-            result = get_polymarket_for_stock(input_data["ticker"], input_data["company_name"])
-            set_cached(cache_key, result, ttl_days=1)
-            return json.dumps(result, default=str)
+            return _cached_tool(
+                f"polymarket:{input_data['ticker']}", "polymarket",
+                lambda: get_polymarket_for_stock(input_data["ticker"], input_data["company_name"]),
+            )
 
         elif name == "get_stock_news":
-            result = get_stock_news(
-                input_data["ticker"], input_data["company_name"],
-                input_data.get("max_articles", 10),
+            max_articles = input_data.get("max_articles", 10)
+            return _cached_tool(
+                f"news:{input_data['ticker']}:{max_articles}", "news",
+                lambda: [
+                    item.model_dump() for item in get_stock_news(
+                        input_data["ticker"], input_data["company_name"], max_articles,
+                    )
+                ],
             )
-            return json.dumps([item.model_dump() for item in result], default=str)
 
         else:
             return json.dumps({"error": f"Unknown tool: {name}"})
@@ -190,131 +302,673 @@ def execute_tool(name: str, input_data: dict) -> str:
         return json.dumps({"error": f"{type(e).__name__}: {e}"})
 
 
-def analyze_stock(ticker: str, status_callback=None, run_alerts=True) -> str:
+def execute_tools(calls, session: TickerSession = None) -> list[str]:
+    """Run (name, input) tool calls concurrently; outputs come back in call order."""
+    if len(calls) == 1:
+        return [execute_tool(*calls[0], session)]
+    return list(_tool_pool.map(lambda run: run(), [bind(execute_tool, *call, session) for call in calls]))
+
+
+def _prefetch_calls(ticker, company_name):
+    return [
+        ("get_stock_data", {"ticker": ticker}),
+        ("get_financial_statements", {"ticker": ticker}),
+        ("get_price_history", {"ticker": ticker, "period": "1y"}),
+        ("get_insider_trades", {"ticker": ticker}),
+        ("get_analyst_estimates", {"ticker": ticker}),
+        ("get_macro_data", {}),
+        ("get_sector_performance", {}),
+        ("get_polymarket_data", {"ticker": ticker, "company_name": company_name}),
+        ("get_stock_news", {"ticker": ticker, "company_name": company_name}),
+    ]
+
+
+def _workflow_prompt(ticker, company_name):
+    return (
+        f"Research and analyze {company_name} (ticker: {ticker}). Follow this workflow:\n\n"
+        f"1. Fetch current stock data for {ticker}.\n"
+        f"2. Fetch financial statements.\n"
+        f"3. Get 1-year price history with moving averages.\n"
+        f"4. Fetch insider transactions.\n"
+        f"5. Fetch analyst estimates and price targets.\n"
+        f"6. Fetch macro data (S&P 500, VIX, yields).\n"
+        f"7. Fetch sector performance.\n"
+        f"8. Fetch Polymarket prediction market data.\n"
+        f"9. Fetch recent news.\n"
+        f"10. Produce comprehensive analysis with scoring.\n\n"
+        f"Be quantitative. Include the full scorecard. Include Polymarket signals."
+    )
+
+
+def _prefetch_prompt(ticker, company_name, calls, outputs):
+    sections = "\n\n".join(
+        f"## {name}\n```json\n{output}\n```" for (name, _), output in zip(calls, outputs)
+    )
+    return (
+        f"Research and analyze {company_name} (ticker: {ticker}).\n\n"
+        f"All research inputs have already been fetched and are included below: stock data, "
+        f"financial statements, 1-year price history, insider transactions, analyst estimates, "
+        f"macro data, sector performance, Polymarket markets and recent news. Only call a tool "
+        f"if something essential is missing or returned an error.\n\n"
+        f"{sections}\n\n"
+        f"Produce the comprehensive analysis with scoring now. "
+        f"Be quantitative. Include the full scorecard. Include Polymarket signals."
+    )
+
+
+def _digest(tool_use_id, name, content):
+    if len(content) <= HISTORY_DIGEST_CHARS * 2:
+        return content
+    return (
+        f"[Digest of {name} result, {len(content):,} bytes, already used in an earlier turn. "
+        f"Preview: {content[:HISTORY_DIGEST_CHARS]}... "
+        f"Call recall_tool_result with tool_use_id \"{tool_use_id}\" for the full data.]"
+    )
+
+
+def _digest_history(messages, tool_store, digested):
+    """
+    Replace every tool result the model has already responded to with a
+    short digest, except the newest HISTORY_KEEP_FULL_TURNS tool-result
+    messages. Full outputs remain in tool_store for recall_tool_result.
+    Returns True if anything changed.
+
+    The agent loop runs this in passes, each time the history has grown by
+    HISTORY_DIGEST_MIN_BYTES. Between passes the history only grows at the
+    end, so every turn reads the previous turn's prefix from the prompt
+    cache. A pass rewrites the history from the first newly digested
+    message on, and that one turn writes the shorter history to the cache.
+    """
+    result_turns = [
+        i for i, m in enumerate(messages)
+        if m["role"] == "user" and isinstance(m["content"], list)
+        and m["content"] and m["content"][0].get("type") == "tool_result"
+    ]
+    changed = False
+    for i in result_turns[:-HISTORY_KEEP_FULL_TURNS or None]:
+        if i in digested:
+            continue
+        messages[i] = {**messages[i], "content": [
+            {**block, "content": _digest(block["tool_use_id"], tool_store[block["tool_use_id"]][0], block["content"])}
+            for block in messages[i]["content"]
+        ]}
+        digested.add(i)
+        changed = True
+    return changed
+
+
+def _json_default(obj):
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "__dict__"):
+        return vars(obj)
+    return str(obj)
+
+
+def _usage_line(totals):
+    cached = totals["cache_read_input_tokens"]
+    prompt = cached + totals["input_tokens"] + totals["cache_creation_input_tokens"]
+    share = cached / prompt * 100 if prompt else 0
+    return (
+        f"Input: {cached:,} cached ({share:.0f}%), {totals['input_tokens']:,} uncached, "
+        f"{totals['cache_creation_input_tokens']:,} cache writes. Output: {totals['output_tokens']:,}"
+    )
+
+
+def _record_run(metrics):
+    try:
+        with open(RUN_METRICS_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(metrics) + "\n")
+    except OSError:
+        pass
+
+
+def _create_message(on_text=None, **params):
+    """messages.create, or messages.stream with each text delta passed to on_text."""
+    model_limiter.acquire()
+    if on_text is None:
+        return client.messages.create(**params)
+    with client.messages.stream(**params) as stream:
+        for text in stream.text_stream:
+            on_text(text)
+        return stream.get_final_message()
+
+
+def _company_name(ticker, session=None):
     try:
-        company_name = yf.Ticker(ticker).info.get('longName', ticker)
+        yahoo_limiter.acquire()
+        stock = session.ticker(ticker) if session else yf.Ticker(ticker)
+        return stock.info.get('longName', ticker)
     except:
-        company_name = ticker
+        return ticker
 
-    def update_status(msg):
+
+def _collect_alert_input(collected, name, output):
+    if name in ("get_stock_data", "get_price_history", "get_insider_trades"):
+        try:
+            collected[name] = json.loads(output)
+        except:
+            pass
+
+
+def _prefetched_prompt(ticker, company_name, collected, session=None):
+    calls = _prefetch_calls(ticker, company_name)
+    outputs = execute_tools(calls, session)
+    for (name, _), output in zip(calls, outputs):
+        _collect_alert_input(collected, name, output)
+    outputs = [compact_tool_output(name, output) for (name, _), output in zip(calls, outputs)]
+    return _prefetch_prompt(ticker, company_name, calls, outputs)
+
+
+def _check_collected_alerts(ticker, collected, update_status):
+    stock_data = collected.get("get_stock_data")
+    price_data = collected.get("get_price_history")
+    if not (stock_data and price_data):
+        return
+    update_status("Checking alerts...")
+    alerts = check_alerts(ticker, stock_data, price_data, collected.get("get_insider_trades", []))
+    if alerts:
+        update_status(f"{len(alerts)} alerts triggered!")
+        send_alerts(alerts)
+    else:
+        update_status("No alerts triggered")
+
+
+def analyze_stock(ticker: str, status_callback=None, run_alerts=True, prefetch=False, usage=None,
+                  on_text=None) -> str:
+    """
+    Run the research agent for one ticker and return the markdown report.
+    If a `usage` dict is passed, this run's token counts are added into it.
+    If `on_text` is passed, responses are streamed and it receives every text
+    delta plus short progress lines for tool calls (see ReportStream).
+    """
+    with trace_run(f"analyze-{ticker}"), span("analysis", ticker, ticker=ticker, prefetch=prefetch):
+        return _analyze_stock(ticker, status_callback, run_alerts, prefetch, usage, on_text)
+
+
+def _analyze_stock(ticker, status_callback, run_alerts, prefetch, usage, on_text):
+    started = time.perf_counter()
+    session = TickerSession()
+    company_name = _company_name(ticker, session)
+
+    def update_status(msg, streamed=False):
+        # Status goes to status_callback when there is one, else to stdout.
+        # While streaming, stdout belongs to on_text: status goes to stderr,
+        # and lines on_text has already shown are not repeated.
         if status_callback:
             status_callback(msg)
-        print(f"  {msg}")
-
-    messages = [
-        {
-            "role": "user",
-            "content": (
-                f"Research and analyze {company_name} (ticker: {ticker}). Follow this workflow:\n\n"
-                f"1. Fetch current stock data for {ticker}.\n"
-                f"2. Fetch financial statements.\n"
-                f"3. Get 1-year price history with moving averages.\n"
-                f"4. Fetch insider transactions.\n"
-                f"5. Fetch analyst estimates and price targets.\n"
-                f"6. Fetch macro data (S&P 500, VIX, yields).\n"
-                f"7. Fetch sector performance.\n"
-                f"8. Fetch Polymarket prediction market data.\n"
-                f"9. Fetch recent news.\n"
-                f"10. Produce comprehensive analysis with scoring.\n\n"
-                f"Be quantitative. Include the full scorecard. Include Polymarket signals."
-            ),
-        }
-    ]
-
-    total_input_tokens = 0
-    total_output_tokens = 0
-    collected_stock_data = {}
-    collected_price_data = {}
-    collected_insider_data = []
-
-    while (total_input_tokens + total_output_tokens) < MAX_TOKENS_PER_STOCK:
-        response = client.messages.create(
-            model=MODEL_FAST,
-            max_tokens=6000,
-            system=ANALYSIS_SYSTEM_PROMPT,
-            tools=TOOLS,
-            messages=messages,
+        elif on_text is None:
+            print(f"  {msg}")
+        elif not streamed:
+            print(f"  {msg}", file=sys.stderr)
+
+    collected = {}
+
+    def collect(name, output):
+        _collect_alert_input(collected, name, output)
+
+    if prefetch:
+        if on_text:
+            on_text("_Prefetching research data..._\n\n")
+        update_status("Prefetching all research data...", streamed=True)
+        prompt = _prefetched_prompt(ticker, company_name, collected, session)
+    else:
+        prompt = _workflow_prompt(ticker, company_name)
+
+    messages = [{"role": "user", "content": prompt}]
+
+    totals = _new_usage()
+    model_calls = 0
+    tool_store = {}
+    digested = set()
+    # History size right after the last digest pass.
+    digest_floor = 0
+    turns = []
+
+    def finish(result):
+        _record_run({
+            "ticker": ticker,
+            "mode": "prefetch" if prefetch else "agentic",
+            "date": str(date.today()),
+            "seconds": round(time.perf_counter() - started, 2),
+            "model_calls": model_calls,
+            "yahoo_fetches": session.fetches,
+            **totals,
+            "turns": turns,
+        })
+        if usage is not None:
+            for name, count in totals.items():
+                usage[name] = usage.get(name, 0) + count
+        return result
+
+    # Cached input still occupies the context, so it counts toward the budget.
+    while sum(totals.values()) < MAX_TOKENS_PER_STOCK:
+        history_bytes = len(json.dumps(messages, default=_json_default))
+        digest_pass = (
+            history_bytes - digest_floor > HISTORY_DIGEST_MIN_BYTES
+            and _digest_history(messages, tool_store, digested)
+        )
+        if digest_pass:
+            history_bytes = digest_floor = len(json.dumps(messages, default=_json_default))
+        with span("model", MODEL_FAST, turn=model_calls + 1, bytes=history_bytes) as trace:
+            response = _create_message(
+                on_text,
+                model=MODEL_FAST,
+                max_tokens=6000,
+                system=CACHED_SYSTEM,
+                tools=CACHED_TOOLS,
+                messages=_with_cache_breakpoint(messages),
+            )
+            model_calls += 1
+            turn = _new_usage()
+            _add_usage(turn, response.usage)
+            trace.update(turn, stop_reason=response.stop_reason)
+        for name, count in turn.items():
+            totals[name] += count
+        turn["turn"] = model_calls
+        turn["history_bytes"] = history_bytes
+        turn["digested"] = digest_pass
+        turns.append(turn)
+        update_status(
+            f"Turn {model_calls}: {turn['input_tokens'] + turn['cache_read_input_tokens'] + turn['cache_creation_input_tokens']:,} "
+            f"input ({turn['cache_read_input_tokens']:,} cached), {turn['output_tokens']:,} output, "
+            f"history {turn['history_bytes'] / 1024:.1f} KB"
         )
-
-        total_input_tokens += response.usage.input_tokens
-        total_output_tokens += response.usage.output_tokens
 
         tool_results = []
-        final_text = ""
-
-        for block in response.content:
-            if block.type == "text":
-                final_text += block.text
-            elif block.type == "tool_use":
-                update_status(f"Calling {block.name}...")
-                tool_output = execute_tool(block.name, block.input)
-                tool_results.append({
-                    "type": "tool_result",
-                    "tool_use_id": block.id,
-                    "content": tool_output,
-                })
-                try:
-                    parsed = json.loads(tool_output)
-                    if block.name == "get_stock_data":
-                        collected_stock_data = parsed
-                    elif block.name == "get_price_history":
-                        collected_price_data = parsed
-                    elif block.name == "get_insider_trades":
-                        collected_insider_data = parsed
-                except:
-                    pass
+        final_text = "".join(block.text for block in response.content if block.type == "text")
+        tool_blocks = [block for block in response.content if block.type == "tool_use"]
+
+        for block in tool_blocks:
+            if on_text:
+                on_text(f"\n\n_Calling {block.name}..._\n\n")
+            update_status(f"Calling {block.name}...", streamed=True)
+
+        fetch_blocks = [block for block in tool_blocks if block.name != "recall_tool_result"]
+        fetched = iter(execute_tools([(block.name, block.input) for block in fetch_blocks], session))
+        for block in tool_blocks:
+            if block.name == "recall_tool_result":
+                stored = tool_store.get(block.input.get("tool_use_id"))
+                tool_output = content = stored[1] if stored else json.dumps({"error": "Unknown tool_use_id"})
+            else:
+                tool_output = next(fetched)
+                collect(block.name, tool_output)
+                content = compact_tool_output(block.name, tool_output)
+            # The model sees the compacted text; recall hands back the raw output.
+            tool_store[block.id] = (block.name, tool_output)
+            tool_results.append({
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "content": content,
+            })
 
         if response.stop_reason == "end_turn":
-            tokens_used = total_input_tokens + total_output_tokens
-            update_status(f"Done! {tokens_used:,} total tokens")
+            tokens_used = sum(totals.values())
+            elapsed = time.perf_counter() - started
+            update_status(f"Done! {tokens_used:,} total tokens, {model_calls} model calls, {elapsed:.1f}s")
+            update_status(_usage_line(totals))
+            update_status(cache_summary())
 
-            if run_alerts and collected_stock_data and collected_price_data:
-                update_status("Checking alerts...")
-                alerts = check_alerts(ticker, collected_stock_data, collected_price_data, collected_insider_data)
-                if alerts:
-                    update_status(f"{len(alerts)} alerts triggered!")
-                    send_alerts(alerts)
-                else:
-                    update_status("No alerts triggered")
+            if run_alerts:
+                _check_collected_alerts(ticker, collected, update_status)
 
-            return final_text
+            return finish(final_text)
 
         messages.append({"role": "assistant", "content": response.content})
         messages.append({"role": "user", "content": tool_results})
 
-    return f"WARNING: Token budget exceeded for {ticker}"
+    return finish(f"WARNING: Token budget exceeded for {ticker}")
+
 
+_STREAM_DONE = object()
+
+
+class ReportStream:
+    """
+    Runs analyze_stock in a background thread and yields its text as it is
+    generated: tool progress lines plus the model's output, final report
+    included. Fits st.write_stream or a print loop. Once iteration ends,
+    `.report` holds the finished report (the same string analyze_stock
+    returns) and any exception from the analysis is re-raised.
+    """
+
+    def __init__(self, ticker, **kwargs):
+        self.ticker = ticker
+        self.report = None
+        self._kwargs = kwargs
+        self._queue = queue.Queue()
+        self._error = None
+        # Bound here so the analysis joins any trace the caller has open.
+        self._thread = threading.Thread(target=bind(self._run), daemon=True)
+
+    def _run(self):
+        try:
+            self.report = analyze_stock(self.ticker, on_text=self._queue.put, **self._kwargs)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._queue.put(_STREAM_DONE)
+
+    def __iter__(self):
+        if self._thread.ident is not None:
+            raise RuntimeError("ReportStream can only be iterated once")
+        self._thread.start()
+        while True:
+            chunk = self._queue.get()
+            if chunk is _STREAM_DONE:
+                break
+            yield chunk
+        self._thread.join()
+        if self._error:
+            raise self._error
+
+
+def _tool_cache_keys(ticker):
+    return [
+        f"stock_data:{ticker}", f"financials:{ticker}", f"price_history:{ticker}:1y",
+        f"insider_trades:{ticker}", f"estimates:{ticker}", f"polymarket:{ticker}",
+        f"news:{ticker}:10",
+    ]
+
+
+def run_daily_research(watchlist, status_callback=None, prefetch=False, workers=RESEARCH_WORKERS, on_report=None):
+    """
+    Analyze every ticker in the watchlist, `workers` at a time.
+    on_report(ticker, report) is called as soon as each ticker finishes.
+    """
+    # One round trip to pull whatever is already cached into the memory tier.
+    get_many(
+        [key for ticker in watchlist for key in _tool_cache_keys(ticker)]
+        + ["macro_data", "sector_perf"],
+        allow_stale=True,
+    )
+    status_lock = threading.Lock()
+
+    def report_status(msg, gap=False):
+        with status_lock:
+            if status_callback:
+                status_callback(msg)
+            else:
+                print(f"\n{msg}" if gap else msg)
+
+    def run_one(i, ticker):
+        report_status(f"[{i}/{len(watchlist)}] Analyzing {ticker}...", gap=True)
+        # Tag lines with the ticker once several analyses interleave.
+        callback = status_callback
+        if workers > 1:
+            callback = lambda msg: report_status(f"[{ticker}] {msg}")
+        usage = _new_usage()
+        try:
+            report = analyze_stock(ticker, callback, prefetch=prefetch, usage=usage)
+        except Exception as e:
+            report = f"# {ticker}\n\nError: {e}"
+        if on_report:
+            try:
+                on_report(ticker, report)
+            except Exception as e:
+                report_status(f"[{ticker}] Could not save report: {e}")
+        return report, usage
 
-def run_daily_research(watchlist, status_callback=None):
     reports = {}
-    for i, ticker in enumerate(watchlist, 1):
+    usage = _new_usage()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(bind(run_one, i, ticker)): ticker
+            for i, ticker in enumerate(watchlist, 1)
+        }
+        for future in as_completed(futures):
+            report, run_usage = future.result()
+            reports[futures[future]] = report
+            for name, count in run_usage.items():
+                usage[name] += count
+    report_status(f"Watchlist tokens. {_usage_line(usage)}", gap=True)
+    report_status(cache_summary())
+    return {ticker: reports[ticker] for ticker in watchlist if ticker in reports}
+
+
+def _load_batch_state():
+    try:
+        with open(BATCH_STATE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_batch_state(state):
+    with open(BATCH_STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+
+def unfinished_batches():
+    """IDs of submitted batches whose results have not been collected yet, oldest first."""
+    return [batch_id for batch_id, info in _load_batch_state().items() if not info.get("collected")]
+
+
+def _batch_params(prompt):
+    return {
+        "model": MODEL_FAST,
+        "max_tokens": 6000,
+        "system": CACHED_SYSTEM,
+        "tools": CACHED_TOOLS,
+        # A batch request gets a single turn, so the report has to come back without tool calls.
+        "tool_choice": {"type": "none"},
+        "messages": _with_cache_breakpoint([{"role": "user", "content": prompt}]),
+    }
+
+
+def submit_research_batch(watchlist, status_callback=None, run_alerts=True, retry_of=None):
+    """
+    Prefetch every ticker's research data and submit all the prompts as one
+    Message Batches job. Returns the batch ID, which is also recorded in
+    BATCH_STATE_PATH so the run can be resumed.
+    """
+    def update_status(msg):
         if status_callback:
-            status_callback(f"[{i}/{len(watchlist)}] Analyzing {ticker}...")
-        else:
-            print(f"\n[{i}/{len(watchlist)}] Analyzing {ticker}...")
+            status_callback(msg)
+        print(f"  {msg}")
+
+    requests = []
+    tickers = {}
+    for i, ticker in enumerate(watchlist, 1):
+        update_status(f"[{i}/{len(watchlist)}] Prefetching {ticker}...")
         try:
-            report = analyze_stock(ticker, status_callback)
-            reports[ticker] = report
+            with span("prefetch", ticker, ticker=ticker):
+                collected = {}
+                session = TickerSession()
+                prompt = _prefetched_prompt(ticker, _company_name(ticker, session), collected, session)
+                if run_alerts:
+                    _check_collected_alerts(ticker, collected, update_status)
         except Exception as e:
-            reports[ticker] = f"# {ticker}\n\nError: {e}"
+            update_status(f"Skipping {ticker}: {e}")
+            continue
+        # custom_id only allows [A-Za-z0-9_-], which rules out tickers like BRK.B.
+        custom_id = f"req-{i}"
+        tickers[custom_id] = ticker
+        requests.append({"custom_id": custom_id, "params": _batch_params(prompt)})
+
+    if not requests:
+        raise RuntimeError("Nothing to submit: prefetch failed for every ticker")
+
+    model_limiter.acquire()
+    batch = client.messages.batches.create(requests=requests)
+    state = _load_batch_state()
+    state[batch.id] = {
+        "submitted": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "tickers": tickers,
+        "retry_of": retry_of,
+        "collected": False,
+    }
+    _save_batch_state(state)
+    update_status(f"Submitted batch {batch.id} with {len(requests)} requests "
+                  f"(resume with: python main.py daily --resume {batch.id})")
+    return batch.id
+
+
+def collect_research_batch(batch_id, status_callback=None, on_report=None, poll_seconds=BATCH_POLL_SECONDS):
+    """
+    Wait for a submitted batch to end and return (reports, failed_tickers).
+    Reports are passed to on_report(ticker, report) as the results are read.
+    """
+    def update_status(msg):
+        if status_callback:
+            status_callback(msg)
+        print(f"  {msg}")
+
+    state = _load_batch_state()
+    if batch_id not in state:
+        raise KeyError(f"Unknown batch {batch_id}; not found in {BATCH_STATE_PATH}")
+    tickers = state[batch_id]["tickers"]
+
+    while True:
+        batch = client.messages.batches.retrieve(batch_id)
+        if batch.processing_status == "ended":
+            break
+        counts = batch.request_counts
+        update_status(f"Batch {batch_id}: {counts.processing} processing, "
+                      f"{counts.succeeded} succeeded, {counts.errored} errored")
+        time.sleep(poll_seconds)
+
+    reports = {}
+    failed = []
+    usage = _new_usage()
+    for entry in client.messages.batches.results(batch_id):
+        ticker = tickers.get(entry.custom_id)
+        if ticker is None:
+            continue
+        if entry.result.type != "succeeded":
+            update_status(f"{ticker}: request {entry.result.type}")
+            failed.append(ticker)
+            continue
+        message = entry.result.message
+        report = "".join(block.text for block in message.content if block.type == "text")
+        if not report.strip():
+            failed.append(ticker)
+            continue
+        totals = _new_usage()
+        _add_usage(totals, message.usage)
+        for name, count in totals.items():
+            usage[name] += count
+        _record_run({
+            "ticker": ticker,
+            "mode": "batch",
+            "batch_id": batch_id,
+            "date": str(date.today()),
+            "model_calls": 1,
+            **totals,
+        })
+        reports[ticker] = report
+        if on_report:
+            on_report(ticker, report)
+
+    # Tickers whose request never made it into the results count as failed too.
+    failed += [t for t in tickers.values() if t not in reports and t not in failed]
+    state = _load_batch_state()
+    state[batch_id]["collected"] = True
+    state[batch_id]["failed"] = failed
+    _save_batch_state(state)
+    update_status(f"Batch {batch_id}: {len(reports)} reports, {len(failed)} failed. {_usage_line(usage)}")
+    return reports, failed
+
+
+def run_batch_research(watchlist=None, status_callback=None, on_report=None, resume=None,
+                       max_retries=BATCH_MAX_RETRIES, poll_seconds=BATCH_POLL_SECONDS):
+    """
+    Overnight mode: one Message Batches job for the whole watchlist, with
+    failed tickers resubmitted up to max_retries times. Pass `resume` to pick
+    up a previously submitted batch instead of submitting a new one.
+    """
+    batch_id = resume or submit_research_batch(watchlist, status_callback)
+    reports = {}
+    for attempt in range(max_retries + 1):
+        results, failed = collect_research_batch(batch_id, status_callback, on_report, poll_seconds)
+        reports.update(results)
+        if not failed or attempt == max_retries:
+            break
+        # Data is cached by now, so this round only pays for the model calls.
+        batch_id = submit_research_batch(failed, status_callback, run_alerts=False, retry_of=batch_id)
+    for ticker in failed:
+        reports[ticker] = f"# {ticker}\n\nError: batch request failed"
+        if on_report:
+            on_report(ticker, reports[ticker])
     return reports
 
 
 def run_alert_scan(watchlist, status_callback=None):
-    all_alerts = []
-    for ticker in watchlist:
+    def update_status(msg):
         if status_callback:
-            status_callback(f"Scanning {ticker}...")
+            status_callback(msg)
         else:
-            print(f"Scanning {ticker}...")
+            print(msg)
+
+    all_alerts = []
+    keys = {
+        "stock_data": lambda t: f"stock_data:{t}",
+        "price_history": lambda t: f"price_history:{t}:1y",
+        "insider_trades": lambda t: f"insider_trades:{t}",
+    }
+    fetchers = {
+        "stock_data": lambda t: get_stock_data(t).model_dump(),
+        "price_history": lambda t: get_price_history(t, "1y"),
+        "insider_trades": get_insider_trades,
+    }
+    # The scan's own Yahoo budget, however many workers it runs.
+    fetchers = {
+        ttl_name: scan_limiter.wrap(fetch, YAHOO_REQUEST_COST[ttl_name])
+        for ttl_name, fetch in fetchers.items()
+    }
+    cached = get_many([key(t) for key in keys.values() for t in watchlist])
+    fetched = {ttl_name: {} for ttl_name in keys}
+
+    # Price history for every uncached ticker in one multi-ticker download.
+    need_prices = [t for t in watchlist if keys["price_history"](t) not in cached]
+    if need_prices:
+        update_status(f"Downloading 1y history for {len(need_prices)} tickers...")
         try:
-            stock_data = get_stock_data(ticker).model_dump()
-            price_data = get_price_history(ticker, "1y")
-            insider_data = get_insider_trades(ticker)
+            histories = download_price_histories(need_prices, "1y")
+        except Exception as e:
+            update_status(f"  Batch download failed ({e}), fetching one by one")
+            histories = {}
+        for ticker, summary in summarize_histories(histories, "1y").items():
+            fetched["price_history"][keys["price_history"](ticker)] = summary
+
+    # Everything else (quotes, insider trades, tickers the download missed) concurrently.
+    jobs = [
+        (ticker, ttl_name)
+        for ticker in watchlist for ttl_name, key in keys.items()
+        if key(ticker) not in cached and key(ticker) not in fetched[ttl_name]
+    ]
+    errors = {}
+    if jobs:
+        update_status(f"Fetching {len(jobs)} quotes/insider lists...")
+        with ThreadPoolExecutor(max_workers=SCAN_MAX_WORKERS) as pool:
+            futures = {pool.submit(fetchers[ttl_name], ticker): (ticker, ttl_name) for ticker, ttl_name in jobs}
+            for future in as_completed(futures):
+                ticker, ttl_name = futures[future]
+                try:
+                    fetched[ttl_name][keys[ttl_name](ticker)] = future.result()
+                except Exception as e:
+                    errors.setdefault(ticker, e)
+
+    for ticker in watchlist:
+        update_status(f"Scanning {ticker}...")
+        if ticker in errors:
+            print(f"  Error scanning {ticker}: {errors[ticker]}")
+            continue
+        try:
+            stock_data, price_data, insider_data = (
+                cached[key(ticker)] if key(ticker) in cached else fetched[ttl_name][key(ticker)]
+                for ttl_name, key in keys.items()
+            )
             alerts = check_alerts(ticker, stock_data, price_data, insider_data)
             all_alerts.extend(alerts)
         except Exception as e:
             print(f"  Error scanning {ticker}: {e}")
+    for ttl_name, items in fetched.items():
+        set_many(
+            {key: value for key, value in items.items() if not is_error_result(value)},
+            ttl_seconds=CACHE_TTL_SECONDS[ttl_name],
+            hard_ttl_seconds=CACHE_HARD_TTL_SECONDS[ttl_name],
+        )
     if all_alerts:
         send_alerts(all_alerts)
-    return all_alerts
\ No newline at end of file
+    return all_alerts
@@ -0,0 +1,64 @@
+import json
+import time
+
+import pytest
+
+import orchestrator
+from tools import cache, tracing
+from tools.ratelimit import RateLimiter
+
+
+# Tool output per tool name; large enough that the history digest kicks in.
+TOOL_OUTPUTS = {
+    "get_stock_data": {"ticker": "ACME", "price": 42.0, "notes": "x" * 3000},
+    "get_price_history": {"ticker": "ACME", "current": 42.0, "notes": "y" * 3000},
+    "get_macro_data": {"vix": 15.2, "notes": "z" * 3000},
+}
+
+# Slower first tools, so results finish out of call order.
+TOOL_DELAYS = {"get_stock_data": 0.15, "get_price_history": 0.05}
+
+
+@pytest.fixture
+def offline(monkeypatch, tmp_path, scratch_cache):
+    """
+    Cut orchestrator off from the network: canned tool output, a fixed company
+    name, no alerts, an unthrottled model limiter, run metrics captured in a
+    list instead of RUN_METRICS_PATH, and traces and the tool cache under
+    tmp_path. Install a stub with offline.client(stub).
+    """
+    runs = []
+
+    def fake_tool(name, input_data, session=None):
+        time.sleep(TOOL_DELAYS.get(name, 0))
+        return json.dumps(TOOL_OUTPUTS.get(name, {"tool": name, "input": input_data}))
+
+    monkeypatch.setattr(orchestrator, "_execute_tool", fake_tool)
+    monkeypatch.setattr(orchestrator, "_company_name", lambda ticker, session=None: f"{ticker} Corp")
+    monkeypatch.setattr(orchestrator, "check_alerts", lambda *args: [])
+    monkeypatch.setattr(orchestrator, "model_limiter", RateLimiter(1000, burst=1000))
+    monkeypatch.setattr(orchestrator, "_record_run", runs.append)
+    monkeypatch.setattr(orchestrator, "BATCH_STATE_PATH", str(tmp_path / "batch_state.json"))
+    monkeypatch.setattr(tracing, "TRACE_DIR", str(tmp_path / "traces"))
+
+    class Offline:
+        def client(self, stub):
+            monkeypatch.setattr(orchestrator, "client", stub)
+            return stub
+
+    env = Offline()
+    env.runs = runs
+    return env
+
+
+@pytest.fixture
+def scratch_cache(monkeypatch, tmp_path):
+    """The tool cache on a fresh database in tmp_path, with an empty memory tier and zeroed stats."""
+    cache.flush_cache()
+    monkeypatch.setattr(cache, "DB_PATH", str(tmp_path / "cache.db"))
+    cache.clear_memory_cache()
+    cache.reset_cache_stats()
+    cache.init_cache()
+    yield cache
+    cache.close_cache()
+    cache.clear_memory_cache()
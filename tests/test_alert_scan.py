@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+import orchestrator
+from tools.ratelimit import RateLimiter
+
+
+class CountingLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(1000, burst=1000)
+        self.spent = 0
+        self._count_lock = threading.Lock()
+
+    def acquire(self, cost=1):
+        with self._count_lock:
+            self.spent += cost
+        super().acquire(cost)
+
+
+class _Quote:
+    def model_dump(self):
+        return {"price": 1.0}
+
+
+@pytest.fixture
+def scan(offline, monkeypatch):
+    calls = []
+
+    def fetcher(name, value):
+        def fetch(ticker, *args):
+            calls.append((name, ticker))
+            return value
+        return fetch
+
+    monkeypatch.setattr(orchestrator, "get_stock_data", fetcher("stock_data", _Quote()))
+    monkeypatch.setattr(orchestrator, "get_price_history", fetcher("price_history", {"current": 1.0}))
+    monkeypatch.setattr(orchestrator, "get_insider_trades", fetcher("insider_trades", []))
+    monkeypatch.setattr(orchestrator, "download_price_histories", lambda tickers, period: {})
+    monkeypatch.setattr(orchestrator, "set_many", lambda *args, **kwargs: None)
+    monkeypatch.setattr(orchestrator, "send_alerts", lambda alerts: None)
+    limiter = CountingLimiter()
+    monkeypatch.setattr(orchestrator, "scan_limiter", limiter)
+    return calls, limiter
+
+
+def test_scan_fetches_go_through_the_scan_limiter(scan, monkeypatch):
+    calls, limiter = scan
+    monkeypatch.setattr(orchestrator, "get_many", lambda keys: {})
+    orchestrator.run_alert_scan(["AAA", "BBB"], status_callback=lambda msg: None)
+
+    assert len(calls) == 6
+    assert limiter.spent == sum(orchestrator.YAHOO_REQUEST_COST[name] for name, _ in calls)
+
+
+def test_cached_empty_results_are_not_refetched(scan, monkeypatch):
+    calls, limiter = scan
+    cached = {"stock_data:AAA": {"price": 1.0}, "price_history:AAA:1y": {}, "insider_trades:AAA": []}
+    monkeypatch.setattr(orchestrator, "get_many", lambda keys: cached)
+    orchestrator.run_alert_scan(["AAA"], status_callback=lambda msg: None)
+
+    assert calls == []
+    assert limiter.spent == 0
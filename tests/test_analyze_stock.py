@@ -0,0 +1,138 @@
+import json
+
+import orchestrator
+from tests.conftest import TOOL_OUTPUTS
+from tools.stubs import StubAnthropicClient
+
+TOOL_TURN = [
+    ("get_stock_data", {"ticker": "ACME"}),
+    ("get_price_history", {"ticker": "ACME", "period": "1y"}),
+    ("get_macro_data", {}),
+]
+
+
+def _script():
+    return [TOOL_TURN, [("get_stock_data", {"ticker": "ACME"})], "# ACME report"]
+
+
+def _prompt_tokens(usage):
+    return usage["input_tokens"] + usage["cache_read_input_tokens"] + usage["cache_creation_input_tokens"]
+
+
+def test_report_is_final_text(offline):
+    offline.client(StubAnthropicClient(_script()))
+    assert orchestrator.analyze_stock("ACME", run_alerts=False) == "# ACME report"
+
+
+def test_tool_results_follow_call_order(offline):
+    stub = offline.client(StubAnthropicClient(_script()))
+    orchestrator.analyze_stock("ACME", run_alerts=False)
+
+    # Second request: prompt, assistant tool_use turn, user tool_result turn.
+    messages = stub.calls[1]["messages"]
+    tool_uses = [block for block in messages[1]["content"] if block.type == "tool_use"]
+    results = messages[2]["content"]
+    assert [r["tool_use_id"] for r in results] == [b.id for b in tool_uses]
+    assert '"price":42' in results[0]["content"]
+    assert '"vix":15.2' in results[2]["content"]
+
+
+def test_cached_run_reads_conversation_prefix(offline):
+    stub = offline.client(StubAnthropicClient(_script()))
+    usage = {}
+    orchestrator.analyze_stock("ACME", run_alerts=False, usage=usage)
+    turns = offline.runs[-1]["turns"]
+
+    # Turn 1 writes tools + system + prompt; later turns read at least that much back.
+    assert turns[0]["cache_read_input_tokens"] == 0
+    assert turns[0]["cache_creation_input_tokens"] > 0
+    assert turns[1]["cache_read_input_tokens"] >= turns[0]["cache_creation_input_tokens"]
+    assert usage["cache_read_input_tokens"] == sum(t["cache_read_input_tokens"] for t in turns)
+    assert len(stub.calls) == 3
+
+
+def test_cached_and_uncached_runs_send_the_same_prompt(offline, monkeypatch):
+    offline.client(StubAnthropicClient(_script()))
+    cached = {}
+    orchestrator.analyze_stock("ACME", run_alerts=False, usage=cached)
+
+    monkeypatch.setattr(orchestrator, "CACHED_TOOLS", orchestrator.TOOLS)
+    monkeypatch.setattr(orchestrator, "CACHED_SYSTEM", orchestrator.ANALYSIS_SYSTEM_PROMPT)
+    monkeypatch.setattr(orchestrator, "_with_cache_breakpoint", lambda messages: messages)
+    offline.client(StubAnthropicClient(_script()))
+    uncached = {}
+    orchestrator.analyze_stock("ACME", run_alerts=False, usage=uncached)
+
+    assert uncached["cache_read_input_tokens"] == 0
+    assert uncached["cache_creation_input_tokens"] == 0
+    assert _prompt_tokens(cached) == _prompt_tokens(uncached)
+    assert cached["input_tokens"] < uncached["input_tokens"] / 2
+    assert cached["output_tokens"] == uncached["output_tokens"]
+
+
+def test_second_analysis_reuses_tools_and_system(offline):
+    stub = offline.client(StubAnthropicClient(["# Report"]))
+    orchestrator.analyze_stock("ACME", run_alerts=False)
+    first = offline.runs[-1]["turns"][0]
+    orchestrator.analyze_stock("ACME", run_alerts=False)
+    second = offline.runs[-1]["turns"][0]
+
+    assert first["cache_read_input_tokens"] == 0
+    # Same ticker, same prompt: the whole prefix comes from cache.
+    assert second["cache_read_input_tokens"] == _prompt_tokens(first)
+    assert second["cache_creation_input_tokens"] == 0
+    assert len(stub.calls) == 2
+
+
+def test_cache_reads_grow_until_a_digest_pass(offline, monkeypatch):
+    # Six tool turns of ~9 KB each against a 20 KB digest threshold.
+    monkeypatch.setattr(orchestrator, "HISTORY_DIGEST_MIN_BYTES", 20_000)
+    offline.client(StubAnthropicClient([TOOL_TURN] * 6 + ["# ACME report"]))
+    orchestrator.analyze_stock("ACME", run_alerts=False)
+    turns = offline.runs[-1]["turns"]
+
+    passes = [t["turn"] for t in turns if t["digested"]]
+    assert passes
+    # Passes are spaced out, not one per turn.
+    assert all(b - a >= 3 for a, b in zip(passes, passes[1:]))
+    for prev, turn in zip(turns, turns[1:]):
+        if turn["digested"]:
+            assert turn["history_bytes"] < prev["history_bytes"]
+            assert turn["cache_read_input_tokens"] < _prompt_tokens(prev)
+        else:
+            # Unchanged history: this turn reads everything the last one sent.
+            assert turn["cache_read_input_tokens"] == _prompt_tokens(prev)
+            assert turn["cache_read_input_tokens"] > prev["cache_read_input_tokens"]
+
+
+def test_short_history_is_never_digested(offline):
+    stub = offline.client(StubAnthropicClient(_script()))
+    orchestrator.analyze_stock("ACME", run_alerts=False)
+    assert not any(t["digested"] for t in offline.runs[-1]["turns"])
+    assert "Digest of" not in str(stub.calls[-1]["messages"])
+
+
+def test_streamed_run_keeps_status_off_stdout(offline, capsys):
+    offline.client(StubAnthropicClient(_script()))
+    chunks = list(orchestrator.ReportStream("ACME", run_alerts=False))
+    out, err = capsys.readouterr()
+
+    assert out == ""
+    assert "Turn 1:" in err
+    # Tool progress is shown once, in the stream.
+    assert "Calling" not in err
+    assert sum("_Calling get_stock_data..._" in c for c in chunks) == 2
+
+
+def test_recall_returns_the_raw_tool_output(offline, monkeypatch):
+    monkeypatch.setattr(orchestrator, "compact_tool_output", lambda name, output: output[:40])
+    stub = offline.client(StubAnthropicClient([
+        [("get_stock_data", {"ticker": "ACME"})],
+        [("recall_tool_result", {"tool_use_id": "toolu_stub_1"})],
+        "# ACME report",
+    ]))
+    orchestrator.analyze_stock("ACME", run_alerts=False)
+
+    fetched, recalled = stub.calls[2]["messages"][2]["content"], stub.calls[2]["messages"][4]["content"]
+    assert len(fetched[0]["content"]) == 40
+    assert recalled[0]["content"] == json.dumps(TOOL_OUTPUTS["get_stock_data"])
@@ -0,0 +1,59 @@
+import json
+
+import orchestrator
+from tools.stubs import StubBatchClient
+
+
+def _state():
+    with open(orchestrator.BATCH_STATE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_batch_reports_every_ticker(offline):
+    stub = offline.client(StubBatchClient(["# Batch report"], polls=2))
+    saved = {}
+    reports = orchestrator.run_batch_research(
+        ["AAA", "BBB"], on_report=lambda t, r: saved.update({t: r}), poll_seconds=0,
+    )
+    assert reports == {"AAA": "# Batch report", "BBB": "# Batch report"}
+    assert saved == reports
+    assert len(stub.batches) == 1
+    assert orchestrator.unfinished_batches() == []
+    # Batch requests get one turn, so tool use is switched off.
+    request = next(iter(stub.batches.values()))["requests"][0]
+    assert request["params"]["tool_choice"] == {"type": "none"}
+
+
+def test_errored_requests_are_resubmitted(offline):
+    stub = offline.client(StubBatchClient(["# Batch report"], errored={"req-2"}))
+    reports = orchestrator.run_batch_research(["AAA", "BBB", "CCC"], poll_seconds=0, max_retries=1)
+
+    assert reports == {t: "# Batch report" for t in ("AAA", "BBB", "CCC")}
+    first, retry = stub.batches
+    assert [r["custom_id"] for r in stub.batches[retry]["requests"]] == ["req-1"]
+    state = _state()
+    assert state[first]["failed"] == ["BBB"]
+    assert state[retry]["retry_of"] == first
+    assert state[retry]["tickers"] == {"req-1": "BBB"}
+
+
+def test_retries_exhausted_report_an_error(offline):
+    # "req-1" errors in every batch, including the retry that resubmits it as req-1.
+    offline.client(StubBatchClient(["# Batch report"], errored={"req-1"}))
+    reports = orchestrator.run_batch_research(["AAA", "BBB"], poll_seconds=0, max_retries=1)
+
+    assert reports["BBB"] == "# Batch report"
+    assert reports["AAA"] == "# AAA\n\nError: batch request failed"
+
+
+def test_resume_collects_without_resubmitting(offline):
+    stub = offline.client(StubBatchClient(["# Batch report"], polls=1))
+    batch_id = orchestrator.submit_research_batch(["AAA", "BBB"])
+    assert orchestrator.unfinished_batches() == [batch_id]
+
+    reports = orchestrator.run_batch_research(resume=batch_id, poll_seconds=0)
+
+    assert reports == {"AAA": "# Batch report", "BBB": "# Batch report"}
+    assert list(stub.batches) == [batch_id]
+    assert orchestrator.unfinished_batches() == []
+    assert _state()[batch_id]["collected"] is True
@@ -0,0 +1,200 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from config import CACHE_ERROR_TTL_SECONDS
+from tools import cache
+
+
+def test_memory_tier_charges_the_uncompressed_size(scratch_cache):
+    # Compresses well; ~250 KB once decoded.
+    value = {"rows": [f"row {i} of financials" for i in range(10_000)]}
+    blob, fmt = cache.encode_value(value)
+    assert fmt != cache.FMT_MARSHAL and len(blob) < 50_000
+
+    cache.set_cached("financials:ACME", value)
+    charged = cache.cache_stats()["memory"]["bytes"]
+    assert charged > 100_000
+
+    # A disk hit is charged the same.
+    cache.flush_cache()
+    cache.clear_memory_cache()
+    assert cache.get_cached("financials:ACME") == value
+    assert cache.cache_stats()["memory"]["bytes"] == charged
+
+
+def test_cache_summary_reports_hits(scratch_cache):
+    cache.set_cached("stock_data:ACME", {"price": 1.0})
+    cache.get_cached("stock_data:ACME")
+    cache.get_cached("stock_data:NONE")
+    line = cache.cache_summary()
+    assert "memory 1/2 hits (50%)" in line
+    assert "sqlite 0/1 hits" in line
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _stale(key, value):
+    cache.set_cached(key, value, ttl_seconds=0.01, hard_ttl_seconds=60)
+    time.sleep(0.02)
+
+
+def test_miss_from_many_threads_fetches_once(scratch_cache):
+    calls = []
+    start = threading.Barrier(8)
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"price": 1.0}
+
+    def worker():
+        start.wait()
+        return cache.get_or_fetch("stock_data:ACME", fetch, ttl_seconds=60)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: worker(), range(8)))
+    assert len(calls) == 1
+    assert results == [{"price": 1.0}] * 8
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(scratch_cache):
+    _stale("stock_data:ACME", {"price": 1.0})
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"price": 2.0}
+
+    started = time.perf_counter()
+    served = [cache.get_or_fetch("stock_data:ACME", fetch, ttl_seconds=60) for _ in range(5)]
+    # No caller waits on the fetch before the hard TTL.
+    assert time.perf_counter() - started < 1.0
+    assert served == [{"price": 1.0}] * 5
+
+    release.set()
+    _wait_until(lambda: cache.get_cached("stock_data:ACME") == {"price": 2.0})
+    assert len(calls) == 1
+    refresh = cache.cache_stats()["refresh"]
+    assert refresh["stale_served"] == 5
+    assert refresh["scheduled"] == 1
+
+
+def test_refresh_drops_an_error_result(scratch_cache):
+    _stale("stock_data:ACME", {"price": 1.0})
+    cache.get_or_fetch("stock_data:ACME", lambda: {"error": "429"}, ttl_seconds=60,
+                       is_error=lambda value: "error" in value)
+    _wait_until(lambda: cache.cache_stats()["refresh"]["failed"] == 1)
+
+    assert cache.get_cached("stock_data:ACME", allow_stale=True) == {"price": 1.0}
+
+
+def test_error_result_on_a_miss_is_cached_briefly(scratch_cache):
+    cache.get_or_fetch("stock_data:ACME", lambda: {"error": "429"}, ttl_seconds=3600,
+                       is_error=lambda value: "error" in value)
+    expires = cache._connect().execute(
+        "SELECT expires FROM cache WHERE key = 'stock_data:ACME'"
+    ).fetchone()[0]
+    assert expires - time.time() <= CACHE_ERROR_TTL_SECONDS
+
+
+def test_waits_for_a_lease_held_by_another_process(scratch_cache, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_LEASE_POLL_SECONDS", 0.01)
+    cache._connect().execute(
+        "INSERT INTO cache_leases VALUES ('stock_data:ACME', 'peer', ?)", (time.time() + 30,)
+    )
+
+    def peer_publishes():
+        time.sleep(0.1)
+        # Written straight to the file, as the other process would.
+        blob, fmt = cache.encode_value({"price": 3.0})
+        conn = sqlite3.connect(cache.DB_PATH)
+        conn.execute(
+            "INSERT INTO cache (key, value, fmt, stale_at, expires) VALUES (?, ?, ?, ?, ?)",
+            ("stock_data:ACME", blob, fmt, time.time() + 60, time.time() + 60),
+        )
+        conn.execute("DELETE FROM cache_leases")
+        conn.commit()
+        conn.close()
+
+    threading.Thread(target=peer_publishes).start()
+    value = cache.get_or_fetch("stock_data:ACME", lambda: pytest.fail("fetched despite the lease"),
+                               ttl_seconds=60)
+    assert value == {"price": 3.0}
+
+
+def _fetch_in_process(db_path, log_path):
+    cache.DB_PATH = db_path
+
+    def fetch():
+        with open(log_path, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        # Long enough for the other processes to start and find the lease.
+        time.sleep(1.5)
+        return {"price": 4.0}
+
+    return cache.get_or_fetch("stock_data:ACME", fetch, ttl_seconds=60)
+
+
+def test_processes_share_one_fetch(scratch_cache, tmp_path):
+    log = tmp_path / "fetches.log"
+    with ProcessPoolExecutor(3, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_fetch_in_process, cache.DB_PATH, str(log)) for _ in range(3)]
+        results = [f.result() for f in futures]
+    assert results == [{"price": 4.0}] * 3
+    assert len(log.read_text().split()) == 1
+
+
+def test_legacy_text_rows_migrate_and_read_back(monkeypatch, tmp_path):
+    # The schema stock_cache.db was created with: JSON text, ISO-date expiry.
+    path = tmp_path / "legacy.db"
+    later = (date.today() + timedelta(days=2)).isoformat()
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE cache (key TEXT PRIMARY KEY, value TEXT, expires TEXT)")
+    conn.executemany("INSERT INTO cache VALUES (?, ?, ?)", [
+        ("stock_data:HOOD", json.dumps({"ticker": "HOOD", "price": 75.26}), later),
+        ("insider_trades:HOOD", json.dumps([]), later),
+        ("macro_data", json.dumps({"vix": 20.1}), "2026-02-18"),
+    ])
+    conn.commit()
+    conn.close()
+
+    cache.flush_cache()
+    monkeypatch.setattr(cache, "DB_PATH", str(path))
+    cache.clear_memory_cache()
+    try:
+        cache.init_cache()
+        conn = cache._connect()
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(cache)")}
+        assert columns["expires"] == "REAL"
+        expires = conn.execute("SELECT expires FROM cache WHERE key = 'stock_data:HOOD'").fetchone()[0]
+        assert expires == datetime.fromisoformat(later).replace(tzinfo=timezone.utc).timestamp()
+
+        assert cache.get_cached("stock_data:HOOD") == {"ticker": "HOOD", "price": 75.26}
+        cache.clear_memory_cache()
+        assert cache.get_many(["stock_data:HOOD", "insider_trades:HOOD", "macro_data"]) == {
+            "stock_data:HOOD": {"ticker": "HOOD", "price": 75.26},
+            "insider_trades:HOOD": [],
+        }
+        # New writes land next to the legacy rows as marshal blobs.
+        cache.set_cached("macro_data", {"vix": 18.0})
+        cache.flush_cache()
+        cache.clear_memory_cache()
+        assert cache.get_cached("macro_data") == {"vix": 18.0}
+    finally:
+        cache.close_cache()
+        cache.clear_memory_cache()
@@ -0,0 +1,29 @@
+import orchestrator
+from tools.stubs import StubAnthropicClient
+
+
+def test_concurrent_analyses_tag_every_status_line(offline, capsys):
+    offline.client(StubAnthropicClient(["# Report"]))
+    reports = orchestrator.run_daily_research(["AAA", "BBB", "CCC"], workers=3)
+    out = capsys.readouterr().out
+
+    assert set(reports) == {"AAA", "BBB", "CCC"}
+    turn_lines = [line for line in out.splitlines() if "Turn 1:" in line]
+    assert len(turn_lines) == 3
+    assert all(line.split()[0] in ("[AAA]", "[BBB]", "[CCC]") for line in turn_lines)
+
+
+def test_sequential_run_prints_untagged_lines(offline, capsys):
+    offline.client(StubAnthropicClient(["# Report"]))
+    orchestrator.run_daily_research(["AAA"], workers=1)
+    out = capsys.readouterr().out
+    assert "  Turn 1:" in out
+    assert "[AAA] Turn" not in out
+
+
+def test_callback_receives_tagged_lines(offline):
+    offline.client(StubAnthropicClient(["# Report"]))
+    lines = []
+    orchestrator.run_daily_research(["AAA", "BBB"], status_callback=lines.append, workers=2)
+    assert any(line.startswith("[AAA] Turn 1:") for line in lines)
+    assert any(line.startswith("[BBB] Turn 1:") for line in lines)
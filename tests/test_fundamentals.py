@@ -0,0 +1,72 @@
+import pytest
+import yfinance as yf
+
+from tools import research_engine
+from tools.adaptive import AdaptiveFetcher
+from tools.stubs import StubYahooProvider
+
+TICKERS = [f"T{i:03d}" for i in range(200)]
+
+
+@pytest.fixture
+def fetchers(monkeypatch):
+    """The AdaptiveFetcher instances fetch_all_fundamentals creates, for their reports."""
+    created = []
+
+    class Recording(AdaptiveFetcher):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(research_engine, "AdaptiveFetcher", Recording)
+    return created
+
+
+def _serve(monkeypatch, provider):
+    monkeypatch.setattr(yf, "Ticker", provider.Ticker)
+    return provider
+
+
+def test_full_coverage_under_throttling(monkeypatch, fetchers):
+    provider = _serve(monkeypatch, StubYahooProvider(rate=200, burst=10, latency=0.01, missing=0.1))
+    results = research_engine.fetch_all_fundamentals(TICKERS)
+    report = fetchers[0].report
+
+    assert provider.throttled > 0
+    assert report["failed"] == 0
+    # Every symbol that has info is fetched; the rest are counted as empty.
+    assert len(results) + report["empty"] == len(TICKERS)
+    assert report["empty"] > 0
+    assert all(results[t]["ticker"] == t for t in results)
+
+
+def test_concurrency_drops_when_throttled(monkeypatch, fetchers):
+    _serve(monkeypatch, StubYahooProvider(rate=100, burst=5, latency=0.01))
+    research_engine.fetch_all_fundamentals(TICKERS[:100])
+    workers = fetchers[0].report["workers"]
+
+    assert workers["min"] < workers["start"]
+    assert workers["final"] < workers["start"]
+
+
+def test_other_errors_fail_without_retry(monkeypatch, fetchers):
+    provider = StubYahooProvider(rate=1000, burst=1000, latency=0.001)
+    calls = {}
+    info = provider.info
+
+    def broken_info(symbol):
+        calls[symbol] = calls.get(symbol, 0) + 1
+        if symbol in ("T001", "T002"):
+            raise ValueError("malformed response")
+        return info(symbol)
+
+    monkeypatch.setattr(provider, "info", broken_info)
+    _serve(monkeypatch, provider)
+    results = research_engine.fetch_all_fundamentals(TICKERS[:20])
+    report = fetchers[0].report
+
+    assert set(report["errors"]) == {"T001", "T002"}
+    assert report["errors"]["T001"] == "ValueError: malformed response"
+    assert calls["T001"] == calls["T002"] == 1
+    assert report["retries"] == 0
+    assert len(results) == 18
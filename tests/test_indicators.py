@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.indicator_bench import legacy_summary, synthetic_histories
+from tools.indicators import summarize_histories
+
+INDEX = pd.bdate_range(end="2026-01-02", periods=252)
+
+
+def _frame(close, volume):
+    return pd.DataFrame({"Close": close, "Volume": volume}, index=INDEX[-len(close):])
+
+
+def _assert_matches_legacy(histories):
+    summaries = summarize_histories(histories, "1y")
+    for ticker, hist in histories.items():
+        assert summaries[ticker] == legacy_summary(ticker, "1y", hist), ticker
+
+
+def test_random_walks_match_the_old_summary():
+    _assert_matches_legacy(synthetic_histories(500, 252, seed=3))
+
+
+def test_every_window_boundary_matches():
+    # Lengths either side of each return offset and SMA window.
+    rng = np.random.default_rng(4)
+    histories = {}
+    for length in (1, 2, 3, 4, 5, 6, 20, 21, 22, 29, 30, 31, 49, 50, 51, 62, 63, 64, 199, 200, 201, 252):
+        close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+        histories[f"L{length}"] = _frame(close, rng.integers(10_000, 5_000_000, length).astype(float))
+    _assert_matches_legacy(histories)
+
+
+def test_edge_values_match():
+    histories = {
+        # Unchanged price: every change is 0.0, which has always been reported as None.
+        "FLAT": _frame(np.full(252, 10.0), np.full(252, 1e6)),
+        # No volume: no ratio.
+        "NOVOL": _frame(np.linspace(10, 20, 60), np.zeros(60)),
+        "EMPTY": pd.DataFrame(columns=["Close", "Volume"]),
+    }
+    _assert_matches_legacy({t: h for t, h in histories.items() if t != "EMPTY"})
+    assert summarize_histories(histories, "1y")["EMPTY"] == legacy_summary("EMPTY", "1y", histories["EMPTY"])
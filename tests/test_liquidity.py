@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from tools import research_engine
+from tools.panel import open_panel
+
+CALENDAR = pd.bdate_range("2026-01-05", periods=20)
+
+
+def _bars(close=50.0, volume=1_000_000):
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": volume},
+                        index=CALENDAR)
+
+
+@pytest.fixture
+def universe(monkeypatch, tmp_path):
+    """filter_liquid_stocks on a bar store stub, writing its panel under tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(research_engine, "PRICE_CHUNK_BACKOFF_SECONDS", 0)
+    requests = []
+    throttled = set()
+
+    def get_bars(tickers, period):
+        # A throttled ticker comes back empty the first time it is asked for.
+        requests.append(list(tickers))
+        bars = {t: pd.DataFrame() if t in throttled else _bars() for t in tickers}
+        throttled.difference_update(tickers)
+        return bars
+
+    monkeypatch.setattr(research_engine, "get_bars", get_bars)
+    return requests, throttled
+
+
+def test_tickers_missing_from_a_chunk_are_retried(universe):
+    requests, throttled = universe
+    throttled.update({"BBB", "DDD"})
+    valid, panel = research_engine.filter_liquid_stocks(["AAA", "BBB", "CCC", "DDD"], chunk_size=2)
+
+    assert requests == [["SPY"], ["AAA", "BBB"], ["CCC", "DDD"], ["BBB", "DDD"]]
+    assert valid == ["AAA", "CCC", "BBB", "DDD"]
+    assert all(t in panel for t in valid + ["SPY"])
+
+
+def test_interrupted_run_leaves_the_published_panel(universe, monkeypatch, tmp_path):
+    research_engine.filter_liquid_stocks(["AAA"])
+    before = open_panel().tickers
+    get_bars = research_engine.get_bars
+
+    def interrupted(tickers, period):
+        if "BBB" in tickers:
+            raise KeyboardInterrupt
+        return get_bars(tickers, period)
+
+    monkeypatch.setattr(research_engine, "get_bars", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        # AAA is already in the new panel when BBB's chunk is interrupted.
+        research_engine.filter_liquid_stocks(["AAA", "BBB"], chunk_size=1)
+
+    assert open_panel().tickers == before
+    assert len([d for d in (tmp_path / "price_panel").iterdir() if d.is_dir()]) == 1
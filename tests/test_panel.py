@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.panel import ABANDONED_SECONDS, PanelWriter, PricePanel, open_panel
+
+CALENDAR = pd.bdate_range("2026-01-05", periods=5)
+
+
+def _bars(value):
+    return pd.DataFrame(value, index=CALENDAR, columns=["Close", "High", "Low", "Volume"])
+
+
+def _write(path, tickers, value):
+    with PanelWriter(CALENDAR, path) as writer:
+        for ticker in tickers:
+            writer.append(ticker, _bars(value))
+
+
+def test_open_panel_before_any_write(tmp_path):
+    assert open_panel(tmp_path) is None
+
+
+def test_mapped_panel_survives_a_rewrite(tmp_path):
+    _write(tmp_path, ["AAA"], 1.0)
+    old = PricePanel(tmp_path)
+    _write(tmp_path, ["AAA", "BBB", "CCC"], 2.0)
+
+    # The old reader keeps its own bars and shape; new readers see the new write.
+    assert old.tickers == ["AAA"]
+    assert (old["AAA"]["Close"] == 1.0).all()
+    new = open_panel(tmp_path)
+    assert new.tickers == ["AAA", "BBB", "CCC"]
+    assert (new.wide("Close") == 2.0).all().all()
+
+
+def test_only_current_and_previous_versions_are_kept(tmp_path):
+    for value in range(4):
+        _write(tmp_path, ["AAA"], float(value))
+    versions = [d for d in tmp_path.iterdir() if d.is_dir()]
+    assert len(versions) == 2
+    assert open_panel(tmp_path)["AAA"]["Close"].iloc[0] == 3.0
+
+
+def test_failed_write_leaves_the_published_panel(tmp_path):
+    _write(tmp_path, ["AAA"], 1.0)
+    with pytest.raises(RuntimeError):
+        with PanelWriter(CALENDAR, tmp_path) as writer:
+            writer.append("BBB", _bars(5.0))
+            raise RuntimeError("download failed")
+
+    assert open_panel(tmp_path).tickers == ["AAA"]
+    assert len([d for d in tmp_path.iterdir() if d.is_dir()]) == 1
+
+
+def test_concurrent_writers_and_readers_see_whole_panels(tmp_path):
+    _write(tmp_path, ["AAA"], 0.0)
+    errors = []
+
+    def writer(n):
+        try:
+            for _ in range(10):
+                _write(tmp_path, [f"T{j}" for j in range(n)], float(n))
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        for _ in range(200):
+            panel = open_panel(tmp_path)
+            if panel is None:
+                continue  # its version was pruned between resolving CURRENT and opening it
+            values = np.unique(np.asarray(panel.bars))
+            # One write's bars, sized for that write's tickers.
+            if len(values) != 1 or values[0] not in (0.0, len(panel)):
+                errors.append((len(panel), values))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in (1, 2, 3)]
+    threads += [threading.Thread(target=reader) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_abandoned_unpublished_versions_are_pruned(tmp_path):
+    crashed = tmp_path / "v-crashed"
+    crashed.mkdir()
+    day_old = time.time() - ABANDONED_SECONDS - 60
+    os.utime(crashed, (day_old, day_old))
+    in_progress = tmp_path / "v-in-progress"
+    in_progress.mkdir()
+
+    _write(tmp_path, ["AAA"], 1.0)
+    assert not crashed.exists()
+    assert in_progress.exists()
+
+
+def test_writer_closed_inside_the_block_is_not_closed_twice(tmp_path):
+    with PanelWriter(CALENDAR, tmp_path) as writer:
+        writer.append("AAA", _bars(1.0))
+        panel = writer.close()
+    assert panel.tickers == ["AAA"]
+    assert len([d for d in tmp_path.iterdir() if d.is_dir()]) == 1
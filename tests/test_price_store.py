@@ -0,0 +1,57 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from tools import price_store
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    path = str(tmp_path / "prices.db")
+    monkeypatch.setattr(price_store, "PRICE_STORE_PATH", path)
+    monkeypatch.setattr(price_store, "CACHE_BUSY_TIMEOUT_MS", 200)
+    return path
+
+
+def _frames(tickers, start):
+    index = pd.bdate_range(start, periods=5, name="Date")
+    return {t: pd.DataFrame(1.0, index=index, columns=price_store.COLUMNS) for t in tickers}
+
+
+def test_downloads_run_outside_the_write_transaction(store, monkeypatch):
+    monkeypatch.setattr(price_store, "_download", _frames)
+    price_store.sync(["AAA"], "2026-01-05")
+    conn = sqlite3.connect(store)
+    conn.execute("UPDATE price_meta SET synced_at = 0")
+    conn.commit()
+    conn.close()
+
+    def download(tickers, start):
+        # AAA's tail comes first; while BBB downloads, another process can still write.
+        other = sqlite3.connect(store, timeout=0)
+        other.execute("BEGIN IMMEDIATE")
+        other.rollback()
+        other.close()
+        return _frames(tickers, start)
+
+    monkeypatch.setattr(price_store, "_download", download)
+    stats = price_store.sync(["AAA", "BBB"], "2026-01-05")
+    assert (stats["tail"], stats["full"]) == (1, 1)
+    assert len(price_store.load_bars(["BBB"], "2026-01-05")["BBB"]) == 5
+
+
+def test_locked_store_skips_the_save_instead_of_raising(store, monkeypatch):
+    monkeypatch.setattr(price_store, "_download", _frames)
+    price_store._connect().close()
+    other = sqlite3.connect(store)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        stats = price_store.sync(["AAA"], "2026-01-05")
+    finally:
+        other.rollback()
+        other.close()
+
+    assert stats["unsaved"] == 1
+    # Not marked as synced, so the next call downloads it again.
+    assert price_store.sync(["AAA"], "2026-01-05")["full"] == 1
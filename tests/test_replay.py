@@ -0,0 +1,55 @@
+import importlib
+from datetime import date
+
+import pandas as pd
+import pytest
+import yfinance as yf
+
+from models import StockData
+from tools import price_store, replay
+from tools.replay import Harness, ReplayMiss
+
+
+def _on_day(monkeypatch, day):
+    """Make date.today() return `day` wherever the harness or the tools read it."""
+    for name in replay.DATED_MODULES + ("tools.replay",):
+        monkeypatch.setattr(importlib.import_module(name), "date", replay._pinned_date(day))
+
+
+def _fake_download(tickers, start=None, **kwargs):
+    index = pd.date_range(start, periods=3, freq="D", name="Date")
+    columns = pd.MultiIndex.from_product([tickers, price_store.COLUMNS])
+    return pd.DataFrame(1.0, index=index, columns=columns)
+
+
+def _record(monkeypatch, fixtures, day):
+    monkeypatch.setattr(yf, "download", _fake_download)
+    _on_day(monkeypatch, day)
+    with Harness(fixtures, mode="record"):
+        bars = price_store.get_bars(["AAA"], "6mo")
+        stock = StockData(ticker="AAA", price=1.0, market_cap=1e9)
+    monkeypatch.setattr(yf, "download", lambda *args, **kwargs: pytest.fail("network call in replay"))
+    return bars, stock
+
+
+def test_replay_on_a_later_day(monkeypatch, tmp_path):
+    bars, stock = _record(monkeypatch, tmp_path, date(2026, 3, 2))
+    assert (tmp_path / "meta.json").exists()
+
+    later = date(2026, 3, 20)
+    _on_day(monkeypatch, later)
+    with Harness(tmp_path, mode="replay"):
+        replayed = price_store.get_bars(["AAA"], "6mo")
+        assert StockData(ticker="AAA", price=1.0, market_cap=1e9).fetch_date == stock.fetch_date
+    pd.testing.assert_frame_equal(replayed["AAA"], bars["AAA"])
+    # The pin ends with the harness.
+    assert price_store.date.today() == later
+
+
+def test_fixtures_without_a_date_still_miss(monkeypatch, tmp_path):
+    _record(monkeypatch, tmp_path, date(2026, 3, 2))
+    (tmp_path / "meta.json").unlink()
+
+    _on_day(monkeypatch, date(2026, 3, 20))
+    with Harness(tmp_path, mode="replay"), pytest.raises(ReplayMiss):
+        price_store.get_bars(["AAA"], "6mo")
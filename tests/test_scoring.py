@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.scoring_bench import legacy_compute_scores
+from tools.panel import PanelWriter
+from tools.research_engine import compute_scores
+
+DAYS = 126
+
+
+def _universe(path, n=60, seed=1):
+    """A panel reindexed to a shared calendar the way filter_liquid_stocks writes it, with real-world holes."""
+    rng = np.random.default_rng(seed)
+    calendar = pd.bdate_range(end="2026-01-02", periods=DAYS)
+    tickers = [f"T{i:03d}" for i in range(n)]
+    fundamentals = {}
+    with PanelWriter(calendar, path) as writer:
+        for i, ticker in enumerate(tickers):
+            close = 30 * np.exp(np.cumsum(rng.normal(0, 0.02, DAYS)))
+            spread = np.abs(rng.normal(0, 0.01, DAYS)) * close
+            df = pd.DataFrame({
+                "Close": close, "High": close + spread, "Low": close - spread,
+                "Volume": rng.integers(500_000, 20_000_000, DAYS).astype(float),
+            }, index=calendar)
+            if i % 5 == 0:
+                # Recent IPO: no bars before its listing day.
+                df = df.iloc[int(rng.integers(5, DAYS // 2)):]
+            if i % 7 == 0:
+                # Halted for a few sessions mid-period.
+                start = int(rng.integers(10, DAYS - 10))
+                df = df.drop(df.index[start:start + int(rng.integers(1, 5))])
+            writer.append(ticker, df)
+
+            if i % 11 == 0:
+                continue  # no fundamentals at all
+
+            def maybe(value):
+                return None if rng.random() < 0.2 else float(value)
+
+            fundamentals[ticker] = {
+                "ticker": ticker,
+                "pe": maybe(rng.normal(20, 15)),
+                "revenue_growth": maybe(rng.normal(0.08, 0.2)),
+                "profit_margin": maybe(rng.normal(0.1, 0.1)),
+                "debt_to_equity": maybe(abs(rng.normal(80, 60))) if i % 13 else 0.0,
+                "analyst_target": maybe(close[-1] * rng.normal(1.1, 0.15)),
+            }
+        panel = writer.close()
+    return tickers, panel, fundamentals
+
+
+def test_scores_match_the_per_ticker_loop_with_gaps(tmp_path):
+    tickers, panel, fundamentals = _universe(tmp_path)
+    assert np.isnan(panel.field("Close")).any()
+
+    # The loop read each ticker's panel frame as float64, as compute_scores does.
+    frames = {t: panel[t].astype(np.float64) for t in tickers}
+    expected = legacy_compute_scores(tickers, frames, fundamentals)
+    scores = compute_scores(tickers, panel, fundamentals)
+
+    assert len(scores) == len(fundamentals)
+    pd.testing.assert_frame_equal(scores.reset_index(drop=True), expected.reset_index(drop=True))
@@ -0,0 +1,59 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.singleflight import SingleFlight
+
+
+def _concurrently(n, fn):
+    start = threading.Barrier(n)
+
+    def run(_):
+        start.wait()
+        try:
+            return fn()
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(n) as pool:
+        return list(pool.map(run, range(n)))
+
+
+def test_concurrent_calls_share_one_result():
+    flights = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.1)
+        return object()
+
+    results = _concurrently(6, lambda: flights.do("k", fn))
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert not flights.in_flight("k")
+
+
+def test_waiters_get_the_leaders_exception():
+    flights = SingleFlight()
+
+    def fn():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    results = _concurrently(4, lambda: flights.do("k", fn))
+    assert all(isinstance(r, ValueError) for r in results)
+    # The failed call is forgotten, so the next one runs again.
+    assert flights.do("k", lambda: 1) == 1
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight()
+    release = threading.Event()
+    with ThreadPoolExecutor(1) as pool:
+        blocked = pool.submit(flights.do, "a", lambda: release.wait(5))
+        time.sleep(0.05)
+        assert flights.in_flight("a")
+        assert flights.do("b", lambda: "b") == "b"
+        release.set()
+        assert blocked.result() is True
@@ -0,0 +1,109 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import orchestrator
+from tools import tracing
+from tools.tracing import bind, load_trace, span, summarize_trace, trace_run
+
+
+@pytest.fixture
+def trace_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(tracing, "TRACE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _spans(run):
+    return {s["name"]: s for s in load_trace(run.path)}
+
+
+def test_spans_nest_and_inherit_the_ticker(trace_dir):
+    with trace_run("daily") as run:
+        with span("analysis", "AAPL", ticker="AAPL"):
+            with span("tool", "get_stock_data") as s:
+                s["bytes"] = 120
+    spans = _spans(run)
+
+    assert spans["daily"]["parent"] is None
+    assert spans["AAPL"]["parent"] == spans["daily"]["id"]
+    assert spans["get_stock_data"]["parent"] == spans["AAPL"]["id"]
+    assert spans["get_stock_data"]["ticker"] == "AAPL"
+    assert spans["get_stock_data"]["bytes"] == 120
+
+
+def test_nested_run_joins_the_open_trace(trace_dir):
+    with trace_run("daily") as outer:
+        with trace_run("analyze-AAPL") as inner:
+            assert inner is outer
+    assert len(list(trace_dir.glob("*.jsonl"))) == 1
+
+
+def test_bind_carries_the_trace_into_worker_threads(trace_dir):
+    def work(name):
+        with span("tool", name):
+            pass
+
+    with trace_run("daily") as run:
+        with span("analysis", "AAPL", ticker="AAPL"):
+            with ThreadPoolExecutor(2) as pool:
+                pool.submit(bind(work, "bound")).result()
+                pool.submit(work, "unbound").result()
+    spans = _spans(run)
+
+    assert spans["bound"]["parent"] == spans["AAPL"]["id"]
+    assert spans["bound"]["ticker"] == "AAPL"
+    assert spans["bound"]["thread"] != spans["AAPL"]["thread"]
+    # Without bind() the worker has no run to write to.
+    assert "unbound" not in spans
+
+
+def test_span_records_exceptions(trace_dir):
+    with trace_run("daily") as run:
+        with pytest.raises(ValueError):
+            with span("tool", "get_stock_data"):
+                raise ValueError("no data")
+    assert _spans(run)["get_stock_data"]["error"] == "ValueError: no data"
+
+
+def test_no_trace_dir_writes_nothing(monkeypatch, tmp_path):
+    monkeypatch.setattr(tracing, "TRACE_DIR", "")
+    with trace_run("daily") as run:
+        with span("tool", "get_stock_data") as s:
+            s["bytes"] = 1
+    assert run is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_summarize_trace():
+    spans = [
+        {"id": 1, "parent": None, "kind": "run", "name": "daily", "seconds": 12.0},
+        {"id": 2, "parent": 1, "kind": "analysis", "name": "AAPL", "ticker": "AAPL", "seconds": 10.0},
+        {"id": 3, "parent": 2, "kind": "tool", "name": "get_stock_data", "ticker": "AAPL",
+         "seconds": 0.5, "bytes": 2048, "cache": "miss"},
+        {"id": 4, "parent": 2, "kind": "tool", "name": "get_stock_data", "ticker": "AAPL",
+         "seconds": 0.1, "bytes": 2048, "cache": "hit", "error": "429"},
+        {"id": 5, "parent": 2, "kind": "model", "name": "turn-1", "ticker": "AAPL", "seconds": 4.0,
+         "input_tokens": 1000, "output_tokens": 200, "cache_read_input_tokens": 5000,
+         "cache_creation_input_tokens": 300},
+    ]
+    lines = summarize_trace(spans).splitlines()
+
+    assert lines[0] == "Run 'daily': 12.0s wall"
+    tool = next(line for line in lines if line.startswith("tool:get_stock_data")).split()
+    assert tool[1:] == ["2", "0.60", "0.30", "4.0", "1/1", "1"]
+    aapl = next(line for line in lines if line.startswith("AAPL")).split()
+    assert aapl == ["AAPL", "10.0", "1,000", "5,000", "300", "200"]
+    assert lines[-1] == "Tokens: 1,000 uncached input, 5,000 cached, 300 cache writes, 200 output"
+
+
+@pytest.mark.parametrize("output, error", [
+    ({"error": "Could not fetch AAPL"}, "Could not fetch AAPL"),
+    ([{"error": "Could not fetch insider data: 429"}], "Could not fetch insider data: 429"),
+    ({"price": 1.0}, None),
+])
+def test_tool_span_records_the_error_field(trace_dir, monkeypatch, output, error):
+    monkeypatch.setattr(orchestrator, "_execute_tool", lambda name, input_data, session=None: json.dumps(output))
+    with trace_run("daily") as run:
+        orchestrator.execute_tool("get_stock_data", {"ticker": "AAPL"})
+    assert _spans(run)["get_stock_data"].get("error") == error
@@ -0,0 +1,157 @@
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+try:
+    from yfinance.exceptions import YFRateLimitError
+except ImportError:  # yfinance < 0.2.54
+    YFRateLimitError = None
+
+
+def is_throttled(exc) -> bool:
+    """True for a rate-limit rejection (HTTP 429), however the client library surfaces it."""
+    if YFRateLimitError is not None and isinstance(exc, YFRateLimitError):
+        return True
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    return status == 429 or "Too Many Requests" in str(exc)
+
+
+class AdaptiveFetcher:
+    """
+    Runs fetch(key) for many keys with concurrency that adapts to the
+    server (AIMD). Every `window` completed calls the limit goes up by one
+    if nothing was throttled and latency held steady. It is halved when
+    more than `error_threshold` of the calls were throttled, and cut by a
+    quarter when mean latency passed `latency_factor` times the best
+    window seen so far.
+
+    Throttled calls are retried up to `max_retries` times with jittered
+    exponential backoff. Any other exception fails that key alone. A None
+    result means "no data" and is left out of the results.
+
+        fetcher = AdaptiveFetcher(fetch_fundamental, max_workers=24)
+        results = fetcher.run(tickers)          # {key: value}
+        print(fetcher.summary())                # coverage, throttling, concurrency
+    """
+
+    def __init__(self, fetch, min_workers=1, max_workers=32, start_workers=8, max_retries=4,
+                 backoff=0.5, max_backoff=30.0, window=20, error_threshold=0.05, latency_factor=2.0):
+        self.fetch = fetch
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.start_workers = max(min_workers, min(start_workers, max_workers))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.window = window
+        self.error_threshold = error_threshold
+        self.latency_factor = latency_factor
+        self.report = {}
+
+    def _delay(self, attempt):
+        # Equal jitter: at least half the exponential step, so retries still back off.
+        step = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return step / 2 + random.uniform(0, step / 2)
+
+    def _adjust(self, calls, throttled, latencies):
+        rate = throttled / calls
+        latency = sum(latencies) / len(latencies) if latencies else None
+        if rate > self.error_threshold:
+            self.limit = max(self.min_workers, self.limit // 2)
+        elif latency is not None and self._best and latency > self.latency_factor * self._best:
+            self.limit = max(self.min_workers, self.limit * 3 // 4)
+        else:
+            self.limit = min(self.max_workers, self.limit + 1)
+        if latency is not None:
+            self._best = min(self._best or latency, latency)
+        self._limits.append(self.limit)
+
+    def run(self, keys) -> dict:
+        keys = list(dict.fromkeys(keys))
+        self.limit = self.start_workers
+        self._best = None
+        self._limits = [self.limit]
+        results, failed = {}, {}
+        counts = {"throttled": 0, "retries": 0, "empty": 0}
+        window = {"calls": 0, "throttled": 0, "latencies": []}
+
+        pending = deque((key, 0) for key in keys)
+        delayed = []  # (ready_at, seq, key, attempt)
+        seq = itertools.count()
+        inflight = {}
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or delayed or inflight:
+                now = time.monotonic()
+                while delayed and delayed[0][0] <= now:
+                    _, _, key, attempt = heapq.heappop(delayed)
+                    pending.append((key, attempt))
+                while pending and len(inflight) < self.limit:
+                    key, attempt = pending.popleft()
+                    inflight[pool.submit(self.fetch, key)] = (key, attempt, time.monotonic())
+
+                timeout = max(0.0, delayed[0][0] - now) if delayed else None
+                if not inflight:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(inflight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    key, attempt, sent = inflight.pop(future)
+                    window["calls"] += 1
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        if not is_throttled(e):
+                            failed[key] = e
+                        else:
+                            counts["throttled"] += 1
+                            window["throttled"] += 1
+                            if attempt < self.max_retries:
+                                counts["retries"] += 1
+                                ready = time.monotonic() + self._delay(attempt)
+                                heapq.heappush(delayed, (ready, next(seq), key, attempt + 1))
+                            else:
+                                failed[key] = e
+                    else:
+                        window["latencies"].append(time.monotonic() - sent)
+                        if value is None:
+                            counts["empty"] += 1
+                        else:
+                            results[key] = value
+
+                    if window["calls"] >= self.window:
+                        self._adjust(**window)
+                        window = {"calls": 0, "throttled": 0, "latencies": []}
+
+        self.report = {
+            "requested": len(keys),
+            "fetched": len(results),
+            "coverage": len(results) / len(keys) if keys else 1.0,
+            "empty": counts["empty"],
+            "failed": len(failed),
+            "throttled": counts["throttled"],
+            "retries": counts["retries"],
+            "errors": {key: f"{type(e).__name__}: {e}" for key, e in failed.items()},
+            "workers": {"start": self.start_workers, "final": self.limit,
+                        "min": min(self._limits), "max": max(self._limits)},
+            "seconds": round(time.monotonic() - started, 2),
+        }
+        return results
+
+    def summary(self) -> str:
+        r = self.report
+        if not r:
+            return "Nothing fetched yet"
+        workers = r["workers"]
+        return (
+            f"Coverage {r['fetched']}/{r['requested']} ({r['coverage']:.1%}) in {r['seconds']:.1f}s; "
+            f"{r['empty']} without data, {r['failed']} failed, {r['throttled']} throttled "
+            f"({r['retries']} retried); concurrency {workers['start']} -> {workers['final']} "
+            f"(range {workers['min']}-{workers['max']})"
+        )
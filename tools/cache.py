@@ -1,35 +1,657 @@
+import atexit
+import marshal
+import os
 import sqlite3
 import json
-from datetime import date, timedelta
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    CACHE_BUSY_TIMEOUT_MS, CACHE_WRITE_BATCH_SIZE, CACHE_WRITE_FLUSH_SECONDS,
+    CACHE_MEMORY_MAX_ENTRIES, CACHE_MEMORY_MAX_BYTES,
+    CACHE_LEASE_SECONDS, CACHE_LEASE_POLL_SECONDS, CACHE_REFRESH_WORKERS,
+    CACHE_COMPRESS_MIN_BYTES, CACHE_IN_CHUNK,
+    CACHE_MAX_BYTES, CACHE_VACUUM_PAGES, CACHE_ERROR_TTL_SECONDS,
+)
+from tools.singleflight import SingleFlight
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 DB_PATH = "stock_cache.db"
 
+# One connection per thread, reopened after a fork or if DB_PATH changes.
+_local = threading.local()
+
+# Every entry has a soft expiry (stale_at) and a hard one (expires). Between the
+# two, get_or_fetch() serves the stale value and refreshes it in the background.
+
+# Writes are buffered here (key -> (blob, fmt, stale_at, expires)) and flushed in one transaction.
+_pending = {}
+_pending_lock = threading.Lock()
+
+# A single daemon thread per process does the deferred flushes on its own
+# long-lived connection; _flush_wanted wakes it up.
+_flush_wanted = threading.Event()
+_flusher = None
+_flusher_pid = None
+
+# Last-access times of cache hits. They never trigger a write of their own:
+# they ride along with the next flush of real writes, or compact_cache()
+# (which evicts the least recently accessed rows first) and exit.
+_touched = {}
+_maintenance_thread = None
+
+# Values are stored as marshal BLOBs (compressed above CACHE_COMPRESS_MIN_BYTES)
+# with a format tag in the fmt column. Rows with no tag are legacy JSON TEXT.
+FMT_MARSHAL = "marshal"
+FMT_ZLIB = "marshal+zlib"
+FMT_ZSTD = "marshal+zstd"
+
+# In-process LRU tier: key -> (decoded value, stale_at, expires, uncompressed marshal size).
+_memory = OrderedDict()
+_memory_bytes = 0
+_memory_lock = threading.Lock()
+
+# Coalesces concurrent get_or_fetch() misses within this process.
+_flights = SingleFlight()
+_refresher = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+
+_stats = {
+    "memory": {"hits": 0, "misses": 0},
+    "sqlite": {"hits": 0, "misses": 0},
+    "refresh": {"stale_served": 0, "scheduled": 0, "failed": 0},
+}
+
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid() and _local.path == DB_PATH:
+        return conn
+
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=CACHE_BUSY_TIMEOUT_MS / 1000,
+        isolation_level=None,
+    )
+    conn.execute(f"PRAGMA busy_timeout = {int(CACHE_BUSY_TIMEOUT_MS)}")
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+    except sqlite3.OperationalError:
+        # Another process holds the lock while switching modes; it will set WAL for us.
+        pass
+    conn.execute("PRAGMA synchronous = NORMAL")
+
+    _local.conn, _local.pid, _local.path = conn, os.getpid(), DB_PATH
+    return conn
+
+
+def close_cache():
+    """Flush pending writes and close this thread's connection."""
+    flush_cache()
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        conn.close()
+    _local.conn = None
+
+
 def init_cache():
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
+    # Only takes effect on a new file; compact_cache() converts existing ones.
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
     conn.execute("""
         CREATE TABLE IF NOT EXISTS cache (
-            key TEXT PRIMARY KEY, value TEXT, expires TEXT
+            key TEXT PRIMARY KEY, value BLOB, expires REAL, stale_at REAL, fmt TEXT,
+            size INTEGER, last_access REAL
         )
     """)
-    conn.execute("DELETE FROM cache WHERE expires <= ?", (date.today().isoformat(),))
-    conn.commit()
-    conn.close()
-
-def get_cached(key: str) -> dict | None:
-    conn = sqlite3.connect(DB_PATH)
-    row = conn.execute(
-        "SELECT value FROM cache WHERE key = ? AND expires > ?",
-        (key, date.today().isoformat()),
-    ).fetchone()
-    conn.close()
-    return json.loads(row[0]) if row else None
-
-def set_cached(key: str, value: dict, ttl_days: int = 1):
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute(
-        "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
-        (key, json.dumps(value, default=str),
-         (date.today() + timedelta(days=ttl_days)).isoformat()),
+    columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(cache)")}
+    if columns.get("expires", "").upper() == "TEXT":
+        # Older databases stored expiry as an ISO date; rebuild with epoch seconds.
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("ALTER TABLE cache RENAME TO cache_old")
+        conn.execute("CREATE TABLE cache (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+        conn.execute("""
+            INSERT INTO cache (key, value, expires)
+            SELECT key, value, CAST(strftime('%s', expires) AS REAL) FROM cache_old
+        """)
+        conn.execute("DROP TABLE cache_old")
+        conn.execute("COMMIT")
+        columns = {}
+    if "stale_at" not in columns:
+        conn.execute("ALTER TABLE cache ADD COLUMN stale_at REAL")
+    if "fmt" not in columns:
+        conn.execute("ALTER TABLE cache ADD COLUMN fmt TEXT")
+    if "size" not in columns:
+        conn.execute("ALTER TABLE cache ADD COLUMN size INTEGER")
+        conn.execute("ALTER TABLE cache ADD COLUMN last_access REAL")
+        conn.execute("UPDATE cache SET size = length(value), last_access = 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)")
+    conn.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cache_leases (
+            key TEXT PRIMARY KEY, owner TEXT, expires REAL
+        )
+    """)
+    compact_cache()
+
+
+def compact_cache(max_bytes: int = None) -> dict:
+    """
+    Sweep expired rows and leases, evict least recently accessed rows until
+    the stored values fit in max_bytes (CACHE_MAX_BYTES by default), and
+    hand freed pages back to the filesystem with an incremental vacuum.
+    """
+    if max_bytes is None:
+        max_bytes = CACHE_MAX_BYTES
+    flush_cache()
+    conn = _connect()
+    now = time.time()
+    stats = {"expired": 0, "evicted": 0, "bytes": 0}
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        stats["expired"] = conn.execute("DELETE FROM cache WHERE expires <= ?", (now,)).rowcount
+        conn.execute("DELETE FROM cache_leases WHERE expires <= ?", (now,))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total > max_bytes:
+            # Evict down to 90% so we are not back here after the next few writes.
+            target = total - int(max_bytes * 0.9)
+            victims = []
+            for key, size in conn.execute(
+                "SELECT key, size FROM cache ORDER BY last_access ASC"
+            ):
+                if target <= 0:
+                    break
+                victims.append((key,))
+                target -= size or 0
+                total -= size or 0
+            conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+            stats["evicted"] = len(victims)
+        stats["bytes"] = total
+        conn.execute("COMMIT")
+    except sqlite3.OperationalError as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        print(f"  Cache compaction skipped: {e}")
+        return stats
+
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Existing files need a full VACUUM once to switch to incremental mode.
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        # executescript() steps the pragma to completion; execute() frees a single page.
+        conn.executescript(f"PRAGMA incremental_vacuum({int(CACHE_VACUUM_PAGES)});")
+    except sqlite3.OperationalError:
+        pass
+    return stats
+
+
+def start_cache_maintenance(interval_minutes: float):
+    """Run compact_cache() every interval_minutes on a daemon thread (once per process)."""
+    global _maintenance_thread
+    if _maintenance_thread is not None and _maintenance_thread.is_alive():
+        return
+
+    def loop():
+        while True:
+            time.sleep(interval_minutes * 60)
+            try:
+                compact_cache()
+            except Exception as e:
+                print(f"  Cache maintenance error: {e}")
+
+    _maintenance_thread = threading.Thread(target=loop, name="cache-maintenance", daemon=True)
+    _maintenance_thread.start()
+
+
+def flush_cache() -> int:
+    """Write all buffered set_cached() calls and access times in a single transaction."""
+    with _pending_lock:
+        if not _pending and not _touched:
+            return 0
+        batch = dict(_pending)
+        _pending.clear()
+        touched = [(at, key) for key, at in _touched.items() if key not in batch]
+        _touched.clear()
+
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR REPLACE INTO cache (key, value, fmt, stale_at, expires, size, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(key, blob, fmt, stale_at, expires, len(blob), now)
+             for key, (blob, fmt, stale_at, expires) in batch.items()],
+        )
+        conn.executemany("UPDATE cache SET last_access = ? WHERE key = ?", touched)
+        conn.execute("COMMIT")
+    except sqlite3.OperationalError as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        # Put the batch back unless a newer write for the same key arrived meanwhile.
+        with _pending_lock:
+            for key, item in batch.items():
+                _pending.setdefault(key, item)
+        print(f"  Cache flush deferred: {e}")
+        return 0
+    return len(batch)
+
+
+def _touch(keys):
+    now = time.time()
+    with _pending_lock:
+        for key in keys:
+            _touched[key] = now
+
+
+def _flush_loop():
+    while True:
+        _flush_wanted.wait()
+        # Let writes arriving in the next CACHE_WRITE_FLUSH_SECONDS join this batch.
+        time.sleep(CACHE_WRITE_FLUSH_SECONDS)
+        _flush_wanted.clear()
+        try:
+            flush_cache()
+        except Exception as e:
+            print(f"  Cache flush error: {e}")
+
+
+def _schedule_flush():
+    """Ask the flusher thread for a flush soon (starting it if needed). Call with _pending_lock held."""
+    global _flusher, _flusher_pid
+    if _flusher is None or _flusher_pid != os.getpid() or not _flusher.is_alive():
+        _flusher = threading.Thread(target=_flush_loop, name="cache-flush", daemon=True)
+        _flusher_pid = os.getpid()
+        _flusher.start()
+    _flush_wanted.set()
+
+
+def to_plain(value):
+    """
+    Reduce a tool result to str/int/float/bool/None/list/dict with string keys.
+    Matches what json.dumps(value, default=str) used to produce, so DataFrame
+    dicts keyed by Timestamp and pydantic dates come back as strings.
+    """
+    if value is None or type(value) in (str, bool, int):
+        return value
+    if isinstance(value, dict):
+        return {
+            k if type(k) is str else str(k): to_plain(v) for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [to_plain(v) for v in value]
+    if isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    if hasattr(value, "item"):
+        # numpy scalars
+        return to_plain(value.item())
+    return str(value)
+
+
+def _encode(value) -> tuple[bytes, str, int]:
+    """(stored blob, fmt, uncompressed marshal length)."""
+    blob = marshal.dumps(value, 4)
+    if len(blob) < CACHE_COMPRESS_MIN_BYTES:
+        return blob, FMT_MARSHAL, len(blob)
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(blob), FMT_ZSTD, len(blob)
+    return zlib.compress(blob, 6), FMT_ZLIB, len(blob)
+
+
+def _decode(blob, fmt):
+    """(value, uncompressed length); the length is what the memory tier charges."""
+    if fmt is None:
+        return json.loads(blob), len(blob)
+    if fmt == FMT_ZSTD:
+        blob = zstandard.ZstdDecompressor().decompress(blob)
+    elif fmt == FMT_ZLIB:
+        blob = zlib.decompress(blob)
+    return marshal.loads(blob), len(blob)
+
+
+def encode_value(value) -> tuple[bytes, str]:
+    return _encode(value)[:2]
+
+
+def decode_value(blob, fmt):
+    return _decode(blob, fmt)[0]
+
+
+def _memory_get(key, now):
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is None or entry[2] <= now:
+            _stats["memory"]["misses"] += 1
+            return None
+        _memory.move_to_end(key)
+        _stats["memory"]["hits"] += 1
+        return entry
+
+
+def _memory_put(key, value, stale_at, expires, size):
+    global _memory_bytes
+    if size > CACHE_MEMORY_MAX_BYTES:
+        return
+    with _memory_lock:
+        old = _memory.pop(key, None)
+        if old is not None:
+            _memory_bytes -= old[3]
+        _memory[key] = (value, stale_at, expires, size)
+        _memory_bytes += size
+        while len(_memory) > CACHE_MEMORY_MAX_ENTRIES or _memory_bytes > CACHE_MEMORY_MAX_BYTES:
+            _, (_, _, _, evicted) = _memory.popitem(last=False)
+            _memory_bytes -= evicted
+
+
+def clear_memory_cache():
+    global _memory_bytes
+    with _memory_lock:
+        _memory.clear()
+        _memory_bytes = 0
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters per tier, plus the current size of the memory tier."""
+    with _memory_lock:
+        return {
+            "memory": dict(_stats["memory"], entries=len(_memory), bytes=_memory_bytes),
+            "sqlite": dict(_stats["sqlite"]),
+            "refresh": dict(_stats["refresh"]),
+        }
+
+
+def cache_summary() -> str:
+    """One status line of cache_stats(), for sizing the memory tier."""
+    stats = cache_stats()
+
+    def rate(tier):
+        looked_up = tier["hits"] + tier["misses"]
+        return f"{tier['hits']}/{looked_up} hits" + (f" ({tier['hits'] / looked_up:.0%})" if looked_up else "")
+
+    memory, refresh = stats["memory"], stats["refresh"]
+    return (
+        f"Tool cache: memory {rate(memory)}, {memory['entries']} entries, {memory['bytes'] / 1e6:.1f} MB; "
+        f"sqlite {rate(stats['sqlite'])}; {refresh['stale_served']} stale served, "
+        f"{refresh['scheduled']} refreshed, {refresh['failed']} refresh failures"
     )
-    conn.commit()
-    conn.close()
+
+
+def reset_cache_stats():
+    with _memory_lock:
+        for counters in _stats.values():
+            for name in counters:
+                counters[name] = 0
+
+
+def _lookup(key: str):
+    """Return (value, stale_at, expires) for an entry not yet past its hard TTL."""
+    now = time.time()
+    entry = _memory_get(key, now)
+    if entry is not None:
+        _touch([key])
+        return entry[:3]
+
+    with _pending_lock:
+        row = _pending.get(key)
+    if row is None:
+        row = _connect().execute(
+            "SELECT value, fmt, COALESCE(stale_at, expires), expires FROM cache "
+            "WHERE key = ? AND expires > ?",
+            (key, now),
+        ).fetchone()
+
+    hit = row is not None and row[3] > now
+    with _memory_lock:
+        _stats["sqlite"]["hits" if hit else "misses"] += 1
+    if not hit:
+        return None
+
+    blob, fmt, stale_at, expires = row
+    value, size = _decode(blob, fmt)
+    _memory_put(key, value, stale_at, expires, size)
+    _touch([key])
+    return value, stale_at, expires
+
+
+def get_cached(key: str, allow_stale: bool = False) -> dict | None:
+    entry = _lookup(key)
+    if entry is None:
+        return None
+    value, stale_at, _ = entry
+    if not allow_stale and stale_at <= time.time():
+        return None
+    return value
+
+
+def _expiry(ttl_days, ttl_seconds, hard_ttl_seconds):
+    if ttl_seconds is None:
+        ttl_seconds = ttl_days * 86400
+    now = time.time()
+    return now + ttl_seconds, now + max(hard_ttl_seconds or 0, ttl_seconds)
+
+
+def _stage(key, value, stale_at, expires):
+    """Put a value in the memory tier and the write buffer; returns its plain form."""
+    value = to_plain(value)
+    blob, fmt, size = _encode(value)
+
+    # Both tiers hand back the same plain shape a disk hit would return.
+    _memory_put(key, value, stale_at, expires, size)
+
+    with _pending_lock:
+        _pending[key] = (blob, fmt, stale_at, expires)
+        return value, len(_pending)
+
+
+def set_cached(
+    key: str, value: dict, ttl_days: int = 1,
+    ttl_seconds: float = None, hard_ttl_seconds: float = None,
+):
+    stale_at, expires = _expiry(ttl_days, ttl_seconds, hard_ttl_seconds)
+    value, pending = _stage(key, value, stale_at, expires)
+    if pending >= CACHE_WRITE_BATCH_SIZE:
+        flush_cache()
+    else:
+        with _pending_lock:
+            _schedule_flush()
+    return value
+
+
+def get_many(keys, allow_stale: bool = False) -> dict:
+    """
+    Look up many keys at once. The memory tier is checked first and the rest
+    are read with one IN (...) query per CACHE_IN_CHUNK keys. Returns only
+    the keys that were found.
+    """
+    now = time.time()
+    found = {}
+    rows = {}
+    missing = []
+    pending = 0
+    for key in dict.fromkeys(keys):
+        entry = _memory_get(key, now)
+        if entry is not None:
+            found[key] = entry[:3]
+            continue
+        with _pending_lock:
+            row = _pending.get(key)
+        if row is not None:
+            rows[key] = row
+            pending += 1
+        else:
+            missing.append(key)
+
+    if missing:
+        conn = _connect()
+        for i in range(0, len(missing), CACHE_IN_CHUNK):
+            chunk = missing[i:i + CACHE_IN_CHUNK]
+            query = (
+                "SELECT key, value, fmt, COALESCE(stale_at, expires), expires FROM cache "
+                f"WHERE key IN ({','.join('?' * len(chunk))}) AND expires > ?"
+            )
+            for key, *row in conn.execute(query, (*chunk, now)):
+                rows[key] = tuple(row)
+
+    looked_up = len(missing) + pending
+    hits = 0
+    for key, (blob, fmt, stale_at, expires) in rows.items():
+        if expires <= now:
+            continue
+        value, size = _decode(blob, fmt)
+        _memory_put(key, value, stale_at, expires, size)
+        found[key] = (value, stale_at, expires)
+        hits += 1
+    with _memory_lock:
+        _stats["sqlite"]["hits"] += hits
+        _stats["sqlite"]["misses"] += looked_up - hits
+    _touch(found)
+
+    return {
+        key: value for key, (value, stale_at, _) in found.items()
+        if allow_stale or stale_at > now
+    }
+
+
+def set_many(items, ttl_days: int = 1, ttl_seconds: float = None, hard_ttl_seconds: float = None) -> dict:
+    """
+    Cache many values with the same lifetime and write them in one transaction.
+    `items` is a dict or an iterable of (key, value) pairs.
+    """
+    stale_at, expires = _expiry(ttl_days, ttl_seconds, hard_ttl_seconds)
+    if isinstance(items, dict):
+        items = items.items()
+    stored = {key: _stage(key, value, stale_at, expires)[0] for key, value in items}
+    flush_cache()
+    return stored
+
+
+def _acquire_lease(key: str) -> bool:
+    """Claim the right to fetch `key` across processes sharing DB_PATH."""
+    conn = _connect()
+    now = time.time()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM cache_leases WHERE key = ? AND expires <= ?", (key, now))
+        conn.execute(
+            "INSERT OR IGNORE INTO cache_leases (key, owner, expires) VALUES (?, ?, ?)",
+            (key, str(os.getpid()), now + CACHE_LEASE_SECONDS),
+        )
+        acquired = conn.execute("SELECT changes()").fetchone()[0] == 1
+        conn.execute("COMMIT")
+        return acquired
+    except sqlite3.OperationalError:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        return True
+
+
+def _release_lease(key: str):
+    try:
+        _connect().execute(
+            "DELETE FROM cache_leases WHERE key = ? AND owner = ?", (key, str(os.getpid())),
+        )
+    except sqlite3.OperationalError:
+        pass
+
+
+def _wait_for_peer(key: str):
+    """Poll until another process publishes `key` or gives up its lease."""
+    deadline = time.time() + CACHE_LEASE_SECONDS
+    while time.time() < deadline:
+        time.sleep(CACHE_LEASE_POLL_SECONDS)
+        value = get_cached(key)
+        if value is not None:
+            return value
+        held = _connect().execute(
+            "SELECT 1 FROM cache_leases WHERE key = ? AND expires > ?", (key, time.time()),
+        ).fetchone()
+        if not held:
+            return get_cached(key)
+    return None
+
+
+def _fetch_and_store(key: str, fetch, ttl_seconds: float, hard_ttl_seconds: float, wait: bool = True,
+                     is_error=None):
+    # Another thread may have filled the key while we were queued behind it.
+    value = get_cached(key)
+    if value is not None:
+        return value
+    if not _acquire_lease(key):
+        if not wait:
+            return None
+        value = _wait_for_peer(key)
+        if value is not None:
+            return value
+        _acquire_lease(key)
+    try:
+        value = fetch()
+        if is_error is not None and is_error(value):
+            if not wait:
+                # Background refresh: keep serving the stale value rather than the error.
+                with _memory_lock:
+                    _stats["refresh"]["failed"] += 1
+                return value
+            ttl_seconds = hard_ttl_seconds = CACHE_ERROR_TTL_SECONDS
+        value = set_cached(key, value, ttl_seconds=ttl_seconds, hard_ttl_seconds=hard_ttl_seconds)
+        # Publish right away so processes waiting on the lease can see it.
+        flush_cache()
+    finally:
+        _release_lease(key)
+    return value
+
+
+def _refresh(key: str, fetch, ttl_seconds: float, hard_ttl_seconds: float, is_error=None):
+    try:
+        _flights.do(key, lambda: _fetch_and_store(
+            key, fetch, ttl_seconds, hard_ttl_seconds, wait=False, is_error=is_error,
+        ))
+    except Exception as e:
+        with _memory_lock:
+            _stats["refresh"]["failed"] += 1
+        print(f"  Background refresh of {key} failed: {type(e).__name__}: {e}")
+
+
+def get_or_fetch(key: str, fetch, ttl_seconds: float, hard_ttl_seconds: float = None, is_error=None):
+    """
+    Return the cached value for `key`, or call fetch() and cache its result.
+
+    Past ttl_seconds the entry is stale: it is still returned immediately
+    while fetch() runs in the background, until hard_ttl_seconds is reached.
+    Only misses and entries past the hard TTL block on fetch(). Concurrent
+    misses for the same key, from threads in this process or from other
+    processes using the same cache file, share a single fetch.
+
+    If is_error(value) is true for a fetched value, it is cached for only
+    CACHE_ERROR_TTL_SECONDS, and a background refresh drops it.
+    """
+    entry = _lookup(key)
+    if entry is not None and entry[0] is not None:
+        value, stale_at, _ = entry
+        if stale_at > time.time():
+            return value
+        if not _flights.in_flight(key):
+            with _memory_lock:
+                _stats["refresh"]["scheduled"] += 1
+            _refresher.submit(_refresh, key, fetch, ttl_seconds, hard_ttl_seconds, is_error)
+        with _memory_lock:
+            _stats["refresh"]["stale_served"] += 1
+        return value
+
+    return _flights.do(key, lambda: _fetch_and_store(
+        key, fetch, ttl_seconds, hard_ttl_seconds, is_error=is_error,
+    ))
+
+
+atexit.register(flush_cache)
@@ -0,0 +1,166 @@
+import json
+import math
+
+from config import (
+    TOOL_RESULT_BUDGET_BYTES, TOOL_RESULT_SIG_FIGS,
+    TOOL_RESULT_MAX_PERIODS, TOOL_RESULT_MAX_ROWS,
+)
+
+NEWS_SUMMARY_CHARS = 280
+
+
+# ============================================================
+# GENERIC PASSES
+# ============================================================
+
+def _round(value):
+    if isinstance(value, bool) or not isinstance(value, float):
+        return value
+    if math.isnan(value) or math.isinf(value):
+        return None
+    value = float(f"{value:.{TOOL_RESULT_SIG_FIGS}g}")
+    return int(value) if value == int(value) and abs(value) >= 1 else value
+
+
+def prune(value):
+    """Drop null/NaN/empty entries and round floats to TOOL_RESULT_SIG_FIGS significant figures."""
+    if isinstance(value, dict):
+        out = {}
+        for k, v in value.items():
+            v = prune(v)
+            if v is not None and v != {} and v != []:
+                out[k] = v
+        return out
+    if isinstance(value, list):
+        return [v for v in (prune(v) for v in value) if v is not None and v != {}]
+    return _round(value)
+
+
+def _fit(value, budget):
+    """Halve the longest list until the JSON fits in `budget` bytes."""
+    text = json.dumps(value, separators=(",", ":"), default=str)
+    while len(text) > budget:
+        lists = []
+
+        def find(node):
+            if isinstance(node, list) and len(node) > 1:
+                lists.append(node)
+            children = node.values() if isinstance(node, dict) else node if isinstance(node, list) else []
+            for child in children:
+                find(child)
+
+        find(value)
+        if not lists:
+            break
+        longest = max(lists, key=lambda node: len(json.dumps(node, default=str)))
+        del longest[max(1, len(longest) // 2):]
+        text = json.dumps(value, separators=(",", ":"), default=str)
+
+    if len(text) > budget:
+        return json.dumps({"truncated": True, "partial": text[:budget]})
+    return text
+
+
+# ============================================================
+# PER-TOOL COMPACTION
+# ============================================================
+
+def _line(statement, period, *names):
+    row = statement.get(period) or {}
+    for name in names:
+        value = row.get(name)
+        if isinstance(value, (int, float)) and not (isinstance(value, float) and math.isnan(value)):
+            return value
+    return None
+
+
+def _ratio(a, b):
+    return a / b if a is not None and b else None
+
+
+def financial_ratios(result):
+    """Turn full income/balance/cash-flow statements into a small per-period ratio table."""
+    income = result.get("income_statement") or {}
+    balance = result.get("balance_sheet") or {}
+    cash = result.get("cash_flow") or {}
+
+    periods = sorted(set(income) | set(balance) | set(cash), reverse=True)
+    table = {}
+    for i, period in enumerate(periods[:TOOL_RESULT_MAX_PERIODS]):
+        revenue = _line(income, period, "Total Revenue", "Operating Revenue")
+        prev_revenue = _line(income, periods[i + 1], "Total Revenue", "Operating Revenue") if i + 1 < len(periods) else None
+        debt = _line(balance, period, "Total Debt")
+        equity = _line(balance, period, "Stockholders Equity", "Common Stock Equity")
+        fcf = _line(cash, period, "Free Cash Flow")
+        growth = _ratio(revenue, prev_revenue)
+        table[str(period)[:10]] = {
+            "revenue": revenue,
+            "revenue_growth": growth - 1 if growth is not None else None,
+            "gross_margin": _ratio(_line(income, period, "Gross Profit"), revenue),
+            "operating_margin": _ratio(_line(income, period, "Operating Income"), revenue),
+            "net_margin": _ratio(_line(income, period, "Net Income"), revenue),
+            "diluted_eps": _line(income, period, "Diluted EPS"),
+            "total_debt": debt,
+            "debt_to_equity": _ratio(debt, equity),
+            "cash": _line(balance, period, "Cash And Cash Equivalents"),
+            "current_ratio": _ratio(
+                _line(balance, period, "Current Assets"), _line(balance, period, "Current Liabilities"),
+            ),
+            "operating_cash_flow": _line(cash, period, "Operating Cash Flow"),
+            "free_cash_flow": fcf,
+            "fcf_margin": _ratio(fcf, revenue),
+        }
+    return {"ratios_by_period": table} if table else {"message": "No financial statements available"}
+
+
+def _compact_estimates(result):
+    result = dict(result)
+    records = result.get("recent_recommendations")
+    if isinstance(records, list):
+        result["recent_recommendations"] = records[-TOOL_RESULT_MAX_PERIODS:]
+    return result
+
+
+def _compact_news(result):
+    if not isinstance(result, list):
+        return result
+    items = []
+    for item in result[:TOOL_RESULT_MAX_ROWS]:
+        item = dict(item)
+        summary = item.get("summary") or ""
+        if len(summary) > NEWS_SUMMARY_CHARS:
+            item["summary"] = summary[:NEWS_SUMMARY_CHARS].rsplit(" ", 1)[0] + "..."
+        items.append(item)
+    return items
+
+
+def _compact_rows(result):
+    return result[:TOOL_RESULT_MAX_ROWS] if isinstance(result, list) else result
+
+
+COMPACTORS = {
+    "get_financial_statements": financial_ratios,
+    "get_analyst_estimates": _compact_estimates,
+    "get_stock_news": _compact_news,
+    "get_insider_trades": _compact_rows,
+}
+
+
+def compact_tool_output(name: str, output: str) -> str:
+    """
+    Shrink a raw execute_tool() JSON string before it is sent to the model:
+    tool-specific reduction, then null-dropping and rounding, then the
+    per-tool byte budget from TOOL_RESULT_BUDGET_BYTES (~4 bytes per token).
+    """
+    try:
+        result = json.loads(output)
+    except ValueError:
+        return output
+    if isinstance(result, dict) and "error" in result:
+        return output
+
+    compactor = COMPACTORS.get(name)
+    if compactor is not None:
+        result = compactor(result)
+    budget = TOOL_RESULT_BUDGET_BYTES.get(name, TOOL_RESULT_BUDGET_BYTES["default"])
+    return _fit(prune(result), budget)
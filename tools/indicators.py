@@ -0,0 +1,149 @@
+"""
+Vectorized price-history indicators.
+
+indicator_panel() takes a panel of series (rows = tickers, columns =
+trading days, oldest first, NaN where a ticker has no bar) and computes
+every return, moving average and volume statistic for all rows in one
+pass. Rows may have different lengths or leading NaNs: the valid bars of
+each row are first packed against the right edge with a stable argsort,
+so "the last k bars" is always the last k columns.
+
+summarize_histories() turns per-ticker OHLCV frames into the same dicts
+get_price_history has always returned.
+"""
+
+import math
+
+import numpy as np
+
+# Return name -> position from the end used as the base price (prices[-k]).
+RETURN_OFFSETS = {"pct_change_1d": 2, "pct_change_1w": 5, "pct_change_1m": 21, "pct_change_3m": 63}
+SMA_WINDOWS = (50, 200)
+VOLUME_WINDOW = 30
+
+
+def _pack_right(values, valid):
+    """Move each row's valid entries to the right edge, keeping their order."""
+    order = np.argsort(valid, axis=1, kind="stable")
+    return np.take_along_axis(values, order, axis=1)
+
+
+def indicator_panel(close, volume, returns=RETURN_OFFSETS, sma_windows=SMA_WINDOWS,
+                    volume_window=VOLUME_WINDOW) -> dict:
+    """
+    Indicators for every row of a (n_series, n_days) close/volume panel.
+    Returns {name: array of n_series}; values that need more bars than a
+    row has are NaN. "n" holds the number of valid bars per row.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    if close.ndim == 1:
+        close, volume = close[None, :], volume[None, :]
+    valid = ~np.isnan(close)
+    n = valid.sum(axis=1)
+    close = _pack_right(close, valid)
+    volume = _pack_right(volume, valid)
+    rows = np.arange(close.shape[0])
+    days = close.shape[1]
+    has_data = n > 0
+    packed = np.arange(days) >= (days - n)[:, None]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        current = close[:, -1]
+        start = close[rows, np.clip(days - n, 0, days - 1)]
+        out = {
+            "n": n,
+            "current": current,
+            "period_high": np.where(has_data, np.where(packed, close, -np.inf).max(axis=1), np.nan),
+            "period_low": np.where(has_data, np.where(packed, close, np.inf).min(axis=1), np.nan),
+            "period_avg": np.where(packed, close, 0.0).sum(axis=1) / n,
+            "period_start": np.where(has_data, start, np.nan),
+            "pct_change_total": (current - start) / start * 100,
+        }
+        for name, k in returns.items():
+            base = close[:, -k] if k <= days else np.full(len(n), np.nan)
+            out[name] = np.where(n >= k, (current - base) / base * 100, np.nan)
+        for w in sma_windows:
+            window = close[:, -w:] if w <= days else close
+            out[f"sma_{w}"] = np.where(n >= w, window.sum(axis=1) / w, np.nan)
+
+        # Volume follows the close mask, so bars without a close never count.
+        recent = np.where(packed[:, -volume_window:], volume[:, -volume_window:], 0.0)
+        count = np.minimum(n, volume_window)
+        out["current_volume"] = volume[:, -1]
+        out["avg_volume_30d"] = np.where(count > 0, recent.sum(axis=1) / count, 0.0)
+    return out
+
+
+def _round(value):
+    return round(float(value), 2)
+
+
+def summary_from_panel(ind, i, ticker, period, start_date, end_date) -> dict:
+    """Row i of indicator_panel() output as a get_price_history dict."""
+    def pct(name):
+        value = float(ind[name][i])
+        # Falsy on purpose: a change of exactly 0.0 has always been reported as None.
+        return _round(value) if value and not math.isnan(value) else None
+
+    def sma(w):
+        value = float(ind[f"sma_{w}"][i])
+        return None if math.isnan(value) or not value else value
+
+    current = float(ind["current"][i])
+    sma_50, sma_200 = sma(50), sma(200)
+    current_volume = float(ind["current_volume"][i])
+    avg_volume = float(ind["avg_volume_30d"][i])
+    return {
+        "ticker": ticker,
+        "period": period,
+        "data_points": int(ind["n"][i]),
+        "current": _round(current),
+        "period_high": _round(ind["period_high"][i]),
+        "period_low": _round(ind["period_low"][i]),
+        "period_avg": _round(ind["period_avg"][i]),
+        "period_start": _round(ind["period_start"][i]),
+        "pct_change_total": _round(ind["pct_change_total"][i]),
+        "pct_change_1d": pct("pct_change_1d"),
+        "pct_change_1w": pct("pct_change_1w"),
+        "pct_change_1m": pct("pct_change_1m"),
+        "pct_change_3m": pct("pct_change_3m"),
+        "sma_50": _round(sma_50) if sma_50 else None,
+        "sma_200": _round(sma_200) if sma_200 else None,
+        "above_sma_50": current > sma_50 if sma_50 else None,
+        "above_sma_200": current > sma_200 if sma_200 else None,
+        "current_volume": int(current_volume),
+        "avg_volume_30d": int(avg_volume),
+        "volume_ratio": _round(current_volume / avg_volume) if avg_volume else None,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+
+
+def summarize_histories(histories: dict, period: str) -> dict:
+    """{ticker: OHLCV DataFrame} -> {ticker: get_price_history dict}, one kernel pass for all."""
+    results = {}
+    frames = {}
+    for ticker, hist in histories.items():
+        if hist is None or hist.empty:
+            results[ticker] = {"ticker": ticker, "error": "No price data available"}
+        else:
+            frames[ticker] = hist
+    if not frames:
+        return results
+
+    days = max(len(hist) for hist in frames.values())
+    close = np.full((len(frames), days), np.nan)
+    volume = np.full((len(frames), days), np.nan)
+    for row, hist in enumerate(frames.values()):
+        close[row, days - len(hist):] = hist["Close"].to_numpy(dtype=np.float64)
+        volume[row, days - len(hist):] = hist["Volume"].to_numpy(dtype=np.float64)
+
+    # Plain lists: per-row access to numpy scalars dominates otherwise.
+    ind = {name: values.tolist() for name, values in indicator_panel(close, volume).items()}
+    for row, (ticker, hist) in enumerate(frames.items()):
+        results[ticker] = summary_from_panel(
+            ind, row, ticker, period,
+            str(hist.index[0].date()), str(hist.index[-1].date()),
+        )
+    return results
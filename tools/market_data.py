@@ -1,11 +1,91 @@
+import threading
 import yfinance as yf
 from models import StockData
+from tools.indicators import summarize_histories
+from tools import price_store
 from datetime import date
 
 
-def get_stock_data(ticker: str) -> StockData:
+class _Memo:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.done = False
+        self.value = None
+        self.error = None
+
+
+def _memoized(attr):
+    return property(lambda self: self._memo((attr,), lambda: getattr(self._stock, attr)))
+
+
+class SessionTicker:
+    """yf.Ticker look-alike whose endpoints are fetched once per TickerSession."""
+
+    info = _memoized("info")
+    financials = _memoized("financials")
+    balance_sheet = _memoized("balance_sheet")
+    cashflow = _memoized("cashflow")
+    insider_transactions = _memoized("insider_transactions")
+    recommendations = _memoized("recommendations")
+    earnings_estimate = _memoized("earnings_estimate")
+
+    def __init__(self, session, symbol):
+        self._session = session
+        self._stock = yf.Ticker(symbol)
+        self.ticker = symbol
+
+    def _memo(self, key, fetch):
+        return self._session.memo((self.ticker,) + key, fetch)
+
+    def history(self, period="1mo", **kwargs):
+        key = ("history", period) + tuple(sorted(kwargs.items()))
+        return self._memo(key, lambda: self._stock.history(period=period, **kwargs))
+
+
+class TickerSession:
+    """
+    Shared by the tools of one analysis run so each Yahoo endpoint is hit at
+    most once per ticker: analyze_stock, get_stock_data and
+    get_analyst_estimates all read the same `info`. Thread-safe; concurrent
+    tools wait for the first fetch instead of starting their own, and a
+    failed fetch is re-raised rather than retried within the run.
+    """
+
+    def __init__(self):
+        self._tickers = {}
+        self._memos = {}
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def ticker(self, symbol) -> SessionTicker:
+        with self._lock:
+            if symbol not in self._tickers:
+                self._tickers[symbol] = SessionTicker(self, symbol)
+            return self._tickers[symbol]
+
+    def memo(self, key, fetch):
+        with self._lock:
+            memo = self._memos.setdefault(key, _Memo())
+        with memo.lock:
+            if not memo.done:
+                self.fetches += 1
+                try:
+                    memo.value = fetch()
+                except Exception as e:
+                    memo.error = e
+                memo.done = True
+        if memo.error is not None:
+            raise memo.error
+        return memo.value
+
+
+def _ticker(ticker, session=None):
+    return session.ticker(ticker) if session else yf.Ticker(ticker)
+
+
+def get_stock_data(ticker: str, session: TickerSession = None) -> StockData:
     """Fetch current stock price, fundamentals, short interest, analyst targets."""
-    stock = yf.Ticker(ticker)
+    stock = _ticker(ticker, session)
     info = stock.info
 
     return StockData(
@@ -34,8 +114,8 @@ def get_stock_data(ticker: str) -> StockData:
     )
 
 
-def get_financial_statements(ticker: str) -> dict:
-    stock = yf.Ticker(ticker)
+def get_financial_statements(ticker: str, session: TickerSession = None) -> dict:
+    stock = _ticker(ticker, session)
     def safe_to_dict(df):
         if df is not None and not df.empty:
             return df.to_dict()
@@ -47,55 +127,33 @@ def get_financial_statements(ticker: str) -> dict:
     }
 
 
-def get_price_history(ticker: str, period: str = "1y") -> dict:
-    stock = yf.Ticker(ticker)
-    hist = stock.history(period=period)
+def get_price_history(ticker: str, period: str = "1y", session: TickerSession = None) -> dict:
+    if price_store.supports(period):
+        hist = price_store.get_bars([ticker], period)[ticker]
+    else:
+        hist = _ticker(ticker, session).history(period=period)
+    return summarize_price_history(ticker, period, hist)
 
-    if hist.empty:
-        return {"ticker": ticker, "error": "No price data available"}
 
-    prices = hist["Close"].tolist()
-    volumes = hist["Volume"].tolist()
-
-    avg_volume_30d = sum(volumes[-30:]) / min(len(volumes), 30) if volumes else 0
-    current_volume = volumes[-1] if volumes else 0
-
-    sma_50 = sum(prices[-50:]) / min(len(prices), 50) if len(prices) >= 50 else None
-    sma_200 = sum(prices[-200:]) / min(len(prices), 200) if len(prices) >= 200 else None
+def download_price_histories(tickers: list[str], period: str = "1y") -> dict:
+    """
+    {ticker: DataFrame} shaped like Ticker.history() for the whole list, read
+    from the local bar store after one batched sync of the missing tails;
+    tickers Yahoo has nothing for are left out.
+    """
+    if not tickers:
+        return {}
+    bars = price_store.get_bars(tickers, period)
+    return {ticker: df for ticker, df in bars.items() if not df.empty}
 
-    pct_1d = ((prices[-1] - prices[-2]) / prices[-2] * 100) if len(prices) >= 2 else None
-    pct_1w = ((prices[-1] - prices[-5]) / prices[-5] * 100) if len(prices) >= 5 else None
-    pct_1m = ((prices[-1] - prices[-21]) / prices[-21] * 100) if len(prices) >= 21 else None
-    pct_3m = ((prices[-1] - prices[-63]) / prices[-63] * 100) if len(prices) >= 63 else None
 
-    return {
-        "ticker": ticker,
-        "period": period,
-        "data_points": len(prices),
-        "current": round(prices[-1], 2),
-        "period_high": round(max(prices), 2),
-        "period_low": round(min(prices), 2),
-        "period_avg": round(sum(prices) / len(prices), 2),
-        "period_start": round(prices[0], 2),
-        "pct_change_total": round((prices[-1] - prices[0]) / prices[0] * 100, 2),
-        "pct_change_1d": round(pct_1d, 2) if pct_1d else None,
-        "pct_change_1w": round(pct_1w, 2) if pct_1w else None,
-        "pct_change_1m": round(pct_1m, 2) if pct_1m else None,
-        "pct_change_3m": round(pct_3m, 2) if pct_3m else None,
-        "sma_50": round(sma_50, 2) if sma_50 else None,
-        "sma_200": round(sma_200, 2) if sma_200 else None,
-        "above_sma_50": prices[-1] > sma_50 if sma_50 else None,
-        "above_sma_200": prices[-1] > sma_200 if sma_200 else None,
-        "current_volume": int(current_volume),
-        "avg_volume_30d": int(avg_volume_30d),
-        "volume_ratio": round(current_volume / avg_volume_30d, 2) if avg_volume_30d else None,
-        "start_date": str(hist.index[0].date()),
-        "end_date": str(hist.index[-1].date()),
-    }
+def summarize_price_history(ticker: str, period: str, hist) -> dict:
+    """The get_price_history summary (returns, SMAs, volume ratio) of an OHLCV frame."""
+    return summarize_histories({ticker: hist}, period)[ticker]
 
 
-def get_insider_trades(ticker: str) -> list[dict]:
-    stock = yf.Ticker(ticker)
+def get_insider_trades(ticker: str, session: TickerSession = None) -> list[dict]:
+    stock = _ticker(ticker, session)
     try:
         insiders = stock.insider_transactions
         if insiders is None or insiders.empty:
@@ -115,8 +173,8 @@ def get_insider_trades(ticker: str) -> list[dict]:
         return [{"error": f"Could not fetch insider data: {e}"}]
 
 
-def get_analyst_estimates(ticker: str) -> dict:
-    stock = yf.Ticker(ticker)
+def get_analyst_estimates(ticker: str, session: TickerSession = None) -> dict:
+    stock = _ticker(ticker, session)
     result = {}
     try:
         rec = stock.recommendations
@@ -140,10 +198,10 @@ def get_analyst_estimates(ticker: str) -> dict:
     return result
 
 
-def get_macro_data() -> dict:
+def get_macro_data(session: TickerSession = None) -> dict:
     result = {}
     try:
-        spy = yf.Ticker("SPY")
+        spy = _ticker("SPY", session)
         spy_hist = spy.history(period="5d")
         if not spy_hist.empty:
             prices = spy_hist["Close"].tolist()
@@ -153,14 +211,14 @@ def get_macro_data() -> dict:
     except:
         pass
     try:
-        vix = yf.Ticker("^VIX")
+        vix = _ticker("^VIX", session)
         vix_hist = vix.history(period="5d")
         if not vix_hist.empty:
             result["vix"] = round(vix_hist["Close"].tolist()[-1], 2)
     except:
         pass
     try:
-        tnx = yf.Ticker("^TNX")
+        tnx = _ticker("^TNX", session)
         tnx_hist = tnx.history(period="5d")
         if not tnx_hist.empty:
             result["ten_year_yield"] = round(tnx_hist["Close"].tolist()[-1], 2)
@@ -170,7 +228,7 @@ def get_macro_data() -> dict:
     return result
 
 
-def get_sector_performance(sector_etf: str = None) -> dict:
+def get_sector_performance(sector_etf: str = None, session: TickerSession = None) -> dict:
     sector_etfs = {
         "Technology": "XLK", "Healthcare": "XLV", "Financial": "XLF",
         "Consumer Cyclical": "XLY", "Consumer Defensive": "XLP",
@@ -181,7 +239,7 @@ def get_sector_performance(sector_etf: str = None) -> dict:
     etfs_to_check = {sector_etf: sector_etf} if sector_etf else sector_etfs
     for name, etf in etfs_to_check.items():
         try:
-            ticker = yf.Ticker(etf)
+            ticker = _ticker(etf, session)
             hist = ticker.history(period="1mo")
             if not hist.empty:
                 prices = hist["Close"].tolist()
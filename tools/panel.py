@@ -0,0 +1,172 @@
+"""
+On-disk price panel for the quant model.
+
+One float32 file holds every ticker's bars as a (tickers, fields, dates)
+array, ticker-major, so a single ticker's Close/High/Low/Volume block is
+contiguous and a field across all tickers is a strided view. meta.json
+holds the date axis and the ticker index. PricePanel memory-maps the file
+read-only, so only the pages a computation touches become resident, however
+large the universe.
+
+Each write goes into its own version directory under PANEL_DIR, and close()
+publishes it by replacing the CURRENT file, which names the live version.
+Readers resolve CURRENT once, so they always get a bars file and a
+meta.json from the same write, and concurrent writers never share files.
+The previous version is kept for readers that resolved CURRENT just before
+the swap; older ones are removed.
+
+    with PanelWriter(calendar) as writer:      # calendar: DatetimeIndex
+        writer.append("AAPL", df)              # any frame with Close/High/Low/Volume
+    panel = PricePanel()
+    panel["AAPL"]                              # DataFrame view, no copy
+    panel.wide("Close")                        # dates x tickers view, no copy
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import PANEL_DIR
+
+FIELDS = ["Close", "High", "Low", "Volume"]
+DTYPE = np.float32
+CURRENT = "CURRENT"
+PUBLISHED = "published"
+# An unpublished version this old belongs to a writer that died mid-write.
+ABANDONED_SECONDS = 24 * 3600
+
+
+def _published_at(version):
+    try:
+        return (version / PUBLISHED).stat().st_mtime
+    except OSError:
+        return None
+
+
+def _publish(root, version):
+    """Point CURRENT at `version` atomically, then drop versions older than the previous one."""
+    tmp = root / f"{CURRENT}.{version}.tmp"
+    tmp.write_text(version, encoding="utf-8")
+    os.replace(tmp, root / CURRENT)
+    (root / version / PUBLISHED).touch()
+    # Only versions that have been published are pruned; other writers may still be filling theirs.
+    current = (root / CURRENT).read_text(encoding="utf-8").strip()
+    published = sorted(
+        (when, d) for d in root.iterdir()
+        if d.is_dir() and d.name != current and (when := _published_at(d)) is not None
+    )
+    for _, old in published[:-1]:
+        shutil.rmtree(old, ignore_errors=True)
+    cutoff = time.time() - ABANDONED_SECONDS
+    for d in root.iterdir():
+        try:
+            abandoned = d.is_dir() and _published_at(d) is None and d.stat().st_mtime < cutoff
+        except OSError:
+            continue
+        if abandoned and d.name != current:
+            shutil.rmtree(d, ignore_errors=True)
+
+
+class PanelWriter:
+    """Appends one ticker at a time into a new version; nothing is visible to readers until close()."""
+
+    def __init__(self, dates, path=PANEL_DIR):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = []
+        self.version = Path(tempfile.mkdtemp(prefix="v-", dir=self.path))
+        self._file = open(self.version / "bars.f32", "wb")
+
+    def append(self, ticker, df):
+        block = (
+            df.reindex(index=self.dates, columns=FIELDS)
+            .to_numpy(dtype=DTYPE)
+            .T
+        )
+        self._file.write(np.ascontiguousarray(block).tobytes())
+        self.tickers.append(ticker)
+
+    def close(self):
+        self._file.close()
+        meta = {
+            "fields": FIELDS,
+            "dates": [d.strftime("%Y-%m-%d") for d in self.dates],
+            "tickers": self.tickers,
+        }
+        (self.version / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        # Map it before publishing; once published, other writers may prune it.
+        panel = PricePanel(self.path, self.version.name)
+        _publish(self.path, self.version.name)
+        return panel
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            if not self._file.closed:
+                self.close()
+        else:
+            self._file.close()
+            shutil.rmtree(self.version, ignore_errors=True)
+        return False
+
+
+def open_panel(path=PANEL_DIR):
+    """The last written panel, or None if there is none yet."""
+    try:
+        return PricePanel(path)
+    except (OSError, ValueError):
+        return None
+
+
+class PricePanel:
+    def __init__(self, path=PANEL_DIR, version=None):
+        self.path = Path(path)
+        version = version or (self.path / CURRENT).read_text(encoding="utf-8").strip()
+        self.version = self.path / version
+        meta = json.loads((self.version / "meta.json").read_text(encoding="utf-8"))
+        self.fields = meta["fields"]
+        self.dates = pd.DatetimeIndex(meta["dates"])
+        self.tickers = meta["tickers"]
+        self._index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        shape = (len(self.tickers), len(self.fields), len(self.dates))
+        if self.tickers:
+            self.bars = np.memmap(self.version / "bars.f32", dtype=DTYPE, mode="r", shape=shape)
+        else:
+            self.bars = np.empty(shape, dtype=DTYPE)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __contains__(self, ticker):
+        return ticker in self._index
+
+    def __getitem__(self, ticker) -> pd.DataFrame:
+        """One ticker's bars as a dates x fields DataFrame over the mapped memory."""
+        block = self.bars[self._index[ticker]]
+        return pd.DataFrame(block.T, index=self.dates, columns=self.fields, copy=False)
+
+    def rows(self, tickers) -> list:
+        """Positions of `tickers` along the panel's first axis."""
+        return [self._index[t] for t in tickers]
+
+    def field(self, name) -> np.ndarray:
+        """(tickers, dates) view of one field."""
+        return self.bars[:, self.fields.index(name), :]
+
+    def wide(self, name, tickers=None) -> pd.DataFrame:
+        """dates x tickers frame of one field. Without `tickers` this is a view, not a copy."""
+        values = self.field(name)
+        columns = self.tickers
+        if tickers is not None:
+            values = values[self.rows(tickers)]
+            columns = list(tickers)
+        return pd.DataFrame(values.T, index=self.dates, columns=columns, copy=False)
@@ -0,0 +1,234 @@
+"""
+Persistent daily-bar store, so each run downloads only the bars added
+since the last one instead of the whole window.
+
+Each ticker has a row in price_meta. It holds the oldest date its bars
+cover (`covered_from`) and when it was last synced. A sync fetches
+from the second-to-last stored bar onwards. The first bar in that
+overlap is complete, so its close must match what is already stored.
+If it does not, Yahoo has re-adjusted the history (split or dividend)
+and the ticker is downloaded again in full. Bars are split/dividend
+adjusted, like Ticker.history().
+
+    bars = get_bars(["AAPL", "MSFT"], "6mo")      # {ticker: OHLCV DataFrame}
+"""
+
+import re
+import sqlite3
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+import yfinance as yf
+
+from config import (
+    PRICE_STORE_PATH, PRICE_STORE_REFRESH_MINUTES, PRICE_STORE_RESYNC_TOLERANCE, CACHE_BUSY_TIMEOUT_MS,
+)
+from tools.singleflight import SingleFlight
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+_PERIOD = re.compile(r"^(\d+)(d|wk|mo|y)$")
+_flights = SingleFlight()
+_initialized = set()
+
+
+def period_start(period: str, today: date = None) -> str | None:
+    """First calendar date of a yfinance-style period ("60d", "6mo", "1y", "ytd"); None if unsupported."""
+    today = today or date.today()
+    if period == "ytd":
+        return date(today.year, 1, 1).isoformat()
+    match = _PERIOD.match(period or "")
+    if not match:
+        return None
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        start = today - timedelta(days=n)
+    elif unit == "wk":
+        start = today - timedelta(weeks=n)
+    else:
+        months = n if unit == "mo" else 12 * n
+        start = (pd.Timestamp(today) - pd.DateOffset(months=months)).date()
+    return start.isoformat()
+
+
+def supports(period: str) -> bool:
+    return period_start(period) is not None
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(PRICE_STORE_PATH, timeout=CACHE_BUSY_TIMEOUT_MS / 1000)
+    conn.execute(f"PRAGMA busy_timeout = {int(CACHE_BUSY_TIMEOUT_MS)}")
+    if PRICE_STORE_PATH not in _initialized:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS bars (
+                ticker TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, volume REAL,
+                PRIMARY KEY (ticker, date)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS price_meta (
+                ticker TEXT PRIMARY KEY, covered_from TEXT, last_date TEXT, synced_at REAL
+            )
+        """)
+        conn.commit()
+        _initialized.add(PRICE_STORE_PATH)
+    return conn
+
+
+def _download(tickers, start) -> dict:
+    """{ticker: adjusted OHLCV frame from `start`}; tickers Yahoo has nothing for are left out."""
+    if not tickers:
+        return {}
+    data = yf.download(
+        tickers, start=start, group_by="ticker", auto_adjust=True,
+        threads=True, progress=False,
+    )
+    frames = {}
+    for ticker in tickers:
+        try:
+            # Older yfinance returns flat columns when only one ticker is asked for.
+            df = data[ticker] if data.columns.nlevels > 1 else data
+        except KeyError:
+            continue
+        df = df.dropna(subset=["Close"])
+        if not df.empty:
+            frames[ticker] = df
+    return frames
+
+
+def _write(conn, ticker, df, replace=False):
+    if replace:
+        conn.execute("DELETE FROM bars WHERE ticker = ?", (ticker,))
+    dates = pd.DatetimeIndex(df.index).strftime("%Y-%m-%d")
+    values = df.reindex(columns=COLUMNS).astype(float).itertuples(index=False, name=None)
+    conn.executemany(
+        "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(ticker, d, *row) for d, row in zip(dates, values)],
+    )
+
+
+def _stored_tail(conn, ticker):
+    """(second-to-last date, its close), or None when fewer than two bars are stored."""
+    rows = conn.execute(
+        "SELECT date, close FROM bars WHERE ticker = ? ORDER BY date DESC LIMIT 2", (ticker,)
+    ).fetchall()
+    return rows[1] if len(rows) == 2 else None
+
+
+def _matches(stored_close, df, day):
+    try:
+        fetched = float(df.loc[pd.DatetimeIndex(df.index).strftime("%Y-%m-%d") == day, "Close"].iloc[0])
+    except IndexError:
+        return False
+    return abs(fetched - stored_close) <= PRICE_STORE_RESYNC_TOLERANCE * max(abs(stored_close), 1e-9)
+
+
+def sync(tickers, start: str) -> dict:
+    """Bring the stored bars for `tickers` up to date back to `start`. Returns counts by action."""
+    conn = _connect()
+    now = time.time()
+    meta = {}
+    for chunk_start in range(0, len(tickers), 500):
+        chunk = tickers[chunk_start:chunk_start + 500]
+        meta.update({
+            row[0]: row[1:]
+            for row in conn.execute(
+                f"SELECT ticker, covered_from, last_date, synced_at FROM price_meta "
+                f"WHERE ticker IN ({','.join('?' * len(chunk))})", chunk,
+            )
+        })
+
+    stats = {"fresh": 0, "full": 0, "tail": 0, "resync": 0, "missing": 0, "unsaved": 0}
+    full, tails = [], {}
+    for ticker in tickers:
+        covered_from, last_date, synced_at = meta.get(ticker, (None, None, 0))
+        if covered_from is None or covered_from > start:
+            full.append(ticker)
+        elif now - (synced_at or 0) < PRICE_STORE_REFRESH_MINUTES * 60:
+            stats["fresh"] += 1
+        else:
+            tail = _stored_tail(conn, ticker)
+            if tail is None:
+                full.append(ticker)
+            else:
+                tails.setdefault(tail[0], []).append((ticker, tail[1]))
+
+    # Every download happens before the write transaction opens, so other
+    # processes syncing meanwhile are never locked out for a network call.
+    writes = []  # (ticker, frame, replace)
+    updated = {}
+    resync = []
+    for since, group in tails.items():
+        frames = _download([ticker for ticker, _ in group], since)
+        for ticker, stored_close in group:
+            df = frames.get(ticker)
+            if df is None:
+                # Nothing new (delisted, or Yahoo had a hiccup); try again next refresh.
+                updated[ticker] = (meta[ticker][0], meta[ticker][1])
+            elif _matches(stored_close, df, since):
+                writes.append((ticker, df, False))
+                updated[ticker] = (meta[ticker][0], max(meta[ticker][1], df.index[-1].strftime("%Y-%m-%d")))
+                stats["tail"] += 1
+            else:
+                resync.append(ticker)
+
+    # Full downloads share one request per distinct start date.
+    by_start = {start: list(full)} if full else {}
+    for ticker in resync:
+        by_start.setdefault(min(meta[ticker][0], start), []).append(ticker)
+    for since, group in by_start.items():
+        frames = _download(group, since)
+        for ticker in group:
+            df = frames.get(ticker)
+            if df is None:
+                # Not marked as synced, so the next call (or a retry) asks again.
+                stats["missing"] += 1
+                continue
+            writes.append((ticker, df, True))
+            updated[ticker] = (since, df.index[-1].strftime("%Y-%m-%d"))
+            stats["resync" if ticker in resync else "full"] += 1
+
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for ticker, df, replace in writes:
+            _write(conn, ticker, df, replace=replace)
+        conn.executemany(
+            "INSERT OR REPLACE INTO price_meta VALUES (?, ?, ?, ?)",
+            [(ticker, covered_from, last_date, now) for ticker, (covered_from, last_date) in updated.items()],
+        )
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        # Locked out past the busy timeout: keep what is stored; the next sync retries.
+        conn.rollback()
+        print(f"  Price store busy, {len(writes)} tickers not saved: {e}")
+        stats["unsaved"] = len(writes)
+    conn.close()
+    return stats
+
+
+def load_bars(tickers, start: str) -> dict:
+    """{ticker: OHLCV DataFrame from `start`} straight from the store (empty frame if none)."""
+    conn = _connect()
+    bars = {}
+    for ticker in tickers:
+        rows = conn.execute(
+            "SELECT date, open, high, low, close, volume FROM bars WHERE ticker = ? AND date >= ? ORDER BY date",
+            (ticker, start),
+        ).fetchall()
+        df = pd.DataFrame([row[1:] for row in rows], columns=COLUMNS,
+                          index=pd.DatetimeIndex([row[0] for row in rows], name="Date"))
+        bars[ticker] = df
+    conn.close()
+    return bars
+
+
+def get_bars(tickers, period: str) -> dict:
+    """Sync the tickers, then return {ticker: OHLCV DataFrame} covering `period`."""
+    start = period_start(period)
+    if start is None:
+        raise ValueError(f"Unsupported period for the price store: {period!r}")
+    tickers = list(dict.fromkeys(tickers))
+    # Concurrent tools asking for the same ticker/window share one sync.
+    _flights.do(f"{start}:{','.join(tickers)}", lambda: sync(tickers, start))
+    return load_bars(tickers, start)
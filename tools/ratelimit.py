@@ -0,0 +1,42 @@
+import threading
+import time
+
+from config import MODEL_REQUESTS_PER_MINUTE, YAHOO_REQUESTS_PER_SECOND, SCAN_REQUESTS_PER_SECOND
+
+
+class RateLimiter:
+    """Thread-safe token bucket: `rate` requests per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cost: float = 1):
+        cost = min(cost, self.burst)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= cost:
+                    self._tokens -= cost
+                    return
+                wait = (cost - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def wrap(self, fn, cost: float = 1):
+        """Return fn with acquire(cost) run before every call."""
+        def limited(*args, **kwargs):
+            self.acquire(cost)
+            return fn(*args, **kwargs)
+        return limited
+
+
+# Shared by every analysis running in this process.
+model_limiter = RateLimiter(MODEL_REQUESTS_PER_MINUTE / 60, burst=max(1, MODEL_REQUESTS_PER_MINUTE // 10))
+yahoo_limiter = RateLimiter(YAHOO_REQUESTS_PER_SECOND, burst=YAHOO_REQUESTS_PER_SECOND * 2)
+# run_alert_scan's quote/insider fan-out: short bursts of cheap calls, so a separate, wider bucket.
+scan_limiter = RateLimiter(SCAN_REQUESTS_PER_SECOND, burst=SCAN_REQUESTS_PER_SECOND)
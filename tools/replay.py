@@ -0,0 +1,342 @@
+"""
+Record/replay harness for every outbound call the agent makes: the
+Anthropic client, yfinance (Ticker attributes and download) and
+requests.get (NewsAPI, Polymarket, ticker lists).
+
+    with Harness("fixtures/today", mode="record"):
+        run_daily_research(WATCHLIST)
+
+    with Harness("fixtures/today", mode="replay", latency="recorded"):
+        run_daily_research(WATCHLIST)      # no network needed
+
+Each call is keyed by a hash of its arguments and stored as a pickle under
+<fixture_dir>/<service>/. A call made several times with the same
+arguments is replayed in the order it was recorded (then the last
+recording repeats). `latency` is a number of seconds, a dict per service
+("anthropic", "yahoo", "http"), or "recorded" to sleep as long as the
+original call took. While the harness is active the tool cache and the
+bar store use scratch databases, so every run actually exercises the
+patched calls.
+
+Dates end up in call arguments (fetch_date in tool results the model sees,
+the start of a bar-store download), so a recording saves its date in
+<fixture_dir>/meta.json and replay pins date.today() to it in the modules
+that build those calls. Fixtures recorded on one day replay on any other.
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+import requests
+import yfinance as yf
+
+from tools import cache, price_store
+
+SERVICES = ("anthropic", "yahoo", "http")
+# Query parameters that carry credentials; kept out of keys and fixtures.
+SECRET_PARAMS = {"apikey", "api_key", "token", "key"}
+# Used to tell yf.Ticker properties from methods without constructing a Ticker.
+_YF_TICKER = yf.Ticker
+# Modules whose `date` feeds call arguments; replay pins their date.today().
+DATED_MODULES = ("models", "orchestrator", "tools.market_data", "tools.price_store")
+
+
+def _pinned_date(day):
+    class PinnedDate(date):
+        @classmethod
+        def today(cls):
+            return day
+    return PinnedDate
+
+
+class ReplayMiss(LookupError):
+    """A call was made in replay mode that was never recorded."""
+
+
+def _plain(obj):
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "__dict__"):
+        return vars(obj)
+    return str(obj)
+
+
+def _without_secrets(params):
+    if not isinstance(params, dict):
+        return params
+    return {k: v for k, v in params.items() if k.lower() not in SECRET_PARAMS}
+
+
+class Harness:
+    def __init__(self, fixture_dir, mode="replay", latency=0.0, isolate_cache=True):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"mode must be 'record' or 'replay', not {mode!r}")
+        self.dir = Path(fixture_dir)
+        self.mode = mode
+        self.latency = latency
+        self.isolate_cache = isolate_cache
+        self.counts = {service: 0 for service in SERVICES}
+        self._seen = {}
+        self._lock = threading.Lock()
+        self._saved = None
+
+    # ---- storage ----
+
+    def _key(self, service, *parts):
+        text = json.dumps(parts, sort_keys=True, default=_plain)
+        return hashlib.sha1(f"{service}:{text}".encode()).hexdigest()[:20], text
+
+    def _path(self, service, digest, n):
+        return self.dir / service / f"{digest}-{n}.pkl"
+
+    def _next_index(self, service, digest):
+        with self._lock:
+            n = self._seen.get((service, digest), 0)
+            self._seen[(service, digest)] = n + 1
+            self.counts[service] += 1
+        return n
+
+    def _sleep(self, service, recorded):
+        if self.latency == "recorded":
+            delay = recorded
+        elif isinstance(self.latency, dict):
+            delay = self.latency.get(service, 0.0)
+        else:
+            delay = self.latency or 0.0
+        if delay:
+            time.sleep(delay)
+
+    def call(self, service, parts, fn):
+        """Run fn() (record) or return its stored result (replay) for this call."""
+        digest, description = self._key(service, *parts)
+        n = self._next_index(service, digest)
+
+        if self.mode == "replay":
+            path = self._path(service, digest, n)
+            while not path.exists() and n > 0:
+                n -= 1
+                path = self._path(service, digest, n)
+            if not path.exists():
+                raise ReplayMiss(f"No {service} fixture in {self.dir} for {description[:200]}")
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+            self._sleep(service, entry["elapsed"])
+            if "error" in entry:
+                raise entry["error"]
+            return entry["result"]
+
+        started = time.perf_counter()
+        entry = {"call": description[:2000]}
+        try:
+            result = fn()
+            entry["result"] = result
+            return result
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+                entry["error"] = e
+            except Exception:
+                entry["error"] = RuntimeError(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            entry["elapsed"] = time.perf_counter() - started
+            path = self._path(service, digest, n)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "wb") as f:
+                pickle.dump(entry, f)
+
+    # ---- patching ----
+
+    def _recorded_on(self):
+        try:
+            meta = json.loads((self.dir / "meta.json").read_text(encoding="utf-8"))
+            return date.fromisoformat(meta["recorded_on"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _pin_today(self):
+        if self.mode == "record":
+            self.dir.mkdir(parents=True, exist_ok=True)
+            meta = {"recorded_on": date.today().isoformat()}
+            (self.dir / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+            return
+        day = self._recorded_on()
+        if day is None:
+            return
+        pinned = _pinned_date(day)
+        for name in DATED_MODULES:
+            module = importlib.import_module(name)
+            self._saved["dates"][name] = module.date
+            module.date = pinned
+
+    def __enter__(self):
+        import orchestrator
+
+        self._saved = {
+            "ticker": yf.Ticker,
+            "download": yf.download,
+            "get": requests.get,
+            "client": orchestrator.client,
+            "dates": {},
+        }
+        self._pin_today()
+        real = self._saved
+        yf.Ticker = lambda symbol, *args, **kwargs: _HarnessTicker(self, real["ticker"], symbol, args, kwargs)
+        yf.download = lambda *args, **kwargs: self.call(
+            "yahoo", ("download", args, kwargs), lambda: real["download"](*args, **kwargs),
+        )
+        requests.get = self._get
+        orchestrator.client = _HarnessClient(self, real["client"])
+
+        if self.isolate_cache:
+            cache.flush_cache()
+            self._saved["db_path"] = cache.DB_PATH
+            self._scratch = tempfile.mkdtemp(prefix="replay-cache-")
+            cache.DB_PATH = os.path.join(self._scratch, "cache.db")
+            cache.clear_memory_cache()
+            cache.init_cache()
+            self._saved["price_store"] = price_store.PRICE_STORE_PATH
+            price_store.PRICE_STORE_PATH = os.path.join(self._scratch, "prices.db")
+        return self
+
+    def __exit__(self, *exc):
+        import orchestrator
+
+        yf.Ticker = self._saved["ticker"]
+        yf.download = self._saved["download"]
+        requests.get = self._saved["get"]
+        orchestrator.client = self._saved["client"]
+        for name, original in self._saved["dates"].items():
+            importlib.import_module(name).date = original
+        if self.isolate_cache:
+            cache.flush_cache()
+            cache.close_cache()
+            cache.DB_PATH = self._saved["db_path"]
+            price_store.PRICE_STORE_PATH = self._saved["price_store"]
+            cache.clear_memory_cache()
+        return False
+
+    def _get(self, url, params=None, **kwargs):
+        def fetch():
+            resp = self._saved["get"](url, params=params, **kwargs)
+            # Keep only what callers read; the full object holds the request URL with credentials.
+            stored = requests.Response()
+            stored.status_code = resp.status_code
+            stored._content = resp.content
+            stored.headers = resp.headers
+            stored.encoding = resp.encoding
+            stored.url = url
+            return stored
+        return self.call("http", ("get", url, _without_secrets(params)), fetch)
+
+
+class _HarnessTicker:
+    """Stands in for yf.Ticker: properties and method calls each become one recorded call."""
+
+    def __init__(self, harness, ticker_class, symbol, args, kwargs):
+        self._harness = harness
+        self._class = ticker_class
+        self._symbol = symbol
+        self._args = args
+        self._kwargs = kwargs
+        self._real = None
+        self.ticker = symbol
+
+    def _get_real(self):
+        if self._real is None:
+            self._real = self._class(self._symbol, *self._args, **self._kwargs)
+        return self._real
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if isinstance(getattr(_YF_TICKER, name, None), property):
+            return self._harness.call(
+                "yahoo", ("Ticker", self._symbol, name),
+                lambda: getattr(self._get_real(), name),
+            )
+
+        def method(*args, **kwargs):
+            return self._harness.call(
+                "yahoo", ("Ticker", self._symbol, name, args, kwargs),
+                lambda: getattr(self._get_real(), name)(*args, **kwargs),
+            )
+        return method
+
+
+class _HarnessClient:
+    def __init__(self, harness, real):
+        self.messages = _HarnessMessages(harness, real)
+
+
+class _HarnessMessages:
+    def __init__(self, harness, real):
+        self._harness = harness
+        self._real = real
+        self.batches = _HarnessBatches(harness, real)
+
+    def create(self, **params):
+        return self._harness.call(
+            "anthropic", ("messages.create", params),
+            lambda: self._real.messages.create(**params),
+        )
+
+    def stream(self, **params):
+        def run():
+            with self._real.messages.stream(**params) as stream:
+                deltas = list(stream.text_stream)
+                return deltas, stream.get_final_message()
+        # Recording consumes the whole stream first, so deltas arrive together in record mode.
+        deltas, message = self._harness.call("anthropic", ("messages.stream", params), run)
+        return _ReplayStream(deltas, message)
+
+
+class _HarnessBatches:
+    def __init__(self, harness, real):
+        self._harness = harness
+        self._real = real
+
+    def create(self, requests):
+        return self._harness.call(
+            "anthropic", ("batches.create", requests),
+            lambda: self._real.messages.batches.create(requests=requests),
+        )
+
+    def retrieve(self, batch_id):
+        return self._harness.call(
+            "anthropic", ("batches.retrieve", batch_id),
+            lambda: self._real.messages.batches.retrieve(batch_id),
+        )
+
+    def results(self, batch_id):
+        return iter(self._harness.call(
+            "anthropic", ("batches.results", batch_id),
+            lambda: list(self._real.messages.batches.results(batch_id)),
+        ))
+
+
+class _ReplayStream:
+    def __init__(self, deltas, message):
+        self._deltas = deltas
+        self._message = message
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        return iter(self._deltas)
+
+    def get_final_message(self):
+        return self._message
@@ -4,8 +4,12 @@ import requests
 import sqlite3
 import datetime as dt
 import numpy as np
+import time
 from io import StringIO
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tools.adaptive import AdaptiveFetcher
+from tools.price_store import get_bars, period_start
+from tools.panel import PanelWriter, open_panel
 
 # ============================================================
 # CONFIG
@@ -16,6 +20,19 @@ TOP_N = 20
 MIN_PRICE = 5
 MIN_VOLUME = 500_000
 
+# The liquidity filter pulls bars through the store this many tickers at a
+# time; a chunk that fails or comes back empty is retried on its own.
+PRICE_CHUNK_SIZE = 200
+PRICE_CHUNK_RETRIES = 2
+PRICE_CHUNK_BACKOFF_SECONDS = 5
+
+# fetch_all_fundamentals starts at 12 concurrent requests (the old fixed
+# pool) and adapts between the bounds; throttled calls are retried.
+FUNDAMENTAL_MIN_WORKERS = 2
+FUNDAMENTAL_MAX_WORKERS = 32
+FUNDAMENTAL_START_WORKERS = 12
+FUNDAMENTAL_MAX_RETRIES = 4
+
 FACTOR_WEIGHTS = {
     "value": 0.18,
     "growth": 0.18,
@@ -78,35 +95,78 @@ def get_all_us_stocks():
 # LIQUIDITY FILTER
 # ============================================================
 
-def filter_liquid_stocks(tickers):
-    batch = yf.download(
-        tickers,
-        period="6mo",
-        group_by="ticker",
-        threads=True,
-        progress=False,
-    )
+def load_chunk(tickers):
+    """{ticker: 6mo bars} for the chunk's tickers that have bars, retrying the chunk alone if it fails; {} if it never succeeds."""
+    for attempt in range(PRICE_CHUNK_RETRIES + 1):
+        try:
+            bars = {ticker: df for ticker, df in get_bars(tickers, "6mo").items() if not df.empty}
+            if bars:
+                return bars
+            error = "no data returned"
+        except Exception as e:
+            error = e
+        if attempt < PRICE_CHUNK_RETRIES:
+            time.sleep(PRICE_CHUNK_BACKOFF_SECONDS * 2 ** attempt)
+    print(f"  Skipping {len(tickers)} tickers ({tickers[0]}..{tickers[-1]}): {error}")
+    return {}
+
+
+def filter_liquid_stocks(tickers, chunk_size=PRICE_CHUNK_SIZE):
+    """
+    Returns the liquid tickers and a PricePanel of their bars (plus SPY).
+    The universe goes through the bar store chunk_size tickers at a time,
+    and each chunk's liquid tickers are written to the panel before the
+    next chunk is loaded, so memory stays flat however large the universe.
+    """
+    # Only the bars added since the last run are downloaded.
+    spy = load_chunk(["SPY"]).get("SPY")
+    if spy is not None and not spy.empty:
+        calendar = spy.index
+    else:
+        spy = None
+        calendar = pd.bdate_range(period_start("6mo"), dt.date.today())
 
     valid = []
-    price_data = {}
-
-    for ticker in tickers:
-        try:
-            df = batch[ticker]
-            if df.empty:
-                continue
+    missing = []
 
-            price = df["Close"].iloc[-1]
-            avg_vol = df["Volume"].mean()
+    def add(batch, chunk):
+        for ticker in chunk:
+            try:
+                df = batch[ticker]
+                price = df["Close"].iloc[-1]
+                avg_vol = df["Volume"].mean()
 
-            if price > MIN_PRICE and avg_vol > MIN_VOLUME:
-                valid.append(ticker)
-                price_data[ticker] = df
+                if price > MIN_PRICE and avg_vol > MIN_VOLUME:
+                    valid.append(ticker)
+                    writer.append(ticker, df)
 
-        except:
-            continue
+            except:
+                continue
 
-    return valid, price_data
+    # An interrupted run leaves the last published panel in place.
+    with PanelWriter(calendar) as writer:
+        for i in range(0, len(tickers), chunk_size):
+            chunk = tickers[i:i + chunk_size]
+            batch = load_chunk(chunk)
+            missing += [t for t in chunk if t not in batch]
+            add(batch, chunk)
+
+        # Part of a chunk can come back empty when Yahoo throttles mid-download.
+        # The store did not mark those tickers as synced; ask once more for all of them.
+        if missing:
+            print(f"  Retrying {len(missing)} tickers that returned no bars...")
+            time.sleep(PRICE_CHUNK_BACKOFF_SECONDS)
+            for i in range(0, len(missing), chunk_size):
+                chunk = missing[i:i + chunk_size]
+                try:
+                    add(get_bars(chunk, "6mo"), chunk)
+                except Exception as e:
+                    print(f"  Retry failed for {len(chunk)} tickers ({chunk[0]}..{chunk[-1]}): {e}")
+
+        if "SPY" not in valid:
+            # Benchmark series for backtest_portfolio
+            writer.append("SPY", spy if spy is not None else pd.DataFrame())
+        return valid, writer.close()
 
 
 # ============================================================
@@ -114,38 +174,38 @@ def filter_liquid_stocks(tickers):
 # ============================================================
 
 def fetch_fundamental(ticker):
-    try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-
-        if not info:
-            return None
-
-        return {
-            "ticker": ticker,
-            "pe": info.get("trailingPE"),
-            "forward_pe": info.get("forwardPE"),
-            "revenue_growth": info.get("revenueGrowth"),
-            "earnings_growth": info.get("earningsGrowth"),
-            "profit_margin": info.get("profitMargins"),
-            "debt_to_equity": info.get("debtToEquity"),
-            "analyst_target": info.get("targetMeanPrice"),
-        }
-    except:
+    """
+    Raises on any fetch error (a 429 included) so AdaptiveFetcher can tell
+    throttling from a ticker that simply has no data (None).
+    """
+    stock = yf.Ticker(ticker)
+    info = stock.info
+
+    if not info:
         return None
 
+    return {
+        "ticker": ticker,
+        "pe": info.get("trailingPE"),
+        "forward_pe": info.get("forwardPE"),
+        "revenue_growth": info.get("revenueGrowth"),
+        "earnings_growth": info.get("earningsGrowth"),
+        "profit_margin": info.get("profitMargins"),
+        "debt_to_equity": info.get("debtToEquity"),
+        "analyst_target": info.get("targetMeanPrice"),
+    }
 
-def fetch_all_fundamentals(tickers):
-    results = {}
-
-    with ThreadPoolExecutor(max_workers=12) as executor:
-        futures = [executor.submit(fetch_fundamental, t) for t in tickers]
-
-        for future in as_completed(futures):
-            data = future.result()
-            if data:
-                results[data["ticker"]] = data
 
+def fetch_all_fundamentals(tickers):
+    fetcher = AdaptiveFetcher(
+        fetch_fundamental,
+        min_workers=FUNDAMENTAL_MIN_WORKERS,
+        max_workers=FUNDAMENTAL_MAX_WORKERS,
+        start_workers=FUNDAMENTAL_START_WORKERS,
+        max_retries=FUNDAMENTAL_MAX_RETRIES,
+    )
+    results = fetcher.run(tickers)
+    print(f"  Fundamentals: {fetcher.summary()}")
     return results
 
 
@@ -157,74 +217,120 @@ def normalize(series):
     return (series - series.mean()) / (series.std() + 1e-9)
 
 
-def compute_scores(valid_tickers, price_data, fundamentals):
+RAW_FACTORS = [
+    "value_raw",
+    "growth_raw",
+    "quality_raw",
+    "momentum_raw",
+    "bounce_raw",
+    "analyst_raw",
+    "liquidity_raw",
+    "volatility_raw",
+]
+
+FUNDAMENTAL_FIELDS = ["pe", "revenue_growth", "profit_margin", "debt_to_equity", "analyst_target"]
+
+
+def _row_mean(values):
+    # Same accumulation as pandas' Series.mean(), so every row matches
+    # what the per-ticker loop used to compute.
+    mask = np.isnan(values)
+    count = (~mask).sum(axis=1).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(mask, 0.0, values).sum(axis=1) / count
+
+
+def _row_std(values):
+    # pandas' two-pass nanvar (ddof=1), row by row.
+    mask = np.isnan(values)
+    count = (~mask).sum(axis=1).astype(np.float64)
+    d = count - 1
+    d[count <= 1] = np.nan
+    count[count <= 1] = np.nan
+    filled = np.where(mask, 0.0, values)
+    with np.errstate(invalid="ignore"):
+        avg = filled.sum(axis=1) / count
+        sqr = (avg[:, None] - filled) ** 2
+        sqr[mask] = 0
+        return np.sqrt(sqr.sum(axis=1) / d)
+
+
+def price_factors(panel, tickers) -> dict:
+    """Price-based raw factors for `tickers`, each an array computed across the whole panel at once."""
+    rows = panel.rows(tickers)
+    close = panel.field("Close")[rows].astype(np.float64)
+    high = panel.field("High")[rows].astype(np.float64)
+    low = panel.field("Low")[rows].astype(np.float64)
+    volume = panel.field("Volume")[rows].astype(np.float64)
+
+    price = close[:, -1]
+    period_high = np.fmax.reduce(high, axis=1)
+    period_low = np.fmin.reduce(low, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Full width with a NaN first column, like pct_change(); the
+        # pairwise sums inside std() only match over the same length.
+        daily_returns = np.full_like(close, np.nan)
+        daily_returns[:, 1:] = close[:, 1:] / close[:, :-1] - 1
+        return {
+            "price": price,
+            "momentum_raw": close[:, -1] / close[:, 0] - 1,
+            "bounce_raw": (price - period_low) / (period_high - period_low + 1e-9),
+            "liquidity_raw": _row_mean(volume),
+            "volatility_raw": -_row_std(daily_returns),
+        }
 
-    rows = []
 
-    for ticker in valid_tickers:
-        if ticker not in fundamentals:
-            continue
+def fundamental_frame(tickers, fundamentals) -> pd.DataFrame:
+    """One row per ticker, one float column per field; missing values are NaN."""
+    return (
+        pd.DataFrame([fundamentals[t] for t in tickers], index=tickers)
+        .reindex(columns=FUNDAMENTAL_FIELDS)
+        .astype(np.float64)
+    )
 
-        f = fundamentals[ticker]
-        df = price_data[ticker]
-        price = df["Close"].iloc[-1]
 
+def compute_scores(valid_tickers, price_data, fundamentals):
+    """
+    Scores every ticker with fundamentals in one pass: price factors come
+    straight off the price panel, fundamental factors off a frame built
+    from the fundamentals dicts.
+    """
+    tickers = [t for t in valid_tickers if t in fundamentals]
+    f = fundamental_frame(tickers, fundamentals)
+    prices = price_factors(price_data, tickers)
+    price = prices["price"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
         # VALUE
-        pe = f.get("pe")
-        value_raw = 1 / pe if pe and pe > 0 else 0
+        pe = f["pe"].to_numpy()
+        value_raw = np.where(pe > 0, 1 / pe, 0.0)
 
         # GROWTH
-        growth_raw = f.get("revenue_growth") or 0
+        growth_raw = f["revenue_growth"].fillna(0).to_numpy()
 
-        # QUALITY
-        margin = f.get("profit_margin") or 0
-        debt = f.get("debt_to_equity") or 100
+        # QUALITY (a debt/equity of 0 reads as missing, as it always has)
+        margin = f["profit_margin"].fillna(0).to_numpy()
+        debt = f["debt_to_equity"].fillna(0).replace(0, 100).to_numpy()
         quality_raw = margin - (debt / 1000)
 
-        # MOMENTUM (6M return)
-        ret_6m = (df["Close"].iloc[-1] / df["Close"].iloc[0]) - 1
-
-        # BOUNCE
-        high = df["High"].max()
-        low = df["Low"].min()
-        bounce_raw = (price - low) / (high - low + 1e-9)
-
         # ANALYST
-        target = f.get("analyst_target")
-        analyst_raw = ((target - price) / price) if target else 0
-
-        # LIQUIDITY
-        liquidity_raw = df["Volume"].mean()
-
-        # VOLATILITY (penalty)
-        volatility = df["Close"].pct_change().std()
-        volatility_raw = -volatility
+        target = f["analyst_target"].fillna(0).to_numpy()
+        analyst_raw = np.where(target != 0, (target - price) / price, 0.0)
+
+    df_scores = pd.DataFrame({
+        "ticker": tickers,
+        "price": price,
+        "value_raw": value_raw,
+        "growth_raw": growth_raw,
+        "quality_raw": quality_raw,
+        "momentum_raw": prices["momentum_raw"],
+        "bounce_raw": prices["bounce_raw"],
+        "analyst_raw": analyst_raw,
+        "liquidity_raw": prices["liquidity_raw"],
+        "volatility_raw": prices["volatility_raw"],
+    })
 
-        rows.append({
-            "ticker": ticker,
-            "price": price,
-            "value_raw": value_raw,
-            "growth_raw": growth_raw,
-            "quality_raw": quality_raw,
-            "momentum_raw": ret_6m,
-            "bounce_raw": bounce_raw,
-            "analyst_raw": analyst_raw,
-            "liquidity_raw": liquidity_raw,
-            "volatility_raw": volatility_raw,
-        })
-
-    df_scores = pd.DataFrame(rows)
-
-    for col in [
-        "value_raw",
-        "growth_raw",
-        "quality_raw",
-        "momentum_raw",
-        "bounce_raw",
-        "analyst_raw",
-        "liquidity_raw",
-        "volatility_raw",
-    ]:
+    for col in RAW_FACTORS:
         df_scores[col.replace("_raw", "_score")] = normalize(df_scores[col])
 
     df_scores["total_score"] = (
@@ -343,7 +449,14 @@ def backtest_portfolio(days_forward=60):
     if not tickers:
         return None
 
-    data = yf.download(tickers + ["SPY"], period=f"{days_forward}d", progress=False)["Close"]
+    start = period_start(f"{days_forward}d")
+    panel = open_panel()
+    if panel is not None and all(t in panel for t in tickers + ["SPY"]):
+        data = panel.wide("Close", tickers + ["SPY"]).astype("float64")
+        data = data[data.index >= start]
+    else:
+        bars = get_bars(tickers + ["SPY"], f"{days_forward}d")
+        data = pd.DataFrame({t: df["Close"] for t, df in bars.items()})
 
     returns = data.pct_change().dropna()
 
@@ -2,6 +2,9 @@ import yfinance as yf
 import requests
 import time
 
+from config import CACHE_TTL_SECONDS, CACHE_HARD_TTL_SECONDS
+from tools.cache import get_many, set_many
+
 
 # ── Hardcoded popular stocks beyond S&P 500 ──────────────────
 EXTRA_STOCKS = [
@@ -293,20 +296,36 @@ def run_full_screener(
     if status_callback:
         status_callback(f"Scanning {total} stocks...")
 
-    # Step 2: Scan all stocks for basic data
+    # Step 2: Scan all stocks for basic data (one cache read for the whole universe)
+    cached = get_many([f"screener:{t}" for t in tickers])
+    scanned = {}
+    fetches = 0
     all_stocks = []
     for i, ticker in enumerate(tickers):
         if status_callback and i % 10 == 0:
             pct = round(i / total * 100)
             status_callback(f"Scanning {i}/{total} ({pct}%): {ticker}...")
 
-        data = scan_stock(ticker)
-        if data:
-            all_stocks.append(data)
+        data = cached.get(f"screener:{ticker}")
+        if data is None:
+            data = scan_stock(ticker)
+            fetches += 1
+            if data:
+                scanned[f"screener:{ticker}"] = data
 
-        # Small delay every 20 stocks to avoid rate limiting
-        if i % 20 == 0 and i > 0:
-            time.sleep(0.5)
+            # Small delay every 20 fetches to avoid rate limiting
+            if fetches % 20 == 0:
+                time.sleep(0.5)
+
+        if data:
+            # The strategy filters annotate these dicts, so keep cached copies clean.
+            all_stocks.append(dict(data))
+
+    set_many(
+        scanned,
+        ttl_seconds=CACHE_TTL_SECONDS["screener"],
+        hard_ttl_seconds=CACHE_HARD_TTL_SECONDS["screener"],
+    )
 
     if status_callback:
         status_callback(f"Scanned {total} tickers, {len(all_stocks)} valid stocks found. Running strategy filters...")
@@ -0,0 +1,354 @@
+"""
+Offline stand-ins for external services, for benchmarking and exercising
+the agent loop without API keys or network access.
+"""
+
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import requests
+
+# How many blocks before a breakpoint the API checks for an earlier cache entry.
+CACHE_LOOKBACK_BLOCKS = 20
+
+
+def _tokens(obj) -> int:
+    """Rough token estimate (~4 characters per token)."""
+    return max(1, len(json.dumps(obj, default=_plain)) // 4)
+
+
+def _plain(obj):
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if isinstance(obj, SimpleNamespace):
+        return vars(obj)
+    return str(obj)
+
+
+def _text_dict(text):
+    return {"type": "text", "text": text}
+
+
+def _without_cache_control(block):
+    if isinstance(block, dict) and "cache_control" in block:
+        return {k: v for k, v in block.items() if k != "cache_control"}
+    return block
+
+
+def _text_block(text):
+    return SimpleNamespace(type="text", text=text)
+
+
+def _tool_block(block_id, name, tool_input):
+    return SimpleNamespace(type="tool_use", id=block_id, name=name, input=tool_input)
+
+
+class _StubMessages:
+    def __init__(self, owner):
+        self._owner = owner
+        self.batches = _StubBatches(owner)
+
+    def create(self, **params):
+        return self._owner._respond(params)
+
+    def stream(self, **params):
+        return _StubStream(self._owner._respond(params))
+
+
+class _StubStream:
+    """Mimics MessageStream: text_stream yields the reply a few words at a time."""
+
+    def __init__(self, message):
+        self._message = message
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        for block in self._message.content:
+            if block.type == "text":
+                words = block.text.split(" ")
+                for i in range(0, len(words), 4):
+                    yield " ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "")
+
+    def get_final_message(self):
+        return self._message
+
+
+class _StubBatches:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, requests):
+        return self._owner._create_batch(requests)
+
+    def retrieve(self, batch_id):
+        return self._owner._retrieve_batch(batch_id)
+
+    def results(self, batch_id):
+        return iter(self._owner._batch_results(batch_id))
+
+
+class StubAnthropicClient:
+    """
+    Drop-in for anthropic.Anthropic() that replays a script of model turns.
+
+    Each script entry is either a string (a final end_turn reply) or a list
+    of (tool_name, input) pairs (a tool_use turn). The script restarts for
+    every new conversation, i.e. whenever `messages` has a single entry.
+
+    Usage numbers imitate prompt caching. Every cache_control breakpoint
+    writes its prefix to the cache. The longest prefix written by an earlier
+    request, found at the breakpoint or up to CACHE_LOOKBACK_BLOCKS blocks
+    before it, is reported as cache_read_input_tokens. What the breakpoints
+    add beyond that is cache_creation_input_tokens, and the rest is
+    input_tokens.
+    """
+
+    def __init__(self, script=None, output_tokens=800):
+        self.script = script or ["# Stub report\n\nNo analysis available offline."]
+        self.output_tokens = output_tokens
+        self.calls = []
+        self._turn = 0
+        self._ids = itertools.count(1)
+        self._cached_prefixes = set()
+        self.messages = _StubMessages(self)
+
+    def _segments(self, params):
+        """
+        Yield (segment, is_breakpoint) in the order the API renders the prompt.
+        Segments are normalized the way the API sees them: a str system prompt
+        or message is a single text block, and cache_control is not content.
+        """
+        for tool in params.get("tools", []):
+            yield _without_cache_control(tool), "cache_control" in tool
+        system = params.get("system", "")
+        if isinstance(system, str):
+            system = [_text_dict(system)] if system else []
+        for block in system:
+            yield _without_cache_control(block), "cache_control" in block
+        for message in params.get("messages", []):
+            content = message["content"]
+            if isinstance(content, str):
+                content = [_text_dict(content)]
+            for block in content:
+                marked = isinstance(block, dict) and "cache_control" in block
+                yield _without_cache_control(block), marked
+
+    def _usage(self, params):
+        digest = hashlib.sha1()
+        total = read = written = 0
+        prefixes, written_now = [], []
+        for segment, breakpoint in self._segments(params):
+            digest.update(json.dumps(segment, default=_plain, sort_keys=True).encode())
+            total += _tokens(segment)
+            prefixes.append((total, digest.hexdigest()))
+            if breakpoint:
+                # Like the API, look back up to CACHE_LOOKBACK_BLOCKS blocks
+                # from the breakpoint for the longest prefix written before.
+                for tokens, key in reversed(prefixes[-CACHE_LOOKBACK_BLOCKS:]):
+                    if key in self._cached_prefixes:
+                        read = max(read, tokens)
+                        break
+                written_now.append(prefixes[-1][1])
+                written = total
+        self._cached_prefixes.update(written_now)
+        written = max(0, written - read)
+        return SimpleNamespace(
+            input_tokens=total - read - written,
+            output_tokens=self.output_tokens,
+            cache_read_input_tokens=read,
+            cache_creation_input_tokens=written,
+        )
+
+    def _respond(self, params):
+        self.calls.append(params)
+        if len(params["messages"]) == 1:
+            self._turn = 0
+        step = self.script[min(self._turn, len(self.script) - 1)]
+        self._turn += 1
+
+        if isinstance(step, str):
+            content, stop_reason = [_text_block(step)], "end_turn"
+        else:
+            content = [
+                _tool_block(f"toolu_stub_{next(self._ids)}", name, tool_input)
+                for name, tool_input in step
+            ]
+            stop_reason = "tool_use"
+
+        return SimpleNamespace(
+            id=f"msg_stub_{len(self.calls)}",
+            type="message",
+            role="assistant",
+            model=params.get("model"),
+            content=content,
+            stop_reason=stop_reason,
+            usage=self._usage(params),
+        )
+
+
+class StubBatchClient(StubAnthropicClient):
+    """
+    StubAnthropicClient that also answers the Message Batches API.
+
+    A batch reports "in_progress" for the first `polls` retrieve() calls and
+    "ended" after that. Requests whose custom_id is in `errored` come back
+    as errored results, the rest are answered from the script. Batches are
+    kept on the instance, so a second retrieve()/results() for the same ID
+    works like resuming against the real API.
+    """
+
+    def __init__(self, script=None, output_tokens=800, polls=1, errored=()):
+        super().__init__(script, output_tokens)
+        self.polls = polls
+        self.errored = set(errored)
+        self.batches = {}
+
+    def _create_batch(self, requests):
+        batch_id = f"msgbatch_stub_{len(self.batches) + 1}"
+        self.batches[batch_id] = {"requests": list(requests), "polls": 0, "results": None}
+        return self._retrieve_batch(batch_id, count_poll=False)
+
+    def _retrieve_batch(self, batch_id, count_poll=True):
+        batch = self.batches[batch_id]
+        if count_poll:
+            batch["polls"] += 1
+        ended = batch["polls"] > self.polls
+        if ended and batch["results"] is None:
+            batch["results"] = [self._batch_result(request) for request in batch["requests"]]
+        results = batch["results"] or []
+        total = len(batch["requests"])
+        succeeded = sum(1 for r in results if r.result.type == "succeeded")
+        return SimpleNamespace(
+            id=batch_id,
+            type="message_batch",
+            processing_status="ended" if ended else "in_progress",
+            request_counts=SimpleNamespace(
+                processing=0 if ended else total,
+                succeeded=succeeded,
+                errored=len(results) - succeeded,
+                canceled=0,
+                expired=0,
+            ),
+        )
+
+    def _batch_result(self, request):
+        if request["custom_id"] in self.errored:
+            result = SimpleNamespace(
+                type="errored",
+                error=SimpleNamespace(type="error", error=SimpleNamespace(type="api_error", message="stub error")),
+            )
+        else:
+            result = SimpleNamespace(type="succeeded", message=self._respond(request["params"]))
+        return SimpleNamespace(custom_id=request["custom_id"], result=result)
+
+    def _batch_results(self, batch_id):
+        batch = self.batches[batch_id]
+        if batch["results"] is None:
+            raise RuntimeError(f"Batch {batch_id} has not ended yet")
+        return batch["results"]
+
+
+class StubYahooProvider:
+    """
+    Stand-in for yf.Ticker(symbol).info behind a rate-limited server, for
+    exercising the fundamentals fetcher offline:
+
+        provider = StubYahooProvider(rate=40)
+        with patch.object(yf, "Ticker", provider.Ticker):
+            fetch_all_fundamentals(tickers)
+
+    The server admits `rate` requests per second from a token bucket
+    `burst` deep; anything beyond that raises requests.HTTPError with a
+    429 response. Latency grows linearly once more than `capacity` calls
+    are in flight. A `missing` fraction of symbols have no info at all.
+    """
+
+    def __init__(self, rate=40.0, burst=10, latency=0.05, capacity=8, missing=0.0, seed=0):
+        self.rate = rate
+        self.burst = burst
+        self.latency = latency
+        self.capacity = capacity
+        self.missing = missing
+        self.seed = seed
+        self.calls = 0
+        self.throttled = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    def _admit(self) -> bool:
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                self.throttled += 1
+                return False
+            self._tokens -= 1
+            self._inflight += 1
+            return True
+
+    def _request(self):
+        if not self._admit():
+            response = requests.Response()
+            response.status_code = 429
+            raise requests.HTTPError("429 Client Error: Too Many Requests", response=response)
+        try:
+            time.sleep(self.latency * max(1.0, self._inflight / self.capacity))
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def insider_transactions(self, symbol):
+        self._request()
+        return pd.DataFrame()
+
+    def info(self, symbol) -> dict:
+        self._request()
+        rng = random.Random(f"{self.seed}:{symbol}")
+        if rng.random() < self.missing:
+            return {}
+        price = rng.uniform(5, 500)
+        return {
+            "symbol": symbol,
+            "currentPrice": price,
+            "trailingPE": rng.uniform(-20, 80),
+            "forwardPE": rng.uniform(5, 60),
+            "revenueGrowth": rng.gauss(0.08, 0.2),
+            "earningsGrowth": rng.gauss(0.1, 0.3),
+            "profitMargins": rng.gauss(0.1, 0.1),
+            "debtToEquity": abs(rng.gauss(80, 60)),
+            "targetMeanPrice": price * rng.gauss(1.1, 0.15),
+        }
+
+    def Ticker(self, symbol):
+        """Drop-in for yf.Ticker: only .info and .insider_transactions are implemented."""
+        return _StubTicker(self, symbol)
+
+
+class _StubTicker:
+    def __init__(self, provider, symbol):
+        self.ticker = symbol
+        self._provider = provider
+
+    @property
+    def info(self):
+        return self._provider.info(self.ticker)
+
+    @property
+    def insider_transactions(self):
+        return self._provider.insider_transactions(self.ticker)
@@ -0,0 +1,181 @@
+"""
+Lightweight tracing: one JSONL file per run, one line per span.
+
+    with trace_run("daily"):
+        with span("analysis", "AAPL", ticker="AAPL"):
+            with span("tool", "get_stock_data") as s:
+                s["bytes"] = ...
+
+Spans nest through contextvars; a child records its parent's id and
+inherits its ticker. Worker threads only see the current run if the
+callable is wrapped with bind(). With TRACE_DIR unset, spans cost next
+to nothing and nothing is written.
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from config import TRACE_DIR
+
+INHERITED = ("ticker",)
+
+_run = contextvars.ContextVar("trace_run", default=None)
+_parent = contextvars.ContextVar("trace_span", default=None)
+_ids = itertools.count(1)
+
+
+class _Run:
+    def __init__(self, name):
+        Path(TRACE_DIR).mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.path = Path(TRACE_DIR) / f"{stamp}-{name}-{os.getpid()}.jsonl"
+        self.name = name
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+@contextmanager
+def trace_run(name):
+    """Open a trace file for this run, unless one is already active (then spans join it)."""
+    if not TRACE_DIR or _run.get() is not None:
+        yield _run.get()
+        return
+    run = _Run(name)
+    token = _run.set(run)
+    try:
+        with span("run", name):
+            yield run
+    finally:
+        _run.reset(token)
+        run.close()
+
+
+@contextmanager
+def span(kind, name, **attrs):
+    """
+    Time a block and write it to the active trace. Yields a dict; anything
+    put into it (tokens, bytes, cache="hit") is stored with the span.
+    """
+    run = _run.get()
+    if run is None:
+        yield attrs
+        return
+
+    parent = _parent.get()
+    record = {"id": next(_ids), "parent": parent["id"] if parent else None, "kind": kind, "name": name}
+    if parent:
+        for key in INHERITED:
+            if key in parent and key not in attrs:
+                record[key] = parent[key]
+    record.update(attrs)
+    token = _parent.set(record)
+    started = time.time()
+    clock = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _parent.reset(token)
+        record["start"] = round(started, 3)
+        record["seconds"] = round(time.perf_counter() - clock, 4)
+        record["thread"] = threading.current_thread().name
+        run.write(record)
+
+
+def annotate(**fields):
+    """Add fields to the innermost open span (no-op outside a trace)."""
+    record = _parent.get()
+    if record is not None and _run.get() is not None:
+        record.update(fields)
+
+
+def bind(fn, *args, **kwargs):
+    """Callable that runs fn(*args, **kwargs) inside a copy of the current trace context."""
+    ctx = contextvars.copy_context()
+    return lambda: ctx.run(fn, *args, **kwargs)
+
+
+def latest_trace():
+    files = sorted(Path(TRACE_DIR).glob("*.jsonl"), key=lambda p: p.stat().st_mtime) if TRACE_DIR else []
+    return files[-1] if files else None
+
+
+def load_trace(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+
+
+def summarize_trace(spans) -> str:
+    """Plain-text breakdown of where time and tokens went."""
+    lines = []
+    runs = [s for s in spans if s["kind"] == "run"]
+    for run in runs:
+        lines.append(f"Run '{run['name']}': {run['seconds']:.1f}s wall")
+
+    by_name = defaultdict(lambda: {"count": 0, "seconds": 0.0, "bytes": 0, "hit": 0, "miss": 0, "errors": 0})
+    tokens = defaultdict(int)
+    for s in spans:
+        if s["kind"] not in ("tool", "model"):
+            continue
+        row = by_name[(s["kind"], s["name"])]
+        row["count"] += 1
+        row["seconds"] += s["seconds"]
+        row["bytes"] += s.get("bytes", 0)
+        row["errors"] += "error" in s
+        if s.get("cache") in ("hit", "miss"):
+            row[s["cache"]] += 1
+        for field in TOKEN_FIELDS:
+            tokens[field] += s.get(field, 0)
+
+    lines.append("")
+    lines.append(f"{'span':<34}{'calls':>6}{'total s':>10}{'mean s':>9}{'KB':>9}{'hit/miss':>10}{'errors':>8}")
+    for (kind, name), row in sorted(by_name.items(), key=lambda item: -item[1]["seconds"]):
+        cache = f"{row['hit']}/{row['miss']}" if row["hit"] or row["miss"] else ""
+        lines.append(
+            f"{kind + ':' + name:<34}{row['count']:>6}{row['seconds']:>10.2f}"
+            f"{row['seconds'] / row['count']:>9.2f}{row['bytes'] / 1024:>9.1f}{cache:>10}{row['errors']:>8}"
+        )
+
+    analyses = [s for s in spans if s["kind"] == "analysis"]
+    if analyses:
+        per_ticker = defaultdict(lambda: defaultdict(int))
+        for s in spans:
+            if s["kind"] == "model" and "ticker" in s:
+                for field in TOKEN_FIELDS:
+                    per_ticker[s["ticker"]][field] += s.get(field, 0)
+        lines.append("")
+        lines.append(f"{'ticker':<10}{'seconds':>9}{'input':>10}{'cached':>10}{'written':>10}{'output':>9}")
+        for s in sorted(analyses, key=lambda s: -s["seconds"]):
+            t = per_ticker[s["ticker"]]
+            lines.append(
+                f"{s['ticker']:<10}{s['seconds']:>9.1f}{t['input_tokens']:>10,}"
+                f"{t['cache_read_input_tokens']:>10,}{t['cache_creation_input_tokens']:>10,}{t['output_tokens']:>9,}"
+            )
+
+    lines.append("")
+    lines.append(
+        f"Tokens: {tokens['input_tokens']:,} uncached input, {tokens['cache_read_input_tokens']:,} cached, "
+        f"{tokens['cache_creation_input_tokens']:,} cache writes, {tokens['output_tokens']:,} output"
+    )
+    return "\n".join(lines)